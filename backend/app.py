@@ -1,46 +1,161 @@
-import os
-from flask import Flask, request, jsonify, send_from_directory
+import hmac
+from functools import partial, wraps
+from flask import Flask, Request, Response, request, jsonify, send_file, g
 from flask_cors import CORS
 from sqlalchemy import select
+from sqlalchemy.orm import selectinload
 from sqlalchemy.exc import IntegrityError
-from db import Base, engine, SessionLocal
+from db import engine, SessionLocal, read_session, note_write, migrate
 from models import User, Ticket, TicketStatus, Role, Comment, Attachment
-from auth import hash_password, verify_password, create_token, decode_token
+from auth import hash_password, verify_password, needs_rehash, create_token, token_cache, HashPoolBusy
 from config import Config
-from mailer import send_email
+from queries import keyset_page, ticket_list_query
+from json_provider import FastJSONProvider
+from mailer import queue_email, start_worker_thread
 from werkzeug.utils import secure_filename
+from ratelimit import TokenBucketLimiter
+import storage
+import events
+import archive
+import assigner
+import attachments
+import search
+from bulk import bulk_update
+import reports
+import export
+import httpcache
+import metrics
+from httpcache import conditional_json, make_etag
+
+class UploadRequest(Request):
+    # stream multipart files straight into the blob store's temp dir, hashing as they arrive
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return storage.HashingFile()
 
 app = Flask(__name__)
+app.request_class = UploadRequest
+app.json = FastJSONProvider(app)
 app.config['MAX_CONTENT_LENGTH'] = Config.MAX_CONTENT_LENGTH_MB * 1024 * 1024
+app.config['USE_X_SENDFILE'] = Config.USE_X_SENDFILE
 CORS(app, origins=Config.CORS_ORIGINS, supports_credentials=True)
 
 # init DB
-Base.metadata.create_all(bind=engine)
+if Config.DB_AUTO_MIGRATE:
+    migrate()
+search.install(engine)
 
-# ensure upload dir exists (relative to backend folder)
-UPLOAD_DIR = os.path.join(os.path.dirname(__file__), Config.UPLOAD_DIR)
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+if Config.MAIL_WORKER == "thread":
+    start_worker_thread()
+if Config.ASSIGNER == "thread":
+    assigner.start_scheduler_thread()
+if Config.ARCHIVE == "thread":
+    archive.start_archiver_thread()
+
+login_ip_limiter = TokenBucketLimiter(Config.LOGIN_IP_RATE_PER_MINUTE, Config.LOGIN_IP_BURST)
+login_email_limiter = TokenBucketLimiter(Config.LOGIN_RATE_PER_MINUTE, Config.LOGIN_BURST)
 
 # ----- Helpers -----
-def require_auth(roles: list[str] | None = None):
+def require_auth(roles: list[str] | None = None, allow_query_token: bool = False):
+    allowed = frozenset(roles) if roles else None
     def wrapper(func):
+        @wraps(func)
         def inner(*args, **kwargs):
             auth_header = request.headers.get("Authorization", "")
-            if not auth_header.startswith("Bearer "):
+            if auth_header.startswith("Bearer "):
+                token = auth_header[7:]
+            elif allow_query_token and request.args.get("access_token"):
+                # EventSource cannot set headers
+                token = request.args["access_token"]
+            else:
                 return jsonify({"error": "Missing or invalid token"}), 401
-            token = auth_header.split(" ", 1)[1]
             try:
-                payload = decode_token(token)
-                request.user = payload
-                if roles and payload.get("role") not in roles:
-                    return jsonify({"error": "Forbidden"}), 403
+                with metrics.phase("jwt"):
+                    payload = token_cache.decode(token)
             except Exception as e:
                 return jsonify({"error": "Unauthorized", "detail": str(e)}), 401
+            request.user = payload
+            if allowed is not None and payload.get("role") not in allowed:
+                return jsonify({"error": "Forbidden"}), 403
             return func(*args, **kwargs)
-        inner.__name__ = func.__name__
         return inner
     return wrapper
 
+def rate_limited(*checks):
+    """Return a 429 response if any (limiter, key) pair is out of tokens."""
+    for limiter, key in checks:
+        allowed, retry_after = limiter.allow(key)
+        if not allowed:
+            resp = jsonify({"error": "Too many attempts, slow down"})
+            resp.headers["Retry-After"] = str(max(int(retry_after + 0.999), 1))
+            return resp, 429
+    return None
+
+@app.errorhandler(HashPoolBusy)
+def hash_pool_busy(e):
+    resp = jsonify({"error": str(e)})
+    resp.headers["Retry-After"] = "1"
+    return resp, 503
+
+# ----- Instrumentation -----
+def _is_admin() -> bool:
+    auth_header = request.headers.get("Authorization", "")
+    if not auth_header.startswith("Bearer "):
+        return False
+    try:
+        return token_cache.decode(auth_header[7:]).get("role") == Role.ADMIN.value
+    except Exception:
+        return False
+
+@app.before_request
+def start_request_metrics():
+    metrics.begin_request(request.endpoint)
+    mode = request.args.get("__profile")
+    if mode and Config.PROFILING_ENABLED and _is_admin():
+        # ?__profile=1 returns a cProfile dump, ?__profile=flame folded stacks for a flamegraph
+        g.profile = metrics.Profile("flame" if mode == "flame" else "cprofile").start()
+
+@app.after_request
+def finish_request_metrics(resp):
+    profile = g.pop("profile", None)
+    stats = metrics.end_request(request.method, resp.status_code)
+    if profile is not None:
+        body, mimetype, filename = profile.stop()
+        resp = Response(body, mimetype=mimetype, headers={
+            "Content-Disposition": f"attachment; filename={filename}",
+            "X-Profiled-Status": str(resp.status_code),
+        })
+    if stats is not None and Config.SERVER_TIMING:
+        resp.headers["Server-Timing"] = metrics.server_timing(stats)
+    return resp
+
+@app.after_request
+def remember_writer(resp):
+    # later reads by this user go to the primary until replicas have caught up
+    if request.method not in ("GET", "HEAD", "OPTIONS") and resp.status_code < 400 and hasattr(request, "user"):
+        note_write(request.user["sub"])
+    return resp
+
+@app.teardown_request
+def abort_request_metrics(exc):
+    # an unhandled exception skips after_request
+    profile = g.pop("profile", None)
+    if profile is not None:
+        profile.stop()
+    if metrics.current() is not None:
+        metrics.end_request(request.method, 500)
+
+LOOPBACK = ("127.0.0.1", "::1")
+
+@app.get('/metrics')
+def prometheus_metrics():
+    if Config.METRICS_TOKEN:
+        if not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {Config.METRICS_TOKEN}"):
+            return jsonify({"error": "Unauthorized"}), 401
+    # no token: only a scraper on this host, and not a request a local reverse proxy forwarded
+    elif request.remote_addr not in LOOPBACK or "X-Forwarded-For" in request.headers:
+        return jsonify({"error": "Not found"}), 404
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
 def serialize_ticket(t: Ticket):
     return {
         "id": t.id,
@@ -66,6 +181,29 @@ def serialize_comment(c: Comment):
         "user": serialize_user(c.user) if c.user else None
     }
 
+# list endpoints select these columns as plain rows; the JSON provider formats datetimes and enums
+USER_COLUMNS = (User.id, User.name, User.email, User.role)
+COMMENT_COLUMNS = (Comment.id, Comment.ticket_id, Comment.user_id, Comment.content, Comment.created_at,
+                   User.name.label("user_name"), User.email.label("user_email"), User.role.label("user_role"))
+
+def comment_row(r):
+    return {
+        "id": r.id,
+        "ticket_id": r.ticket_id,
+        "user_id": r.user_id,
+        "content": r.content,
+        "created_at": r.created_at,
+        "user": {"id": r.user_id, "name": r.user_name, "email": r.user_email, "role": r.user_role} if r.user_name is not None else None,
+    }
+
+def stream_rows(q, to_dict, session_factory=SessionLocal):
+    """Stream a JSON array of ``q``'s rows from a server-side cursor, in constant memory."""
+    def rows():
+        with session_factory() as db:
+            for r in db.execute(q.execution_options(yield_per=Config.STREAM_CHUNK_ROWS)):
+                yield to_dict(r)
+    return Response(app.json.stream_array(rows()), mimetype="application/json")
+
 def serialize_attachment(a: Attachment):
     return {
         "id": a.id,
@@ -73,6 +211,11 @@ def serialize_attachment(a: Attachment):
         "filename": a.filename,
         "path": f"/api/attachments/{a.id}/download",
         "uploaded_at": a.uploaded_at.isoformat(),
+        "size": a.size,
+        "mime_type": a.mime_type,
+        "processed": a.processed_at is not None,
+        "thumbnail_url": f"/api/attachments/{a.id}/thumbnail" if a.has_thumbnail else None,
+        "entries": a.entries,
     }
 
 # ----- Auth -----
@@ -86,10 +229,14 @@ def register():
 
     if not email or not password or not name:
         return jsonify({"error": "Missing fields"}), 400
+    limited = rate_limited((login_ip_limiter, request.remote_addr or ""))
+    if limited:
+        return limited
 
     with SessionLocal() as db:
         user = User(email=email, name=name, password_hash=hash_password(password), role=Role(role))
         db.add(user)
+        httpcache.bump(db, "users")
         try:
             db.commit()
         except IntegrityError:
@@ -102,24 +249,43 @@ def login():
     data = request.json or {}
     email = data.get('email', '').lower().strip()
     password = data.get('password', '')
+    limited = rate_limited((login_ip_limiter, request.remote_addr or ""), (login_email_limiter, email))
+    if limited:
+        return limited
     with SessionLocal() as db:
         user = db.scalar(select(User).where(User.email == email))
         if not user or not verify_password(password, user.password_hash):
             return jsonify({"error": "Invalid credentials"}), 401
+        if needs_rehash(user.password_hash):
+            user.password_hash = hash_password(password)
+            db.commit()
         token = create_token(user.id, user.role.value, user.email)
         return jsonify({"token": token, "user": serialize_user(user)})
 
+@app.get('/api/auth/cache-stats')
+@require_auth(roles=[Role.ADMIN.value])
+def auth_cache_stats():
+    return jsonify(token_cache.stats())
+
 # ----- Users -----
 @app.get('/api/users')
 @require_auth(roles=[Role.ADMIN.value, Role.TECH.value])
 def list_users():
+    reader = partial(read_session, request.user["sub"])
     role = request.args.get("role")
-    with SessionLocal() as db:
-        q = select(User)
-        if role:
+    q = select(*USER_COLUMNS).order_by(User.id)
+    if role:
+        try:
             q = q.where(User.role == Role(role))
-        users = db.scalars(q).all()
-        return jsonify([serialize_user(u) for u in users])
+        except ValueError:
+            return jsonify({"error": f"unknown role {role}"}), 400
+    if request.args.get("stream") == "1":
+        return stream_rows(q, lambda r: r._asdict(), reader)
+    with reader() as db:
+        def build():
+            return [r._asdict() for r in db.execute(q)]
+        key = f"users:{role or ''}"
+        return conditional_json(key, make_etag(key, httpcache.collection_version(db, "users")), build)
 
 # ----- Tickets CRUD -----
 @app.post('/api/tickets')
@@ -135,41 +301,105 @@ def create_ticket():
         user = db.get(User, int(request.user['sub']))
         ticket = Ticket(title=title, description=description, creator=user)
         db.add(ticket)
+        db.flush()
+        reports.track(db, ticket, None, None)
+        httpcache.bump(db, "tickets")
+        queue_email(db, user.email, "Ticket received", f"Hello {user.name}, your ticket #{ticket.id} was created and is OPEN.")
         db.commit()
         db.refresh(ticket)
-
-        try:
-            send_email(user.email, "Ticket received", f"Hello {user.name}, your ticket #{ticket.id} was created and is OPEN.")
-        except Exception:
-            pass
-
-        return jsonify(serialize_ticket(ticket))
+        data = serialize_ticket(ticket)
+        events.bus.publish("ticket.created", ticket, ticket=data)
+        return jsonify(data)
 
 @app.get('/api/tickets')
 @require_auth()
 def list_tickets():
-    status = request.args.get('status')
-    my = request.args.get('my') == '1'
-    with SessionLocal() as db:
-        q = select(Ticket)
-        if status:
-            q = q.where(Ticket.status == TicketStatus(status))
-        if my:
-            q = q.where(Ticket.creator_id == int(request.user['sub']))
-        tickets = db.scalars(q).all()
-        return jsonify([serialize_ticket(t) for t in tickets])
+    args = request.args
+    try:
+        q, limit, order, creator_id = ticket_list_query(args, int(request.user['sub']))
+        with read_session(request.user["sub"]) as db:
+            def build():
+                tickets, next_cursor = keyset_page(db, q, limit, args.get('cursor'), order)
+                return {"items": [t._asdict() for t in tickets], "next_cursor": next_cursor}
+            # the query string fully determines the page (my=1 resolves to creator_id above)
+            key = f"tickets:{creator_id}:{sorted(args.items(multi=True))}"
+            return conditional_json(key, make_etag(key, httpcache.collection_version(db, "tickets")), build)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.post('/api/tickets/bulk')
+@require_auth(roles=[Role.TECH.value, Role.ADMIN.value])
+def bulk_update_tickets():
+    data = request.json or {}
+    ids = data.get('ids')
+    where = data.get('where')
+    if ids is not None and not isinstance(ids, list):
+        return jsonify({"error": "ids must be a list"}), 400
+    if where is not None and not isinstance(where, dict):
+        return jsonify({"error": "where must be an object"}), 400
+    with SessionLocal(expire_on_commit=False) as db:
+        try:
+            results, updated = bulk_update(db, data.get('set') or {}, ids=ids, where=where)
+        except ValueError as e:
+            db.rollback()
+            return jsonify({"error": str(e)}), 400
+        db.commit()
+        for t in updated:
+            events.bus.publish("ticket.updated", t, ticket=serialize_ticket(t))
+        return jsonify({"updated": len(updated), "results": results})
+
+@app.get('/api/tickets/export')
+@require_auth(roles=[Role.TECH.value, Role.ADMIN.value])
+def export_tickets():
+    fmt = request.args.get('format', 'csv')
+    where = {k: v for k, v in request.args.items() if k not in ('format', 'comments', 'access_token')}
+    try:
+        chunks = export.generate(fmt, where, include_comments=request.args.get('comments') == '1')
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    headers = {"Content-Disposition": f"attachment; filename=tickets.{fmt}", "Cache-Control": "no-store"}
+    if 'gzip' in request.accept_encodings:
+        chunks = export.gzip_chunks(chunks)
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+    return Response(chunks, mimetype=export.FORMATS[fmt], headers=headers)
+
+def archived_ticket_json(db, ticket_id: int):
+    """GET /api/tickets/<id>?archived=1 for a ticket in the archive (read-only, so archived_at versions it)."""
+    t = archive.get_ticket(db, ticket_id)
+    if t is None:
+        return jsonify({"error": "Not found"}), 404
+    def build():
+        data = serialize_ticket(t)
+        data["archived_at"] = t.archived_at.isoformat()
+        data["comments"] = [comment_row(r) for r in db.execute(archive.comments_query(ticket_id))]
+        data["attachments"] = [serialize_attachment(a) for a in archive.get_attachments(db, ticket_id)]
+        return data
+    key = f"ticket:{ticket_id}:archived"
+    return conditional_json(key, make_etag(key, t.archived_at.isoformat()), build)
 
 @app.get('/api/tickets/<int:ticket_id>')
 @require_auth()
 def get_ticket(ticket_id: int):
-    with SessionLocal() as db:
-        t = db.get(Ticket, ticket_id)
-        if not t:
+    with read_session(request.user["sub"]) as db:
+        version = httpcache.ticket_version(db, ticket_id)
+        if version is None:
+            if request.args.get("archived") == "1":
+                return archived_ticket_json(db, ticket_id)
             return jsonify({"error": "Not found"}), 404
-        data = serialize_ticket(t)
-        data["comments"] = [serialize_comment(c) for c in t.comments]
-        data["attachments"] = [serialize_attachment(a) for a in t.attachments]
-        return jsonify(data)
+        def build():
+            # ticket, comments (+ authors via join) and attachments in three SELECTs
+            t = db.scalar(
+                select(Ticket)
+                .where(Ticket.id == ticket_id)
+                .options(selectinload(Ticket.comments), selectinload(Ticket.attachments))
+            )
+            data = serialize_ticket(t)
+            data["comments"] = [serialize_comment(c) for c in t.comments]
+            data["attachments"] = [serialize_attachment(a) for a in t.attachments]
+            return data
+        key = f"ticket:{ticket_id}"
+        return conditional_json(key, make_etag(key, version), build)
 
 @app.patch('/api/tickets/<int:ticket_id>')
 @require_auth(roles=[Role.TECH.value, Role.ADMIN.value])
@@ -179,21 +409,21 @@ def update_ticket(ticket_id: int):
         t = db.get(Ticket, ticket_id)
         if not t:
             return jsonify({"error": "Not found"}), 404
+        previous_status, previous_assignee = t.status, t.assignee_id
         if 'status' in data:
             t.status = TicketStatus(data['status'])
         if 'assignee_id' in data:
             t.assignee_id = data['assignee_id']
+        reports.track(db, t, previous_status, previous_assignee)
+        httpcache.bump(db, "tickets")
+        if t.status == TicketStatus.RESOLVED and previous_status != TicketStatus.RESOLVED:
+            creator = db.get(User, t.creator_id)
+            queue_email(db, creator.email, "Ticket resolved", f"Hello {creator.name}, your ticket #{t.id} has been RESOLVED.")
         db.commit()
         db.refresh(t)
-
-        if t.status == TicketStatus.RESOLVED:
-            try:
-                creator = db.get(User, t.creator_id)
-                send_email(creator.email, "Ticket resolved", f"Hello {creator.name}, your ticket #{t.id} has been RESOLVED.")
-            except Exception:
-                pass
-
-        return jsonify(serialize_ticket(t))
+        data = serialize_ticket(t)
+        events.bus.publish("ticket.updated", t, ticket=data)
+        return jsonify(data)
 
 # ----- Assignment -----
 @app.post('/api/tickets/<int:ticket_id>/assign')
@@ -207,20 +437,66 @@ def assign_ticket(ticket_id: int):
         t = db.get(Ticket, ticket_id)
         if not t:
             return jsonify({"error": "Not found"}), 404
+        previous_assignee = t.assignee_id
         t.assignee_id = assignee_id
+        reports.track(db, t, t.status, previous_assignee)
+        httpcache.bump(db, "tickets")
         db.commit()
         db.refresh(t)
-        return jsonify(serialize_ticket(t))
+        data = serialize_ticket(t)
+        events.bus.publish("ticket.assigned", t, ticket=data)
+        return jsonify(data)
+
+# ----- Reports -----
+@app.get('/api/reports')
+@require_auth(roles=[Role.TECH.value, Role.ADMIN.value])
+def get_reports():
+    try:
+        days = min(max(int(request.args.get('days', 30)), 1), 366)
+    except ValueError:
+        return jsonify({"error": "days must be an integer"}), 400
+    with SessionLocal() as db:
+        return jsonify(reports.build_report(db, days))
+
+# ----- Search -----
+@app.get('/api/search')
+@require_auth()
+def search_tickets():
+    q = request.args.get('q', '').strip()
+    if not q:
+        return jsonify({"error": "q required"}), 400
+    try:
+        limit = min(max(int(request.args.get('limit', 20)), 1), Config.TICKETS_PAGE_MAX)
+        offset = max(int(request.args.get('offset', 0)), 0)
+    except ValueError:
+        return jsonify({"error": "limit and offset must be integers"}), 400
+    # same rule as the event stream: staff see every ticket, others only their own
+    creator_id = None if request.user["role"] in events.STAFF_ROLES else int(request.user["sub"])
+    with SessionLocal() as db:
+        hits = search.search(db, q, limit, offset, creator_id)
+    return jsonify({"items": hits, "next_offset": offset + limit if len(hits) == limit else None})
 
 # ----- Comments -----
 @app.get('/api/tickets/<int:ticket_id>/comments')
 @require_auth()
 def list_comments(ticket_id: int):
-    with SessionLocal() as db:
-        t = db.get(Ticket, ticket_id)
-        if not t:
-            return jsonify({"error": "Not found"}), 404
-        return jsonify([serialize_comment(c) for c in t.comments])
+    reader = partial(read_session, request.user["sub"])
+    with reader() as db:
+        version = httpcache.ticket_version(db, ticket_id)
+        if version is None:
+            t = archive.get_ticket(db, ticket_id) if request.args.get("archived") == "1" else None
+            if t is None:
+                return jsonify({"error": "Not found"}), 404
+            version, q = t.archived_at.isoformat(), archive.comments_query(ticket_id)
+        else:
+            q = (select(*COMMENT_COLUMNS).outerjoin(User, User.id == Comment.user_id)
+                 .where(Comment.ticket_id == ticket_id).order_by(Comment.id))
+        if request.args.get("stream") == "1":
+            return stream_rows(q, comment_row, reader)
+        def build():
+            return [comment_row(r) for r in db.execute(q)]
+        key = f"comments:{ticket_id}"
+        return conditional_json(key, make_etag(key, version), build)
 
 @app.post('/api/tickets/<int:ticket_id>/comments')
 @require_auth()
@@ -236,9 +512,28 @@ def add_comment(ticket_id: int):
         user_id = int(request.user["sub"])
         c = Comment(ticket_id=t.id, user_id=user_id, content=content)
         db.add(c)
+        httpcache.touch_ticket_children(db, t.id)
         db.commit()
         db.refresh(c)
-        return jsonify(serialize_comment(c)), 201
+        data = serialize_comment(c)
+        events.bus.publish("ticket.commented", t, comment=data)
+        return jsonify(data), 201
+
+# ----- Events -----
+@app.get('/api/events')
+@require_auth(allow_query_token=True)
+def stream_events():
+    last_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    try:
+        last_id = int(last_id) if last_id else None
+    except ValueError:
+        return jsonify({"error": "Last-Event-ID must be an integer"}), 400
+    sub = events.bus.subscribe(request.user)
+    return Response(
+        events.stream(sub, last_id),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 # ----- Attachments -----
 ALLOWED_EXT = {"png","jpg","jpeg","gif","pdf","txt","log","zip"}
@@ -261,26 +556,73 @@ def upload_attachment(ticket_id: int):
         return jsonify({"error": f"extension .{ext} not allowed"}), 400
 
     safe = secure_filename(f.filename)
-    save_path = os.path.join(UPLOAD_DIR, safe)
-    f.save(save_path)
-
-    with SessionLocal() as db:
-        a = Attachment(ticket_id=ticket_id, filename=safe, path=save_path)
-        db.add(a)
-        db.commit()
-        db.refresh(a)
-        return jsonify(serialize_attachment(a)), 201
+    hf = f.stream if isinstance(f.stream, storage.HashingFile) else storage.HashingFile.from_stream(f.stream)
+    try:
+        with SessionLocal() as db:
+            blob = storage.commit_blob(db, hf)
+            a = Attachment(ticket_id=ticket_id, filename=safe, path=storage.blob_path(blob.sha256), sha256=blob.sha256,
+                           size=hf.size, mime_type=attachments.guess_mime(safe))
+            db.add(a)
+            httpcache.touch_ticket_children(db, ticket_id)
+            db.commit()
+            storage.place_blob(hf)
+            db.refresh(a)
+            attachments.submit(a)
+            return jsonify(serialize_attachment(a)), 201
+    finally:
+        hf.close()
 
 @app.get('/api/attachments/<int:attachment_id>/download')
 @require_auth()
 def download_attachment(attachment_id: int):
+    with SessionLocal() as db:
+        # ids are unique across the hot and archive tables
+        a = db.get(Attachment, attachment_id) or archive.get_attachment(db, attachment_id)
+        if not a:
+            return jsonify({"error": "Not found"}), 404
+    # send_file answers If-None-Match / If-Modified-Since with 304 and serves
+    # Range requests; the body goes out via wsgi.file_wrapper (sendfile) or
+    # X-Sendfile when USE_X_SENDFILE is set
+    return send_file(
+        a.path,
+        as_attachment=True,
+        download_name=a.filename,
+        etag=a.sha256 or True,
+        conditional=True,
+        max_age=Config.ATTACHMENT_MAX_AGE,
+    )
+
+@app.get('/api/attachments/<int:attachment_id>/thumbnail')
+@require_auth(allow_query_token=True)  # loaded by <img>, which cannot send headers
+def attachment_thumbnail(attachment_id: int):
+    with SessionLocal() as db:
+        a = db.get(Attachment, attachment_id) or archive.get_attachment(db, attachment_id)
+        if not a or not a.has_thumbnail:
+            return jsonify({"error": "Not found"}), 404
+    return send_file(
+        storage.thumb_path(a.sha256),
+        mimetype="image/jpeg",
+        etag=f"thumb-{a.sha256}",
+        conditional=True,
+        max_age=Config.ATTACHMENT_MAX_AGE,
+    )
+
+@app.delete('/api/attachments/<int:attachment_id>')
+@require_auth(roles=[Role.TECH.value, Role.ADMIN.value])
+def delete_attachment(attachment_id: int):
     with SessionLocal() as db:
         a = db.get(Attachment, attachment_id)
         if not a:
             return jsonify({"error": "Not found"}), 404
-    directory = os.path.dirname(a.path)
-    filename = os.path.basename(a.path)
-    return send_from_directory(directory, filename, as_attachment=True)
+        digest = a.sha256
+        httpcache.touch_ticket_children(db, a.ticket_id)
+        db.delete(a)
+        db.flush()
+        orphaned = storage.release_blob(db, digest) if digest else False
+        db.commit()
+        if orphaned:
+            storage.delete_blob_file(db, digest)
+        return "", 204
 
 if __name__ == '__main__':
     app.run(host=Config.HOST, port=Config.PORT, debug=(Config.FLASK_ENV == 'development'))
@@ -0,0 +1,138 @@
+import logging
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import delete, func, insert, literal, select, update
+from config import Config
+from db import SessionLocal
+from models import (Attachment, Comment, Ticket, TicketStatus, User, attachments_archive, comments_archive,
+                    tickets_archive)
+import httpcache
+
+log = logging.getLogger(__name__)
+
+# ----- Moving tickets -----
+# A ticket moves with its comments and attachments in one transaction: rows are
+# copied with INSERT ... SELECT and deleted from the hot tables, which also drops
+# them from the search index (the FTS triggers fire on delete). Ids are kept, so
+# links, report rollups and blob reference counts stay valid.
+
+def _copy(db, src, dst, key, ids: list[int], **extra):
+    names = [c.name for c in src.columns]
+    values = [literal(v, dst.c[name].type).label(name) for name, v in extra.items()]
+    db.execute(insert(dst).from_select(names + list(extra), select(*src.columns, *values).where(key.in_(ids))))
+
+def _held_ids(db) -> list[int]:
+    """Tickets owning the highest ticket/comment/attachment id.
+
+    SQLite hands the highest rowid + 1 to the next insert, so deleting the row
+    holding the maximum would let a new row reuse an archived id.
+    """
+    held = [
+        db.scalar(select(func.max(Ticket.id))),
+        db.scalar(select(Comment.ticket_id).order_by(Comment.id.desc()).limit(1)),
+        db.scalar(select(Attachment.ticket_id).order_by(Attachment.id.desc()).limit(1)),
+    ]
+    return [ticket_id for ticket_id in held if ticket_id is not None]
+
+def _eligible(db, cutoff: datetime):
+    return (Ticket.status == TicketStatus.RESOLVED, Ticket.updated_at < cutoff, Ticket.id.not_in(_held_ids(db)))
+
+def archivable(db, cutoff: datetime, limit: int) -> list[int]:
+    """RESOLVED tickets not updated since ``cutoff``, oldest first (walks ix_tickets_status_updated_id)."""
+    return db.scalars(
+        select(Ticket.id).where(*_eligible(db, cutoff)).order_by(Ticket.updated_at, Ticket.id).limit(limit)
+    ).all()
+
+def archive_tickets(db, ticket_ids: list[int]) -> int:
+    """Move tickets and their children to the archive inside the caller's transaction."""
+    if not ticket_ids:
+        return 0
+    _copy(db, Ticket.__table__, tickets_archive, Ticket.id, ticket_ids, archived_at=datetime.utcnow())
+    _copy(db, Comment.__table__, comments_archive, Comment.ticket_id, ticket_ids)
+    _copy(db, Attachment.__table__, attachments_archive, Attachment.ticket_id, ticket_ids)
+    db.execute(delete(Attachment).where(Attachment.ticket_id.in_(ticket_ids)).execution_options(synchronize_session=False))
+    db.execute(delete(Comment).where(Comment.ticket_id.in_(ticket_ids)).execution_options(synchronize_session=False))
+    n = db.execute(delete(Ticket).where(Ticket.id.in_(ticket_ids)).execution_options(synchronize_session=False)).rowcount
+    httpcache.bump(db, "tickets")
+    return n
+
+def restore_tickets(db, ticket_ids: list[int]) -> int:
+    """Move archived tickets back to the hot tables, e.g. to reopen one.
+
+    ``updated_at`` is bumped, so the next archival run does not take them straight back.
+    """
+    if not ticket_ids:
+        return 0
+    hot = {t.name: t for t in (Ticket.__table__, Comment.__table__, Attachment.__table__)}
+    db.execute(insert(hot["tickets"]).from_select(
+        [c.name for c in hot["tickets"].columns],
+        select(*(tickets_archive.c[c.name] for c in hot["tickets"].columns)).where(tickets_archive.c.id.in_(ticket_ids)),
+    ))
+    db.execute(update(Ticket).where(Ticket.id.in_(ticket_ids)).values(updated_at=datetime.utcnow())
+               .execution_options(synchronize_session=False))
+    for name, archived in (("comments", comments_archive), ("attachments", attachments_archive)):
+        _copy(db, archived, hot[name], archived.c.ticket_id, ticket_ids)
+        db.execute(delete(archived).where(archived.c.ticket_id.in_(ticket_ids)))
+    n = db.execute(delete(tickets_archive).where(tickets_archive.c.id.in_(ticket_ids))).rowcount
+    httpcache.bump(db, "tickets")
+    return n
+
+def archive_resolved(older_than_days: int | None = None, batch_size: int | None = None,
+                     dry_run: bool = False, stop: threading.Event | None = None) -> int:
+    """Archive every eligible ticket, one committed batch at a time; returns the number moved
+    (with ``dry_run``, the number that would be)."""
+    days = Config.ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+    batch_size = batch_size or Config.ARCHIVE_BATCH_SIZE
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    if dry_run:
+        with SessionLocal() as db:
+            return db.scalar(select(func.count()).select_from(Ticket).where(*_eligible(db, cutoff)))
+    total = 0
+    while stop is None or not stop.is_set():
+        with SessionLocal() as db:
+            ids = archivable(db, cutoff, batch_size)
+            n = archive_tickets(db, ids)
+            db.commit()
+        total += n
+        if len(ids) < batch_size:
+            break
+    return total
+
+def run_archiver(stop: threading.Event | None = None):
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        try:
+            n = archive_resolved(stop=stop)
+            if n:
+                log.info("archived %d resolved tickets", n)
+        except Exception:
+            log.exception("ticket archival failed")
+        stop.wait(Config.ARCHIVE_INTERVAL_SECONDS)
+
+def start_archiver_thread() -> threading.Event:
+    stop = threading.Event()
+    threading.Thread(target=run_archiver, args=(stop,), name="ticket-archiver", daemon=True).start()
+    return stop
+
+# ----- Reads -----
+ARCHIVED_COMMENT_COLUMNS = (
+    comments_archive.c.id, comments_archive.c.ticket_id, comments_archive.c.user_id, comments_archive.c.content,
+    comments_archive.c.created_at, User.name.label("user_name"), User.email.label("user_email"),
+    User.role.label("user_role"),
+)
+# everything the attachment serializer reads; the extracted text stays behind
+ARCHIVED_ATTACHMENT_COLUMNS = tuple(c for c in attachments_archive.c if c.name != "text_content")
+
+def get_ticket(db, ticket_id: int):
+    return db.execute(select(tickets_archive).where(tickets_archive.c.id == ticket_id)).first()
+
+def comments_query(ticket_id: int):
+    return (select(*ARCHIVED_COMMENT_COLUMNS).outerjoin(User, User.id == comments_archive.c.user_id)
+            .where(comments_archive.c.ticket_id == ticket_id).order_by(comments_archive.c.id))
+
+def get_attachments(db, ticket_id: int) -> list:
+    return db.execute(select(*ARCHIVED_ATTACHMENT_COLUMNS)
+                      .where(attachments_archive.c.ticket_id == ticket_id).order_by(attachments_archive.c.id)).all()
+
+def get_attachment(db, attachment_id: int):
+    return db.execute(select(*ARCHIVED_ATTACHMENT_COLUMNS).where(attachments_archive.c.id == attachment_id)).first()
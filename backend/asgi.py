@@ -0,0 +1,477 @@
+"""ASGI entry point: the same /api contract on Starlette with async SQLAlchemy sessions.
+
+Run from backend/ with ``uvicorn asgi:app``. The hot endpoints (login, tickets,
+comments, uploads, events, users) are native coroutines over aiosqlite/asyncpg,
+so a request waiting on the database, a slow upload or an SSE stream costs a
+coroutine instead of a worker thread. Every other route falls through to the
+Flask app, run in the server's thread pool.
+
+Validation, versioning and write paths are the synchronous helpers the Flask
+views use, called through ``AsyncSession.run_sync``; only the I/O is async.
+Read replicas are not used here: reads go to the primary.
+"""
+import asyncio
+from contextlib import asynccontextmanager, nullcontext
+from functools import wraps
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import selectinload
+from starlette.applications import Starlette
+from starlette.exceptions import HTTPException
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Mount, Route
+from werkzeug.http import parse_etags, parse_options_header, quote_etag
+from werkzeug.sansio.multipart import Data, Epilogue, Field, File, MultipartDecoder, NeedData
+from werkzeug.utils import secure_filename
+from app import (app as flask_app, login_ip_limiter, login_email_limiter, serialize_ticket, serialize_user,
+                 serialize_comment, serialize_attachment, comment_row, USER_COLUMNS, COMMENT_COLUMNS, ALLOWED_EXT)
+from auth import hash_password, verify_password, needs_rehash, create_token, token_cache, HashPoolBusy
+from config import Config
+from db import make_async_engine, note_write
+from httpcache import collection_version, make_etag, response_cache, ticket_version
+from json_provider import dumps_bytes
+from mailer import queue_email
+from models import User, Ticket, Role, Comment, Attachment
+from queries import keyset_page, ticket_list_query
+import archive
+import attachments
+import events
+import httpcache
+import metrics
+import reports
+import storage
+
+try:
+    from a2wsgi import WSGIMiddleware
+except ImportError:  # optional: Starlette's bundled adapter works the same for this app
+    from starlette.middleware.wsgi import WSGIMiddleware
+
+engine = make_async_engine()
+Session = async_sessionmaker(engine, autoflush=False)
+# SQLite has one writer at a time; queueing write transactions here keeps them from
+# holding the lock across awaits while others spin in the busy handler
+_write_gate = asyncio.Lock() if engine.dialect.name == "sqlite" else nullcontext()
+
+MAX_BODY = Config.MAX_CONTENT_LENGTH_MB * 1024 * 1024
+
+# ----- Helpers -----
+def json_response(data, status: int = 200, headers: dict | None = None) -> Response:
+    with metrics.phase("serialize"):
+        body = dumps_bytes(data)
+    return Response(body, status, headers, media_type="application/json")
+
+def error(message: str, status: int, headers: dict | None = None) -> Response:
+    return json_response({"error": message}, status, headers)
+
+async def read_json(request: Request) -> dict:
+    body = await request.body()
+    if not body:
+        return {}
+    try:
+        data = flask_app.json.loads(body)
+    except ValueError:
+        raise HTTPException(400, "Invalid JSON body")
+    return data if isinstance(data, dict) else {}
+
+def rate_limited(*checks) -> Response | None:
+    """Return a 429 response if any (limiter, key) pair is out of tokens."""
+    for limiter, key in checks:
+        allowed, retry_after = limiter.allow(key)
+        if not allowed:
+            return error("Too many attempts, slow down", 429, {"Retry-After": str(max(int(retry_after + 0.999), 1))})
+    return None
+
+def _authenticate(request: Request, allowed: frozenset | None, allow_query_token: bool) -> Response | None:
+    auth_header = request.headers.get("Authorization", "")
+    if auth_header.startswith("Bearer "):
+        token = auth_header[7:]
+    elif allow_query_token and request.query_params.get("access_token"):
+        # EventSource cannot set headers
+        token = request.query_params["access_token"]
+    else:
+        return error("Missing or invalid token", 401)
+    try:
+        with metrics.phase("jwt"):
+            payload = token_cache.decode(token)
+    except Exception as e:
+        return json_response({"error": "Unauthorized", "detail": str(e)}, 401)
+    request.state.user = payload
+    if allowed is not None and payload.get("role") not in allowed:
+        return error("Forbidden", 403)
+    return None
+
+def endpoint(roles: list[str] | None = None, auth: bool = True, allow_query_token: bool = False):
+    """Wrap a handler with the Flask hooks' duties: auth, request metrics and write stickiness."""
+    allowed = frozenset(roles) if roles else None
+    def wrapper(func):
+        @wraps(func)
+        async def inner(request: Request) -> Response:
+            metrics.begin_request(func.__name__)
+            status = 500
+            try:
+                resp = _authenticate(request, allowed, allow_query_token) if auth else None
+                if resp is None:
+                    try:
+                        resp = await func(request)
+                    except HTTPException as e:
+                        resp = error(e.detail, e.status_code)
+                    except HashPoolBusy as e:
+                        resp = error(str(e), 503, {"Retry-After": "1"})
+                status = resp.status_code
+            finally:
+                stats = metrics.end_request(request.method, status)
+            if request.method not in ("GET", "HEAD") and status < 400 and hasattr(request.state, "user"):
+                note_write(request.state.user["sub"])
+            if stats is not None and Config.SERVER_TIMING:
+                resp.headers["Server-Timing"] = metrics.server_timing(stats)
+            return resp
+        return inner
+    return wrapper
+
+async def write(fn):
+    """Run ``fn(db)`` (the synchronous write path, which commits) on a fresh session."""
+    async with _write_gate:
+        async with Session() as db:
+            return await db.run_sync(fn)
+
+async def conditional_json(request: Request, key: str, etag: str, build) -> Response:
+    """httpcache.conditional_json for coroutines: ``build`` is awaited only on a cache miss."""
+    if parse_etags(request.headers.get("If-None-Match")).contains(etag):
+        resp = Response(status_code=304)
+    else:
+        body = response_cache.get(key, etag)
+        if body is None:
+            data = await build()
+            with metrics.phase("serialize"):
+                body = dumps_bytes(data)
+            response_cache.put(key, etag, body)
+        resp = Response(body, media_type="application/json")
+    resp.headers["ETag"] = quote_etag(etag)
+    resp.headers["Cache-Control"] = "private, no-cache"
+    return resp
+
+def stream_rows(q, to_dict) -> StreamingResponse:
+    """Stream a JSON array of ``q``'s rows from a server-side cursor, one partition per chunk."""
+    async def chunks():
+        yield b"["
+        first = True
+        async with Session() as db:
+            result = await db.stream(q.execution_options(yield_per=Config.STREAM_CHUNK_ROWS))
+            async for rows in result.partitions():
+                body = b",".join(dumps_bytes(to_dict(r)) for r in rows)
+                yield body if first else b"," + body
+                first = False
+        yield b"]"
+    return StreamingResponse(chunks(), media_type="application/json")
+
+def _user_id(request: Request) -> int:
+    return int(request.state.user["sub"])
+
+# ----- Auth -----
+@endpoint(auth=False)
+async def login(request: Request):
+    data = await read_json(request)
+    email = data.get('email', '').lower().strip()
+    password = data.get('password', '')
+    limited = rate_limited((login_ip_limiter, request.client.host if request.client else ""), (login_email_limiter, email))
+    if limited:
+        return limited
+    async with Session() as db:
+        user = await db.scalar(select(User).where(User.email == email))
+        # bcrypt runs in a thread (or the hashing pool) so the event loop keeps serving
+        if not user or not await asyncio.to_thread(verify_password, password, user.password_hash):
+            return error("Invalid credentials", 401)
+        # built before a commit expires the user: a lazy refresh can't run outside the greenlet
+        body = {"token": create_token(user.id, user.role.value, user.email), "user": serialize_user(user)}
+        if needs_rehash(user.password_hash):
+            user.password_hash = await asyncio.to_thread(hash_password, password)
+            await db.commit()
+        return json_response(body)
+
+# ----- Users -----
+@endpoint(roles=[Role.ADMIN.value, Role.TECH.value])
+async def list_users(request: Request):
+    role = request.query_params.get("role")
+    q = select(*USER_COLUMNS).order_by(User.id)
+    if role:
+        try:
+            q = q.where(User.role == Role(role))
+        except ValueError:
+            return error(f"unknown role {role}", 400)
+    if request.query_params.get("stream") == "1":
+        return stream_rows(q, lambda r: r._asdict())
+    async with Session() as db:
+        async def build():
+            return [r._asdict() for r in await db.execute(q)]
+        key = f"users:{role or ''}"
+        return await conditional_json(request, key, make_etag(key, await db.run_sync(collection_version, "users")), build)
+
+# ----- Tickets -----
+@endpoint()
+async def create_ticket(request: Request):
+    data = await read_json(request)
+    title = data.get('title', '').strip()
+    description = data.get('description', '').strip()
+    if not title or not description:
+        return error("Title and description are required", 400)
+
+    def create(db):
+        user = db.get(User, _user_id(request))
+        ticket = Ticket(title=title, description=description, creator=user)
+        db.add(ticket)
+        db.flush()
+        reports.track(db, ticket, None, None)
+        httpcache.bump(db, "tickets")
+        queue_email(db, user.email, "Ticket received", f"Hello {user.name}, your ticket #{ticket.id} was created and is OPEN.")
+        db.commit()
+        db.refresh(ticket)
+        data = serialize_ticket(ticket)
+        events.bus.publish("ticket.created", ticket, ticket=data)
+        return data
+
+    return json_response(await write(create))
+
+@endpoint()
+async def list_tickets(request: Request):
+    args = request.query_params
+    try:
+        q, limit, order, creator_id = ticket_list_query(args, _user_id(request))
+        async with Session() as db:
+            async def build():
+                tickets, next_cursor = await db.run_sync(keyset_page, q, limit, args.get('cursor'), order)
+                return {"items": [t._asdict() for t in tickets], "next_cursor": next_cursor}
+            # same key as the Flask view, so both entry points share cached pages
+            key = f"tickets:{creator_id}:{sorted(args.multi_items())}"
+            version = await db.run_sync(collection_version, "tickets")
+            return await conditional_json(request, key, make_etag(key, version), build)
+    except ValueError as e:
+        return error(str(e), 400)
+
+@endpoint()
+async def get_ticket(request: Request):
+    ticket_id = request.path_params["ticket_id"]
+    async with Session() as db:
+        version = await db.run_sync(ticket_version, ticket_id)
+        if version is None:
+            if request.query_params.get("archived") == "1":
+                return await archived_ticket(request, db, ticket_id)
+            return error("Not found", 404)
+        async def build():
+            t = await db.scalar(
+                select(Ticket)
+                .where(Ticket.id == ticket_id)
+                .options(selectinload(Ticket.comments), selectinload(Ticket.attachments))
+            )
+            data = serialize_ticket(t)
+            data["comments"] = [serialize_comment(c) for c in t.comments]
+            data["attachments"] = [serialize_attachment(a) for a in t.attachments]
+            return data
+        key = f"ticket:{ticket_id}"
+        return await conditional_json(request, key, make_etag(key, version), build)
+
+async def archived_ticket(request: Request, db, ticket_id: int):
+    t = await db.run_sync(archive.get_ticket, ticket_id)
+    if t is None:
+        return error("Not found", 404)
+    async def build():
+        data = serialize_ticket(t)
+        data["archived_at"] = t.archived_at.isoformat()
+        data["comments"] = [comment_row(r) for r in await db.execute(archive.comments_query(ticket_id))]
+        data["attachments"] = [serialize_attachment(a) for a in await db.run_sync(archive.get_attachments, ticket_id)]
+        return data
+    key = f"ticket:{ticket_id}:archived"
+    return await conditional_json(request, key, make_etag(key, t.archived_at.isoformat()), build)
+
+# ----- Comments -----
+@endpoint()
+async def list_comments(request: Request):
+    ticket_id = request.path_params["ticket_id"]
+    async with Session() as db:
+        version = await db.run_sync(ticket_version, ticket_id)
+        if version is None:
+            t = await db.run_sync(archive.get_ticket, ticket_id) if request.query_params.get("archived") == "1" else None
+            if t is None:
+                return error("Not found", 404)
+            version, q = t.archived_at.isoformat(), archive.comments_query(ticket_id)
+        else:
+            q = (select(*COMMENT_COLUMNS).outerjoin(User, User.id == Comment.user_id)
+                 .where(Comment.ticket_id == ticket_id).order_by(Comment.id))
+        if request.query_params.get("stream") == "1":
+            return stream_rows(q, comment_row)
+        async def build():
+            return [comment_row(r) for r in await db.execute(q)]
+        key = f"comments:{ticket_id}"
+        return await conditional_json(request, key, make_etag(key, version), build)
+
+@endpoint()
+async def add_comment(request: Request):
+    ticket_id = request.path_params["ticket_id"]
+    data = await read_json(request)
+    content = data.get("content", "").strip()
+    if not content:
+        return error("content required", 400)
+
+    def add(db):
+        t = db.get(Ticket, ticket_id)
+        if not t:
+            return None
+        c = Comment(ticket_id=t.id, user_id=_user_id(request), content=content)
+        db.add(c)
+        httpcache.touch_ticket_children(db, t.id)
+        db.commit()
+        db.refresh(c)
+        data = serialize_comment(c)
+        events.bus.publish("ticket.commented", t, comment=data)
+        return data
+
+    data = await write(add)
+    if data is None:
+        return error("Not found", 404)
+    return json_response(data, 201)
+
+# ----- Events -----
+@endpoint(allow_query_token=True)
+async def stream_events(request: Request):
+    last_id = request.headers.get("Last-Event-ID") or request.query_params.get("last_event_id")
+    try:
+        last_id = int(last_id) if last_id else None
+    except ValueError:
+        return error("Last-Event-ID must be an integer", 400)
+    sub = events.bus.subscribe(request.state.user, asyncio.get_running_loop())
+    return StreamingResponse(
+        events.astream(sub, last_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# ----- Attachments -----
+async def receive_file(request: Request, field: str) -> tuple[str | None, storage.HashingFile | None]:
+    """Stream ``field`` of a multipart body into a HashingFile as the chunks arrive.
+
+    Returns (filename, file); the file is None when the field is missing. Other
+    fields are skipped. The temp-file writes are small page-cache writes and
+    are done inline on the event loop.
+    """
+    mimetype, options = parse_options_header(request.headers.get("Content-Type"))
+    if mimetype != "multipart/form-data" or not options.get("boundary"):
+        return None, None
+    decoder = MultipartDecoder(options["boundary"].encode(), max_form_memory_size=MAX_BODY)
+    filename, hf, target, received = None, None, None, 0
+
+    def consume():
+        nonlocal filename, hf, target
+        while True:
+            event = decoder.next_event()
+            if isinstance(event, (NeedData, Epilogue)):
+                return
+            if isinstance(event, File) and event.name == field and hf is None:
+                filename, hf = event.filename, storage.HashingFile()
+                target = hf
+            elif isinstance(event, (File, Field)):
+                target = None
+            elif isinstance(event, Data) and target is not None:
+                target.write(event.data)
+
+    try:
+        async for chunk in request.stream():
+            if not chunk:
+                continue
+            received += len(chunk)
+            if received > MAX_BODY:
+                raise HTTPException(413, "Request entity too large")
+            decoder.receive_data(chunk)
+            consume()
+        decoder.receive_data(None)
+        consume()
+    except ValueError:
+        if hf is not None:
+            hf.close()
+        raise HTTPException(400, "Malformed multipart body")
+    except BaseException:
+        if hf is not None:
+            hf.close()
+        raise
+    return filename, hf
+
+@endpoint()
+async def upload_attachment(request: Request):
+    ticket_id = request.path_params["ticket_id"]
+    async with Session() as db:
+        if not await db.get(Ticket, ticket_id):
+            return error("Not found", 404)
+    if int(request.headers.get("Content-Length") or 0) > MAX_BODY:
+        return error("Request entity too large", 413)
+
+    filename, hf = await receive_file(request, "file")
+    if hf is None:
+        return error("file field required", 400)
+    try:
+        if filename == '':
+            return error("empty filename", 400)
+        ext = filename.rsplit('.',1)[-1].lower() if '.' in filename else ''
+        if ext not in ALLOWED_EXT:
+            return error(f"extension .{ext} not allowed", 400)
+        safe = secure_filename(filename)
+
+        def save(db):
+            blob = storage.commit_blob(db, hf)
+            a = Attachment(ticket_id=ticket_id, filename=safe, path=storage.blob_path(blob.sha256), sha256=blob.sha256,
+                           size=hf.size, mime_type=attachments.guess_mime(safe))
+            db.add(a)
+            httpcache.touch_ticket_children(db, ticket_id)
+            db.commit()
+            storage.place_blob(hf)
+            db.refresh(a)
+            attachments.submit(a)
+            return serialize_attachment(a)
+
+        return json_response(await write(save), 201)
+    finally:
+        hf.close()
+
+# ----- Flask fallback -----
+class FlaskFallback:
+    """The Flask app for every route without a native handler.
+
+    CORSMiddleware answers for the whole ASGI app, so Flask-Cors's headers are
+    dropped here rather than sent twice.
+    """
+
+    def __init__(self, wsgi_app):
+        self.app = WSGIMiddleware(wsgi_app)
+
+    async def __call__(self, scope, receive, send):
+        async def send_without_cors(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [(k, v) for k, v in message["headers"]
+                                      if not k.lower().startswith(b"access-control-")]
+            await send(message)
+        await self.app(scope, receive, send_without_cors)
+
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    await engine.dispose()
+
+routes = [
+    Route("/api/auth/login", login, methods=["POST"]),
+    Route("/api/users", list_users, methods=["GET"]),
+    Route("/api/tickets", create_ticket, methods=["POST"]),
+    Route("/api/tickets", list_tickets, methods=["GET"]),
+    Route("/api/tickets/{ticket_id:int}", get_ticket, methods=["GET"]),
+    Route("/api/tickets/{ticket_id:int}/comments", list_comments, methods=["GET"]),
+    Route("/api/tickets/{ticket_id:int}/comments", add_comment, methods=["POST"]),
+    Route("/api/tickets/{ticket_id:int}/attachments", upload_attachment, methods=["POST"]),
+    Route("/api/events", stream_events, methods=["GET"]),
+    Mount("/", app=FlaskFallback(flask_app)),
+]
+
+app = Starlette(
+    routes=routes,
+    middleware=[Middleware(CORSMiddleware, allow_origins=Config.CORS_ORIGINS, allow_credentials=True,
+                           allow_methods=["*"], allow_headers=["*"])],
+    lifespan=lifespan,
+)
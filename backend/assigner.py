@@ -0,0 +1,245 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from sqlalchemy import select, update
+from config import Config
+from db import SessionLocal
+from models import Role, Ticket, TicketStatus, User
+from queries import TICKET_COLUMNS
+from reports import RollupDelta
+import events
+import httpcache
+
+log = logging.getLogger(__name__)
+
+POLICIES = ("least-loaded", "round-robin")
+
+# ----- Load balancing -----
+class LoadBalancer:
+    """Chooses the TECH user for the next ticket from a heap ordered by policy.
+
+    ``least-loaded`` ranks techs by (open tickets + 1) / weight, where open means
+    OPEN or IN_PROGRESS; ``round-robin`` by a virtual clock that advances 1/weight
+    per assignment (smooth weighted round-robin). State is loaded from the
+    database once and then kept current from ticket events, so a decision is a
+    heap operation, O(log n), instead of a query.
+
+    Entries are invalidated lazily: each tech carries a version and only the
+    heap entry stamped with the current one is live; stale ones are dropped when
+    they surface or when the heap is rebuilt.
+    """
+
+    def __init__(self, policy: str = "least-loaded"):
+        if policy not in POLICIES:
+            raise ValueError(f"policy must be one of {', '.join(POLICIES)}")
+        self.policy = policy
+        self._lock = threading.Lock()
+        self._weights: dict[int, float] = {}
+        self._load: dict[int, int] = {}       # tech id -> open tickets
+        self._clock: dict[int, float] = {}    # tech id -> virtual time (round-robin)
+        self._owner: dict[int, int] = {}      # open ticket id -> tech id
+        self._version: dict[int, int] = {}
+        self._heap: list[tuple] = []
+        self._seq = itertools.count()
+
+    def load(self, weights: dict[int, float], owners: dict[int, int]):
+        """Replace the state with ``weights`` per tech and ``owners`` (open ticket id -> tech id)."""
+        with self._lock:
+            # techs joining the rotation start level with the current leader, not at 0
+            start = min(self._clock.values(), default=0.0)
+            self._weights = {tech: w for tech, w in weights.items() if w > 0}
+            self._owner = {tid: tech for tid, tech in owners.items() if tech in self._weights}
+            self._load = dict.fromkeys(self._weights, 0)
+            for tech in self._owner.values():
+                self._load[tech] += 1
+            self._clock = {tech: self._clock.get(tech, start) for tech in self._weights}
+            self._version = dict.fromkeys(self._weights, 0)
+            self._rebuild()
+
+    def _key(self, tech: int) -> float:
+        if self.policy == "round-robin":
+            return self._clock[tech]
+        return (self._load[tech] + 1) / self._weights[tech]
+
+    def _push(self, tech: int):
+        # ties go to the tech whose entry is oldest, i.e. the one changed least recently
+        heapq.heappush(self._heap, (self._key(tech), next(self._seq), tech, self._version[tech]))
+
+    def _rebuild(self):
+        self._heap = [(self._key(t), next(self._seq), t, self._version[t]) for t in self._weights]
+        heapq.heapify(self._heap)
+
+    def _touch(self, tech: int):
+        self._version[tech] += 1
+        self._push(tech)
+        if len(self._heap) > 4 * len(self._weights) + 64:
+            self._rebuild()
+
+    def _set_owner(self, ticket_id: int, tech: int | None):
+        old = self._owner.get(ticket_id)
+        if old == tech:
+            return
+        if old is not None:
+            self._load[old] -= 1
+            self._touch(old)
+        if tech is None:
+            self._owner.pop(ticket_id, None)
+        else:
+            self._owner[ticket_id] = tech
+            self._load[tech] += 1
+            self._touch(tech)
+
+    def pick(self) -> int | None:
+        """The tech the next ticket should go to (None when there is no eligible tech)."""
+        with self._lock:
+            while self._heap:
+                _, _, tech, version = self._heap[0]
+                if self._version.get(tech) == version:
+                    return tech
+                heapq.heappop(self._heap)
+            return None
+
+    def assigned(self, ticket_id: int, tech: int):
+        """Record that the scheduler gave ``ticket_id`` to ``tech``."""
+        with self._lock:
+            if tech not in self._weights:
+                return
+            if self.policy == "round-robin":
+                self._clock[tech] += 1 / self._weights[tech]
+            self._set_owner(ticket_id, tech)
+
+    def ticket_changed(self, ticket_id: int, assignee_id: int | None, status):
+        """Apply a ticket's current assignee/status; idempotent, so replays are harmless."""
+        with self._lock:
+            is_open = TicketStatus(status) != TicketStatus.RESOLVED
+            self._set_owner(ticket_id, assignee_id if is_open and assignee_id in self._weights else None)
+
+    def on_event(self, event: events.Event):
+        """EventBus listener: ticket.created / updated / assigned carry the ticket's new state."""
+        ticket = event.data.get("ticket")
+        if ticket is not None:
+            self.ticket_changed(ticket["id"], ticket["assignee_id"], ticket["status"])
+
+    def loads(self) -> dict[int, int]:
+        with self._lock:
+            return dict(self._load)
+
+def tech_weights(db) -> dict[int, float]:
+    techs = db.execute(select(User.id, User.email).where(User.role == Role.TECH)).all()
+    return {uid: Config.ASSIGNER_WEIGHTS.get(email.lower(), 1.0) for uid, email in techs}
+
+def open_owners(db) -> dict[int, int]:
+    """Open ticket id -> TECH assignee, the only per-ticket state the balancer keeps."""
+    rows = db.execute(
+        select(Ticket.id, Ticket.assignee_id)
+        .join(User, User.id == Ticket.assignee_id)
+        .where(Ticket.status != TicketStatus.RESOLVED, User.role == Role.TECH)
+    )
+    return dict(rows.all())
+
+# ----- Scheduler -----
+def assign_batch(db, balancer: LoadBalancer, batch_size: int) -> list:
+    """Assign up to ``batch_size`` of the oldest unassigned OPEN tickets inside the caller's transaction.
+
+    Each claim is a conditional UPDATE, so a ticket assigned or resolved by
+    someone else since the SELECT is skipped rather than overwritten. Returns
+    the assigned tickets as rows of TICKET_COLUMNS.
+    """
+    candidates = db.execute(
+        select(Ticket.id, Ticket.created_at)
+        .where(Ticket.status == TicketStatus.OPEN, Ticket.assignee_id.is_(None))
+        .order_by(Ticket.created_at, Ticket.id)
+        .limit(batch_size)
+    ).all()
+    delta = RollupDelta()
+    assigned = []
+    for ticket_id, created_at in candidates:
+        tech = balancer.pick()
+        if tech is None:
+            break
+        row = db.execute(
+            update(Ticket)
+            .where(Ticket.id == ticket_id, Ticket.assignee_id.is_(None), Ticket.status == TicketStatus.OPEN)
+            .values(assignee_id=tech)
+            .returning(*TICKET_COLUMNS)
+            .execution_options(synchronize_session=False)
+        ).first()
+        if row is None:
+            continue
+        balancer.assigned(ticket_id, tech)
+        delta.ticket_changed(created_at, TicketStatus.OPEN, None, TicketStatus.OPEN, tech)
+        assigned.append(row)
+    if assigned:
+        delta.apply(db)
+        httpcache.bump(db, "tickets")
+    return assigned
+
+class Scheduler:
+    """Periodically hands unassigned OPEN tickets to TECH users through a LoadBalancer.
+
+    In the API process the balancer follows every ticket event; assignments made
+    by other processes are picked up by a full reload every ASSIGNER_RESYNC_SECONDS.
+    """
+
+    def __init__(self, policy: str | None = None, batch_size: int | None = None):
+        self.balancer = LoadBalancer(policy or Config.ASSIGNER_POLICY)
+        self.batch_size = batch_size or Config.ASSIGNER_BATCH_SIZE
+        self._synced_at: float | None = None
+
+    def __enter__(self):
+        events.bus.add_listener(self.balancer.on_event)
+        return self
+
+    def __exit__(self, *exc):
+        events.bus.remove_listener(self.balancer.on_event)
+
+    def sync(self):
+        with SessionLocal() as db:
+            self.balancer.load(tech_weights(db), open_owners(db))
+        self._synced_at = time.monotonic()
+
+    def run_once(self, dry_run: bool = False) -> list[dict]:
+        """Assign one batch; with ``dry_run`` the decisions are rolled back and not announced."""
+        if self._synced_at is None or time.monotonic() - self._synced_at >= Config.ASSIGNER_RESYNC_SECONDS:
+            self.sync()
+        with SessionLocal() as db:
+            try:
+                assigned = assign_batch(db, self.balancer, self.batch_size)
+                if dry_run:
+                    db.rollback()
+                else:
+                    db.commit()
+            except Exception:
+                db.rollback()
+                self._synced_at = None  # the balancer counted assignments that did not happen
+                raise
+        if dry_run:
+            self._synced_at = None
+        else:
+            for row in assigned:
+                events.bus.publish("ticket.assigned", row, ticket=row._asdict())
+        return [row._asdict() for row in assigned]
+
+def run_scheduler(stop: threading.Event | None = None, once: bool = False, scheduler: Scheduler | None = None):
+    stop = stop or threading.Event()
+    with scheduler or Scheduler() as scheduler:
+        while not stop.is_set():
+            try:
+                assigned = scheduler.run_once()
+            except Exception:
+                log.exception("ticket assignment failed")
+                assigned = []
+            if once:
+                return assigned
+            if assigned:
+                log.info("assigned %d tickets", len(assigned))
+            # keep going while batches come back full, otherwise idle
+            if len(assigned) < scheduler.batch_size:
+                stop.wait(Config.ASSIGNER_INTERVAL_SECONDS)
+
+def start_scheduler_thread() -> threading.Event:
+    stop = threading.Event()
+    threading.Thread(target=run_scheduler, args=(stop,), name="ticket-assigner", daemon=True).start()
+    return stop
@@ -0,0 +1,208 @@
+import logging
+import mimetypes
+import os
+import threading
+import zipfile
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+from sqlalchemy import select, update
+from config import Config
+from db import SessionLocal
+from models import Attachment, Blob, Ticket
+import events
+import storage
+from httpcache import touch_ticket_children
+
+try:
+    from PIL import Image
+except ImportError:  # optional: uploads are processed without thumbnails
+    Image = None
+
+log = logging.getLogger(__name__)
+
+# ----- Inspection (runs in the worker processes) -----
+# Thumbnails, text extraction and zip listings are derived from the stored blob
+# after the upload has been answered, so a large image or archive never holds a
+# request thread. Everything here touches files only; results go back to the
+# parent, which writes them to the database.
+
+SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"%PDF-", "application/pdf"),
+    (b"PK\x03\x04", "application/zip"),
+    (b"PK\x05\x06", "application/zip"),  # empty archive
+)
+SIGNED_TYPES = {mime for _, mime in SIGNATURES}
+IMAGE_TYPES = {"image/png", "image/jpeg", "image/gif"}
+TEXT_EXT = {"txt", "log"}
+
+def guess_mime(filename: str) -> str:
+    return mimetypes.guess_type(filename)[0] or "application/octet-stream"
+
+def sniff_mime(head: bytes, filename: str) -> str:
+    """MIME type from the file's magic bytes, falling back to its extension."""
+    for magic, mime in SIGNATURES:
+        if head.startswith(magic):
+            return mime
+    guessed = guess_mime(filename)
+    # a .png without the PNG signature is not an image, whatever its name says
+    return "application/octet-stream" if guessed in SIGNED_TYPES else guessed
+
+def make_thumbnail(path: str, dest: str, size: int) -> bool:
+    """Write a JPEG no larger than ``size`` x ``size`` to ``dest``; False if the image can't be read."""
+    if Image is None:
+        return False
+    if os.path.exists(dest):
+        return True  # same content was thumbnailed before
+    try:
+        with Image.open(path) as img:
+            img.draft("RGB", (size, size))  # JPEG: decode at a reduced scale
+            img.thumbnail((size, size))
+            if img.mode in ("RGBA", "LA", "P"):
+                img = img.convert("RGBA")
+                background = Image.new("RGB", img.size, "white")
+                background.paste(img, mask=img.getchannel("A"))
+                img = background
+            elif img.mode != "RGB":
+                img = img.convert("RGB")
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            tmp = f"{dest}.{os.getpid()}.tmp"
+            img.save(tmp, "JPEG", quality=80, optimize=True)
+            os.replace(tmp, dest)
+        return True
+    except (OSError, ValueError, Image.DecompressionBombError) as exc:
+        log.warning("no thumbnail for %s: %s", path, exc)
+        return False
+
+def extract_text(path: str, max_bytes: int) -> str:
+    with open(path, "rb") as f:
+        data = f.read(max_bytes)
+    return data.decode("utf-8", errors="replace").replace("\x00", "")
+
+def list_zip(path: str, max_entries: int) -> list[dict] | None:
+    try:
+        with zipfile.ZipFile(path) as zf:
+            return [
+                {"name": info.filename, "size": info.file_size, "compressed_size": info.compress_size}
+                for info in zf.infolist()[:max_entries]
+            ]
+    except (zipfile.BadZipFile, OSError) as exc:
+        log.warning("cannot list %s: %s", path, exc)
+        return None
+
+def inspect_file(path: str, filename: str, thumb: str | None, thumb_size: int, text_max_bytes: int, zip_max_entries: int) -> dict:
+    """Everything derived from one blob, as plain values for the parent process."""
+    with open(path, "rb") as f:
+        head = f.read(16)
+    mime = sniff_mime(head, filename)
+    ext = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+    result = {"size": os.path.getsize(path), "mime_type": mime, "has_thumbnail": False, "text_content": None, "entries": None}
+    if mime in IMAGE_TYPES and thumb:
+        result["has_thumbnail"] = make_thumbnail(path, thumb, thumb_size)
+    elif mime == "application/zip":
+        result["entries"] = list_zip(path, zip_max_entries)
+    elif ext in TEXT_EXT:
+        result["mime_type"] = "text/plain"
+        result["text_content"] = extract_text(path, text_max_bytes)
+    return result
+
+# ----- Worker pool -----
+_pool: Executor | None = None
+# results are written to the database on their own thread: done-callbacks run on
+# the process pool's management thread, which must not wait on the database
+_writer: ThreadPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+def _get_pool() -> Executor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            if Config.ATTACHMENT_WORKERS > 0:
+                _pool = ProcessPoolExecutor(max_workers=Config.ATTACHMENT_WORKERS)
+            else:
+                _pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="attachments")
+        return _pool
+
+def _get_writer() -> ThreadPoolExecutor:
+    global _writer
+    with _pool_lock:
+        if _writer is None:
+            _writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="attachment-results")
+        return _writer
+
+def _inspect(a: Attachment) -> tuple:
+    # attachments from before the blob store have no digest to key a thumbnail by
+    thumb = storage.thumb_path(a.sha256) if a.sha256 else None
+    return (
+        inspect_file, a.path, a.filename, thumb,
+        Config.THUMBNAIL_SIZE, Config.ATTACHMENT_TEXT_MAX_KB * 1024, Config.ATTACHMENT_ZIP_MAX_ENTRIES,
+    )
+
+def _drop_stray_thumbnail(db, digest: str | None):
+    # the blob was deleted while the worker ran, after delete_blob_file removed its thumbnail
+    if digest and db.get(Blob, digest) is None:
+        try:
+            os.unlink(storage.thumb_path(digest))
+        except FileNotFoundError:
+            pass
+
+def store_result(attachment_id: int, digest: str | None, result: dict) -> bool:
+    """Save a worker's result and announce it; False when the attachment was deleted meanwhile."""
+    with SessionLocal() as db:
+        ticket_id = db.execute(
+            update(Attachment)
+            .where(Attachment.id == attachment_id)
+            .values(**result, processed_at=datetime.utcnow())
+            .returning(Attachment.ticket_id)
+            .execution_options(synchronize_session=False)
+        ).scalar()
+        if ticket_id is None:
+            db.rollback()
+            if result["has_thumbnail"]:
+                _drop_stray_thumbnail(db, digest)
+            return False
+        touch_ticket_children(db, ticket_id)
+        t = db.execute(select(Ticket.id, Ticket.creator_id, Ticket.assignee_id).where(Ticket.id == ticket_id)).first()
+        db.commit()
+    payload = {k: v for k, v in result.items() if k != "text_content"}
+    events.bus.publish("attachment.processed", t, attachment={"id": attachment_id, "ticket_id": ticket_id, **payload})
+    return True
+
+def _store(attachment_id: int, digest: str | None, future: Future):
+    try:
+        store_result(attachment_id, digest, future.result())
+    except Exception:
+        log.exception("processing attachment %s failed", attachment_id)
+
+def _hand_off(attachment_id: int, digest: str | None, future: Future):
+    _get_writer().submit(_store, attachment_id, digest, future)
+
+def submit(a: Attachment) -> Future:
+    """Queue post-processing for a committed attachment; returns at once."""
+    future = _get_pool().submit(*_inspect(a))
+    future.add_done_callback(partial(_hand_off, a.id, a.sha256))
+    return future
+
+def process_pending(reprocess: bool = False, pool: Executor | None = None) -> int:
+    """Process attachments that have no results yet (all of them with ``reprocess``), waiting for each.
+
+    For backfills from the CLI; the API queues new uploads with ``submit``.
+    """
+    q = select(Attachment).order_by(Attachment.id)
+    if not reprocess:
+        q = q.where(Attachment.processed_at.is_(None))
+    with SessionLocal() as db:
+        jobs = [(a.id, a.sha256, _inspect(a)) for a in db.scalars(q)]
+    pool = pool or _get_pool()
+    futures = [(attachment_id, digest, pool.submit(*job)) for attachment_id, digest, job in jobs]
+    done = 0
+    for attachment_id, digest, future in futures:
+        try:
+            done += store_result(attachment_id, digest, future.result())
+        except Exception:
+            log.exception("processing attachment %s failed", attachment_id)
+    return done
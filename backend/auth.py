@@ -1,13 +1,66 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor
 from datetime import datetime, timezone
 from passlib.hash import bcrypt
 import jwt
 from config import Config
+import metrics
+
+# ----- Password hashing -----
+# bcrypt is CPU bound (hundreds of ms per call at cost 12); running it on a
+# small process pool keeps request threads and other endpoints responsive
+# while a login storm is being hashed. HASH_QUEUE_MAX bounds in-flight jobs.
+
+class HashPoolBusy(Exception):
+    pass
+
+def _hash(password: str, rounds: int) -> str:
+    return bcrypt.using(rounds=rounds).hash(password)
+
+def _verify(password: str, password_hash: str) -> bool:
+    return bcrypt.verify(password, password_hash)
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+_pool_slots = threading.BoundedSemaphore(max(Config.HASH_QUEUE_MAX, 1))
+
+def _run_hashing(fn, *args):
+    with metrics.phase("bcrypt"):
+        return _submit_hashing(fn, *args)
+
+def _submit_hashing(fn, *args):
+    global _pool
+    if Config.HASH_WORKERS <= 0:
+        return fn(*args)
+    if not _pool_slots.acquire(timeout=Config.HASH_QUEUE_TIMEOUT_SECONDS):
+        raise HashPoolBusy("password hashing is saturated, retry shortly")
+    try:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(max_workers=Config.HASH_WORKERS)
+        return _pool.submit(fn, *args).result()
+    finally:
+        _pool_slots.release()
 
 def hash_password(password: str) -> str:
-    return bcrypt.hash(password)
+    return _run_hashing(_hash, password, Config.BCRYPT_ROUNDS)
 
 def verify_password(password: str, password_hash: str) -> bool:
-    return bcrypt.verify(password, password_hash)
+    return _run_hashing(_verify, password, password_hash)
+
+def hash_passwords(passwords: list[str], pool: Executor | None = None) -> list[str]:
+    """Hash a batch of passwords for bulk imports, spread over ``pool`` when given."""
+    rounds = [Config.BCRYPT_ROUNDS] * len(passwords)
+    if pool is None or len(passwords) < 2:
+        return list(map(_hash, passwords, rounds))
+    return list(pool.map(_hash, passwords, rounds, chunksize=8))
+
+def needs_rehash(password_hash: str) -> bool:
+    """True when the stored hash was made with a different BCRYPT_ROUNDS."""
+    return bcrypt.using(rounds=Config.BCRYPT_ROUNDS).needs_update(password_hash)
 
 def create_token(user_id: int, role: str, email: str):
     now = datetime.now(tz=timezone.utc)
@@ -22,3 +75,58 @@ def create_token(user_id: int, role: str, email: str):
 
 def decode_token(token: str):
     return jwt.decode(token, Config.JWT_SECRET, algorithms=["HS256"])
+
+# ----- Verified token cache -----
+class TokenCache:
+    """LRU of verified JWT payloads keyed by the token's SHA-256.
+
+    An entry never outlives the token's own ``exp`` (nor TOKEN_CACHE_TTL_SECONDS),
+    so a cache hit is exactly as valid as a fresh ``jwt.decode``.
+    """
+
+    def __init__(self, maxsize: int, ttl: int):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[bytes, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def decode(self, token: str) -> dict:
+        key = hashlib.sha256(token.encode()).digest()
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry:
+                del self._entries[key]
+            self.misses += 1
+        payload = decode_token(token)
+        expires = min(payload.get("exp", now), now + self.ttl)
+        if self.maxsize and expires > now:
+            with self._lock:
+                self._entries[key] = (expires, payload)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return payload
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            }
+
+token_cache = TokenCache(Config.TOKEN_CACHE_SIZE, Config.TOKEN_CACHE_TTL_SECONDS)
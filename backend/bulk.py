@@ -0,0 +1,99 @@
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import select, update, case
+from config import Config
+from mailer import queue_email
+from models import Ticket, TicketStatus, User
+from queries import filter_tickets, parse_filter
+from reports import RollupDelta
+from httpcache import bump
+
+def _int(value, field: str) -> int:
+    # JSON bodies can carry anything; bools are ints to Python but never ids
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(f"{field} must be an integer")
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"{field} must be an integer")
+
+def bulk_update(db, changes: dict, ids: list[int] | None = None, where: dict | None = None) -> tuple[list[dict], list[Ticket]]:
+    """Apply ``changes`` (status and/or assignee_id) to many tickets in one UPDATE.
+
+    Targets are ``ids`` or every ticket matching ``where``. Creators of tickets
+    that become RESOLVED get one coalesced email each. Runs in the caller's
+    transaction; returns per-ticket results and the updated tickets.
+    """
+    if not changes or set(changes) - {"status", "assignee_id"}:
+        raise ValueError("set must contain status and/or assignee_id")
+    if ids is None and where is None:
+        raise ValueError("ids or where required")
+    # an empty selection must not fall through to "every ticket"
+    if ids is not None:
+        if not ids:
+            raise ValueError("ids must not be empty")
+        ids = [_int(i, "ids") for i in ids]
+    if where is not None:
+        where_filter = parse_filter(where)
+        if not any(where_filter.values()):
+            raise ValueError("where must contain at least one filter")
+    values = {}
+    if "status" in changes:
+        values["status"] = TicketStatus(changes["status"])
+    if "assignee_id" in changes:
+        assignee_id = changes["assignee_id"]
+        if assignee_id is not None:
+            assignee_id = _int(assignee_id, "assignee_id")
+            if db.get(User, assignee_id) is None:
+                raise ValueError(f"assignee {assignee_id} not found")
+        values["assignee_id"] = assignee_id
+
+    q = select(Ticket.id, Ticket.status, Ticket.creator_id, Ticket.assignee_id, Ticket.created_at)
+    if ids is not None:
+        q = q.where(Ticket.id.in_(ids))
+    if where is not None:
+        q = filter_tickets(q, **where_filter)
+    q = q.order_by(Ticket.id).limit(Config.BULK_MAX_TICKETS + 1).with_for_update()
+    targets = db.execute(q).all()
+    if len(targets) > Config.BULK_MAX_TICKETS:
+        raise ValueError(f"more than {Config.BULK_MAX_TICKETS} tickets match; narrow the selection")
+
+    target_ids = [t.id for t in targets]
+    if target_ids:
+        now = values["updated_at"] = datetime.utcnow()
+        if "status" in values:
+            # SET sees the old row, so only tickets newly resolved get a timestamp
+            values["resolved_at"] = (case((Ticket.status == TicketStatus.RESOLVED, Ticket.resolved_at), else_=now)
+                                     if values["status"] == TicketStatus.RESOLVED else None)
+        rollups = RollupDelta()
+        for t in targets:
+            new_status = values.get("status", t.status)
+            new_assignee = values.get("assignee_id", t.assignee_id)
+            if (new_status, new_assignee) != (t.status, t.assignee_id):
+                rollups.ticket_changed(t.created_at, t.status, t.assignee_id, new_status, new_assignee, now)
+        rollups.apply(db)
+        bump(db, "tickets")
+        db.execute(update(Ticket).where(Ticket.id.in_(target_ids)).values(**values)
+                   .execution_options(synchronize_session=False))
+
+    if values.get("status") == TicketStatus.RESOLVED:
+        resolved = defaultdict(list)
+        for t in targets:
+            if t.status != TicketStatus.RESOLVED:
+                resolved[t.creator_id].append(t.id)
+        if resolved:
+            creators = db.execute(select(User.id, User.name, User.email).where(User.id.in_(resolved))).all()
+            for creator in creators:
+                ticket_ids = resolved[creator.id]
+                if len(ticket_ids) == 1:
+                    body = f"Hello {creator.name}, your ticket #{ticket_ids[0]} has been RESOLVED."
+                else:
+                    body = f"Hello {creator.name}, your tickets {', '.join(f'#{i}' for i in ticket_ids)} have been RESOLVED."
+                queue_email(db, creator.email, "Ticket resolved", body)
+
+    found = set(target_ids)
+    results = [{"id": i, "result": "updated"} for i in target_ids]
+    if ids is not None:
+        results += [{"id": i, "result": "not_found"} for i in dict.fromkeys(ids) if i not in found]
+    updated = db.scalars(select(Ticket).where(Ticket.id.in_(target_ids)).order_by(Ticket.id)).all() if target_ids else []
+    return results, updated
@@ -11,10 +11,42 @@ class Config:
 
     # PostgreSQL expected in production
     DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///smartcampus.db")
+    # connection pool per process; size it to the number of request threads
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 10))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "0") == "1"
+    # applied to every new SQLite connection; empty to disable
+    SQLITE_PRAGMAS = [p.strip() for p in os.getenv(
+        "SQLITE_PRAGMAS", "journal_mode=WAL,synchronous=NORMAL,busy_timeout=5000,cache_size=-20000,temp_store=MEMORY"
+    ).split(",") if p.strip()]
+    # optional read replicas for list/detail reads; lagging or unreachable ones are skipped
+    DATABASE_READ_URLS = [u.strip() for u in os.getenv("DATABASE_READ_URLS", "").split(",") if u.strip()]
+    DB_REPLICA_MAX_LAG_SECONDS = float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", 5))
+    DB_REPLICA_CHECK_SECONDS = float(os.getenv("DB_REPLICA_CHECK_SECONDS", 5))
+    # apply Alembic migrations (backend/migrations) on startup; turn off when deploys
+    # run `alembic upgrade head` themselves
+    DB_AUTO_MIGRATE = os.getenv("DB_AUTO_MIGRATE", "1") == "1"
 
     JWT_SECRET = os.getenv("JWT_SECRET", "dev_secret")
     JWT_EXPIRES_MIN = int(os.getenv("JWT_EXPIRES_MIN", 60 * 24))
     JWT_EXPIRES_DELTA = timedelta(minutes=JWT_EXPIRES_MIN)
+    # password hashing: bcrypt cost and the process pool it runs on (0 workers = inline)
+    BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+    HASH_WORKERS = int(os.getenv("HASH_WORKERS", min(4, os.cpu_count() or 1)))
+    HASH_QUEUE_MAX = int(os.getenv("HASH_QUEUE_MAX", 64))
+    HASH_QUEUE_TIMEOUT_SECONDS = float(os.getenv("HASH_QUEUE_TIMEOUT_SECONDS", 5))
+
+    # token-bucket limits for login/register, per client IP and per email
+    LOGIN_RATE_PER_MINUTE = float(os.getenv("LOGIN_RATE_PER_MINUTE", 10))
+    LOGIN_BURST = int(os.getenv("LOGIN_BURST", 5))
+    LOGIN_IP_RATE_PER_MINUTE = float(os.getenv("LOGIN_IP_RATE_PER_MINUTE", 60))
+    LOGIN_IP_BURST = int(os.getenv("LOGIN_IP_BURST", 20))
+
+    # verified-token cache; 0 disables it
+    TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 10000))
+    TOKEN_CACHE_TTL_SECONDS = int(os.getenv("TOKEN_CACHE_TTL_SECONDS", 300))
 
     CORS_ORIGINS = [o.strip() for o in os.getenv("CORS_ORIGINS", "*").split(",")] 
 
@@ -23,6 +55,66 @@ class Config:
     SMTP_USER = os.getenv("SMTP_USER")
     SMTP_PASS = os.getenv("SMTP_PASS")
     SMTP_FROM = os.getenv("SMTP_FROM", "Smart Campus <noreply@smartcampus.test>")
+    SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", 10))
+
+    # outbound mail queue: "thread" drains it inside the API process,
+    # "off" leaves it to `python scripts/cli.py mail worker`
+    MAIL_WORKER = os.getenv("MAIL_WORKER", "thread")
+    MAIL_BATCH_SIZE = int(os.getenv("MAIL_BATCH_SIZE", 50))
+    MAIL_POLL_SECONDS = float(os.getenv("MAIL_POLL_SECONDS", 2))
+    MAIL_MAX_ATTEMPTS = int(os.getenv("MAIL_MAX_ATTEMPTS", 6))
+    MAIL_BACKOFF_SECONDS = int(os.getenv("MAIL_BACKOFF_SECONDS", 30))
+    MAIL_BACKOFF_MAX_SECONDS = int(os.getenv("MAIL_BACKOFF_MAX_SECONDS", 3600))
+    MAIL_LEASE_SECONDS = int(os.getenv("MAIL_LEASE_SECONDS", 300))
+
+    # automatic assignment of OPEN tickets to TECH users: "thread" runs the scheduler inside
+    # the API process, "off" leaves it to `python scripts/cli.py assign`; policy "least-loaded"
+    # or "round-robin"; ASSIGNER_WEIGHTS="email=2,email=0.5" (default 1, 0 = never assign)
+    ASSIGNER = os.getenv("ASSIGNER", "off")
+    ASSIGNER_POLICY = os.getenv("ASSIGNER_POLICY", "least-loaded")
+    ASSIGNER_WEIGHTS = {e.strip().lower(): float(w) for e, w in
+                        (item.split("=", 1) for item in os.getenv("ASSIGNER_WEIGHTS", "").split(",") if item.strip())}
+    ASSIGNER_BATCH_SIZE = int(os.getenv("ASSIGNER_BATCH_SIZE", 100))
+    ASSIGNER_INTERVAL_SECONDS = float(os.getenv("ASSIGNER_INTERVAL_SECONDS", 30))
+    ASSIGNER_RESYNC_SECONDS = float(os.getenv("ASSIGNER_RESYNC_SECONDS", 300))
+
+    # archival of RESOLVED tickets (with comments and attachments) into the *_archive tables:
+    # "thread" runs it inside the API process, "off" leaves it to `python scripts/cli.py archive`
+    ARCHIVE = os.getenv("ARCHIVE", "off")
+    ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", 180))
+    ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", 500))
+    ARCHIVE_INTERVAL_SECONDS = float(os.getenv("ARCHIVE_INTERVAL_SECONDS", 3600))
+
+    TICKETS_PAGE_SIZE = int(os.getenv("TICKETS_PAGE_SIZE", 50))
+    TICKETS_PAGE_MAX = int(os.getenv("TICKETS_PAGE_MAX", 200))
+    STREAM_CHUNK_ROWS = int(os.getenv("STREAM_CHUNK_ROWS", 1000))
+    BULK_MAX_TICKETS = int(os.getenv("BULK_MAX_TICKETS", 1000))
+
+    # serialized JSON responses kept for ETag revalidation; 0 disables it
+    RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", 2048))
+
+    # server-sent events (GET /api/events)
+    EVENTS_BUFFER_SIZE = int(os.getenv("EVENTS_BUFFER_SIZE", 1000))
+    EVENTS_SUBSCRIBER_QUEUE = int(os.getenv("EVENTS_SUBSCRIBER_QUEUE", 256))
+    EVENTS_HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", 15))
+    EVENTS_RETRY_MS = int(os.getenv("EVENTS_RETRY_MS", 3000))
+
+    # instrumentation: GET /metrics (Prometheus text; bearer METRICS_TOKEN when set, loopback only otherwise),
+    # slow-query log threshold (0 = off), Server-Timing header and admin ?__profile=1|flame
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+    SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", 200))
+    SERVER_TIMING = os.getenv("SERVER_TIMING", "0") == "1"
+    PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "1") == "1"
 
     UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploads")
     MAX_CONTENT_LENGTH_MB = int(os.getenv("MAX_CONTENT_LENGTH_MB", 10))
+    # let a fronting server (nginx/Apache) send attachment bodies via X-Sendfile
+    USE_X_SENDFILE = os.getenv("USE_X_SENDFILE", "0") == "1"
+    ATTACHMENT_MAX_AGE = int(os.getenv("ATTACHMENT_MAX_AGE", 3600))
+
+    # post-processing after upload (thumbnails, text for search, zip listings) on a
+    # process pool; 0 workers = one background thread instead
+    ATTACHMENT_WORKERS = int(os.getenv("ATTACHMENT_WORKERS", 2))
+    THUMBNAIL_SIZE = int(os.getenv("THUMBNAIL_SIZE", 320))
+    ATTACHMENT_TEXT_MAX_KB = int(os.getenv("ATTACHMENT_TEXT_MAX_KB", 256))
+    ATTACHMENT_ZIP_MAX_ENTRIES = int(os.getenv("ATTACHMENT_ZIP_MAX_ENTRIES", 500))
@@ -1,9 +1,261 @@
-from sqlalchemy import create_engine
+import itertools
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from config import Config
+import metrics
 
 class Base(DeclarativeBase):
     pass
 
-engine = create_engine(Config.DATABASE_URL, pool_pre_ping=True)
+log = logging.getLogger(__name__)
+
+def _engine_options(url: str) -> dict:
+    options = {"pool_pre_ping": Config.DB_POOL_PRE_PING}
+    if make_url(url).get_backend_name() != "sqlite":
+        options.update(
+            pool_size=Config.DB_POOL_SIZE,
+            max_overflow=Config.DB_MAX_OVERFLOW,
+            pool_timeout=Config.DB_POOL_TIMEOUT,
+            # recycling before the server's idle timeout replaces most of what pre-ping was catching
+            pool_recycle=Config.DB_POOL_RECYCLE,
+        )
+    return options
+
+def _sqlite_pragmas(dbapi_conn, connection_record):
+    cursor = dbapi_conn.cursor()
+    for pragma in Config.SQLITE_PRAGMAS:
+        cursor.execute(f"PRAGMA {pragma}")
+    cursor.close()
+
+# query timing feeds metrics: per-request counts, durations and the slow-query log
+def _instrument(e):
+    def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    def record_query(conn, cursor, statement, parameters, context, executemany):
+        metrics.record_query(statement, time.perf_counter() - conn.info["query_started"].pop())
+
+    def discard_query_timer(context):
+        # the statement failed, so after_cursor_execute won't pop its start time; statements
+        # on one connection don't nest, so a start time left on it belongs to this one
+        if context.connection is not None:
+            started = context.connection.info.get("query_started")
+            if started:
+                started.pop()
+
+    event.listen(e, "before_cursor_execute", start_query_timer)
+    event.listen(e, "after_cursor_execute", record_query)
+    event.listen(e, "handle_error", discard_query_timer)
+
+# every engine this process opened, for count_queries()
+_engines = []
+
+def make_engine(url: str):
+    e = create_engine(url, **_engine_options(url))
+    if e.dialect.name == "sqlite" and Config.SQLITE_PRAGMAS:
+        event.listen(e, "connect", _sqlite_pragmas)
+    _instrument(e)
+    _engines.append(e)
+    return e
+
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+def make_async_engine(url: str = Config.DATABASE_URL):
+    """An AsyncEngine for the same database, over aiosqlite/asyncpg (the ASGI entry point)."""
+    from sqlalchemy.ext.asyncio import create_async_engine
+    sync_url = make_url(url)
+    async_url = sync_url.set(drivername=ASYNC_DRIVERS.get(sync_url.get_backend_name(), sync_url.drivername))
+    options = _engine_options(url)
+    if sync_url.get_backend_name() == "sqlite" and sync_url.database not in (None, "", ":memory:"):
+        # aiosqlite defaults to NullPool: a new connection (and thread, and pragmas) per session
+        options["poolclass"] = AsyncAdaptedQueuePool
+    e = create_async_engine(async_url, **options)
+    if e.dialect.name == "sqlite" and Config.SQLITE_PRAGMAS:
+        event.listen(e.sync_engine, "connect", _sqlite_pragmas)
+    _instrument(e.sync_engine)
+    _engines.append(e.sync_engine)
+    return e
+
+engine = make_engine(Config.DATABASE_URL)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+# ----- Schema migrations -----
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), "migrations")
+BASELINE_REVISION = "0001"
+
+def migrate(bind=None, revision: str = "head"):
+    """Upgrade the schema to ``revision`` with Alembic (backend/migrations).
+
+    Databases created by ``create_all`` before there were migrations have tables
+    but no alembic_version; they are stamped at the baseline first and the next
+    revision only adds what they lack.
+    """
+    from alembic import command
+    from alembic.config import Config as AlembicConfig
+    cfg = AlembicConfig(os.path.join(os.path.dirname(__file__), "alembic.ini"))
+    cfg.set_main_option("script_location", MIGRATIONS_DIR)
+    cfg.attributes["configure_logger"] = False
+    with (bind or engine).begin() as conn:
+        if conn.dialect.name == "postgresql":
+            # several workers starting at once: one migrates, the others wait and find nothing to do
+            conn.execute(text("SELECT pg_advisory_xact_lock(hashtext('smartcampus.migrate'))"))
+        cfg.attributes["connection"] = conn
+        tables = inspect(conn).get_table_names()
+        if "users" in tables and "alembic_version" not in tables:
+            command.stamp(cfg, BASELINE_REVISION)
+        command.upgrade(cfg, revision)
+
+# ----- Read replicas -----
+def _replica_lag(conn) -> float:
+    """Seconds the replica is behind its primary (0 for databases without streaming replication)."""
+    if conn.dialect.name != "postgresql":
+        return 0.0
+    # an idle primary makes replay_timestamp look old, so "fully replayed" counts as no lag
+    return float(conn.execute(text(
+        "SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+        "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+    )).scalar())
+
+class ReplicaSet:
+    """Read-only engines, used round-robin while their replication lag is acceptable.
+
+    Lag is re-checked at most every DB_REPLICA_CHECK_SECONDS by whichever request
+    gets there first; the others keep using the last known healthy set. With no
+    healthy replica, reads go to the primary.
+    """
+
+    def __init__(self, urls: list[str], max_lag: float, check_seconds: float):
+        self.engines = [make_engine(url) for url in urls]
+        self.max_lag = max_lag
+        self.check_seconds = check_seconds
+        self.healthy = list(self.engines)
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._turn = itertools.count()
+
+    def _check(self):
+        healthy = []
+        for e in self.engines:
+            try:
+                with e.connect() as conn:
+                    lag = _replica_lag(conn)
+            except SQLAlchemyError as exc:
+                log.warning("read replica %s unavailable: %s", e.url.render_as_string(hide_password=True), exc)
+                continue
+            if lag > self.max_lag:
+                log.warning("read replica %s is %.1fs behind, skipping", e.url.render_as_string(hide_password=True), lag)
+                continue
+            healthy.append(e)
+        self.healthy = healthy
+
+    def pick(self):
+        if time.monotonic() - self._checked_at >= self.check_seconds and self._lock.acquire(blocking=False):
+            try:
+                self._check()
+                self._checked_at = time.monotonic()
+            finally:
+                self._lock.release()
+        healthy = self.healthy
+        return healthy[next(self._turn) % len(healthy)] if healthy else None
+
+replicas = ReplicaSet(Config.DATABASE_READ_URLS, Config.DB_REPLICA_MAX_LAG_SECONDS,
+                      Config.DB_REPLICA_CHECK_SECONDS) if Config.DATABASE_READ_URLS else None
+
+# clients that wrote recently read from the primary until replicas have caught up with them
+_recent_writes: dict[str, float] = {}
+_STICKY_SECONDS = Config.DB_REPLICA_MAX_LAG_SECONDS + Config.DB_REPLICA_CHECK_SECONDS
+
+def note_write(key: str):
+    if replicas is None:
+        return
+    now = time.monotonic()
+    _recent_writes[key] = now
+    if len(_recent_writes) > 10000:
+        for k, t in list(_recent_writes.items()):
+            if now - t > _STICKY_SECONDS:
+                _recent_writes.pop(k, None)
+
+def read_session(sticky_key: str | None = None):
+    """A session for read-only work: on a replica when one is configured and healthy."""
+    if replicas is None:
+        return SessionLocal()
+    if sticky_key is not None and time.monotonic() - _recent_writes.get(sticky_key, float("-inf")) < _STICKY_SECONDS:
+        return SessionLocal()
+    bind = replicas.pick()
+    return SessionLocal(bind=bind) if bind is not None else SessionLocal()
+
+def upsert_increment(db, model, keys: dict, deltas: dict):
+    """INSERT the key with ``deltas`` or add them to the existing row, in one statement."""
+    dialect = db.get_bind().dialect.name
+    insert = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}.get(dialect)
+    table = model.__table__
+    if insert is not None:
+        stmt = insert(table).values(**keys, **deltas)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=list(keys),
+            set_={col: table.c[col] + stmt.excluded[col] for col in deltas},
+        ))
+        return
+    row = db.get(model, tuple(keys.values()) if len(keys) > 1 else next(iter(keys.values())))
+    if row is None:
+        db.add(model(**keys, **deltas))
+        db.flush()
+    else:
+        for col, n in deltas.items():
+            setattr(row, col, getattr(row, col) + n)
+
+def upsert_increments(db, model, keys: list[str], rows: list[dict]):
+    """``upsert_increment`` for many keys at once: one statement run as an executemany.
+
+    Each row holds the key columns plus the deltas; every row must name the same columns.
+    """
+    if not rows:
+        return
+    dialect = db.get_bind().dialect.name
+    insert = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}.get(dialect)
+    if insert is None:
+        for row in rows:
+            upsert_increment(db, model, {k: row[k] for k in keys}, {c: v for c, v in row.items() if c not in keys})
+        return
+    table = model.__table__
+    stmt = insert(table)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=keys,
+        set_={col: table.c[col] + stmt.excluded[col] for col in rows[0] if col not in keys},
+    ), rows)
+
+@contextmanager
+def count_queries(max_queries: int | None = None):
+    """Count SQL statements run on any of this process's engines inside the block.
+
+    Yields a list that collects the statements; when ``max_queries`` is given an
+    AssertionError is raised on exit if the block ran more, so tests can pin a
+    query ceiling per endpoint:
+
+        with count_queries(max_queries=4):
+            client.get(f"/api/tickets/{ticket_id}", headers=auth)
+    """
+    statements: list[str] = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engines = list(_engines)
+    for e in engines:
+        event.listen(e, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        for e in engines:
+            event.remove(e, "before_cursor_execute", before_cursor_execute)
+    if max_queries is not None and len(statements) > max_queries:
+        raise AssertionError(f"expected at most {max_queries} queries, ran {len(statements)}:\n" + "\n".join(statements))
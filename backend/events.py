@@ -0,0 +1,183 @@
+import asyncio
+import itertools
+import logging
+import queue
+import threading
+from collections import deque
+from dataclasses import dataclass
+from config import Config
+from json_provider import dumps_bytes
+from models import Role
+
+log = logging.getLogger(__name__)
+
+STAFF_ROLES = frozenset({Role.TECH.value, Role.ADMIN.value})
+
+@dataclass
+class Event:
+    id: int
+    type: str
+    ticket_id: int
+    creator_id: int
+    assignee_id: int | None
+    data: dict
+
+    def visible_to(self, user: dict) -> bool:
+        if user.get("role") in STAFF_ROLES:
+            return True
+        return self.creator_id == int(user["sub"])
+
+    def to_sse(self) -> str:
+        return f"id: {self.id}\nevent: {self.type}\ndata: {dumps_bytes(self.data).decode()}\n\n"
+
+class Subscription:
+    def __init__(self, user: dict):
+        self.user = user
+        self.inbox: queue.Queue[Event] = queue.Queue(maxsize=Config.EVENTS_SUBSCRIBER_QUEUE)
+        self.overflowed = False
+
+    def deliver(self, event: Event):
+        try:
+            self.inbox.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+
+class AsyncSubscription(Subscription):
+    """Subscription read by a coroutine; events may be published from any thread."""
+
+    def __init__(self, user: dict, loop: asyncio.AbstractEventLoop):
+        self.user = user
+        self.loop = loop
+        self.inbox: asyncio.Queue[Event] = asyncio.Queue(maxsize=Config.EVENTS_SUBSCRIBER_QUEUE)
+        self.overflowed = False
+
+    def _put(self, event: Event):
+        try:
+            self.inbox.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    def deliver(self, event: Event):
+        self.loop.call_soon_threadsafe(self._put, event)
+
+class EventBus:
+    """In-process fan-out of ticket events to SSE subscribers.
+
+    The last EVENTS_BUFFER_SIZE events are kept in a ring buffer so a client that
+    reconnects with ``Last-Event-ID`` gets what it missed. Subscribers that fall
+    too far behind are dropped and resume from the buffer on reconnect.
+    """
+
+    def __init__(self, buffer_size: int):
+        self._ids = itertools.count(1)
+        self._buffer: deque[Event] = deque(maxlen=buffer_size)
+        self._subscribers: set[Subscription] = set()
+        self._listeners: list = []
+        self._lock = threading.Lock()
+
+    def publish(self, event_type: str, t, **data) -> Event:
+        """Fan out an event about ticket ``t``; ``data`` is the JSON payload."""
+        # read the ticket before taking the lock: an expired instance reloads, and under
+        # AsyncSession.run_sync that load yields to the event loop
+        ticket_id, creator_id, assignee_id = t.id, t.creator_id, t.assignee_id
+        with self._lock:
+            event = Event(next(self._ids), event_type, ticket_id, creator_id, assignee_id, data)
+            self._buffer.append(event)
+            subscribers = list(self._subscribers)
+            listeners = list(self._listeners)
+        for sub in subscribers:
+            if event.visible_to(sub.user):
+                sub.deliver(event)
+        for listener in listeners:
+            try:
+                listener(event)
+            except Exception:
+                log.exception("event listener failed on %s", event.type)
+        return event
+
+    def add_listener(self, fn):
+        """Call ``fn(event)`` synchronously for every event, in the publisher's thread; keep it cheap."""
+        with self._lock:
+            self._listeners.append(fn)
+
+    def remove_listener(self, fn):
+        with self._lock:
+            if fn in self._listeners:
+                self._listeners.remove(fn)
+
+    def subscribe(self, user: dict, loop: asyncio.AbstractEventLoop | None = None) -> Subscription:
+        """Register a subscriber; pass the running ``loop`` to get an AsyncSubscription."""
+        sub = AsyncSubscription(user, loop) if loop is not None else Subscription(user)
+        with self._lock:
+            self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def replay(self, last_id: int) -> tuple[list[Event], bool]:
+        """Events after ``last_id`` and whether the buffer still covered the gap."""
+        with self._lock:
+            missed = [e for e in self._buffer if e.id > last_id]
+            newest = self._buffer[-1].id if self._buffer else 0
+            # last_id > newest means the process restarted and ids began again
+            complete = last_id <= newest and (not self._buffer or self._buffer[0].id <= last_id + 1)
+        return missed, complete
+
+bus = EventBus(Config.EVENTS_BUFFER_SIZE)
+
+def _catch_up(sub: Subscription, last_id: int | None) -> tuple[list[str], int | None]:
+    """Opening frames (retry, reset, replay) and the id below which live events are duplicates."""
+    frames = [f"retry: {Config.EVENTS_RETRY_MS}\n\n"]
+    if last_id is not None:
+        missed, complete = bus.replay(last_id)
+        if not complete:
+            # the gap is older than the ring buffer: tell the client to re-fetch
+            frames.append("event: reset\ndata: {}\n\n")
+        for event in missed:
+            last_id = event.id
+            if event.visible_to(sub.user):
+                frames.append(event.to_sse())
+        if not complete and not missed:
+            last_id = None
+    return frames, last_id
+
+def stream(sub: Subscription, last_id: int | None):
+    """Generator of SSE frames for one subscriber; unsubscribes when the client goes away.
+
+    ``sub`` must be subscribed before the replay runs, so events published in
+    between are queued; ids already replayed are skipped.
+    """
+    try:
+        frames, last_id = _catch_up(sub, last_id)
+        yield from frames
+        while not sub.overflowed:
+            try:
+                event = sub.inbox.get(timeout=Config.EVENTS_HEARTBEAT_SECONDS)
+            except queue.Empty:
+                yield ": ping\n\n"
+                continue
+            if last_id is not None and event.id <= last_id:
+                continue
+            yield event.to_sse()
+    finally:
+        bus.unsubscribe(sub)
+
+async def astream(sub: AsyncSubscription, last_id: int | None):
+    """``stream`` for the ASGI app: waits on the event loop instead of holding a thread."""
+    try:
+        frames, last_id = _catch_up(sub, last_id)
+        for frame in frames:
+            yield frame
+        while not sub.overflowed:
+            try:
+                event = await asyncio.wait_for(sub.inbox.get(), Config.EVENTS_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            if last_id is not None and event.id <= last_id:
+                continue
+            yield event.to_sse()
+    finally:
+        bus.unsubscribe(sub)
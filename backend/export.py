@@ -0,0 +1,90 @@
+import csv
+import io
+import zlib
+from sqlalchemy import select
+from config import Config
+from db import SessionLocal
+from json_provider import dumps_bytes
+from models import Ticket, Comment
+from queries import TICKET_COLUMNS, filter_tickets, parse_filter
+
+FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+TICKET_FIELDS = [c.key for c in TICKET_COLUMNS]
+COMMENT_FIELDS = ["comment_id", "comment_user_id", "comment_content", "comment_created_at"]
+
+# rows are buffered into chunks of roughly this size before being yielded
+CHUNK_BYTES = 64 * 1024
+
+def _query(where: dict, include_comments: bool):
+    q = filter_tickets(select(*TICKET_COLUMNS), **parse_filter(where))
+    if include_comments:
+        q = q.add_columns(Comment.id.label("comment_id"), Comment.user_id.label("comment_user_id"),
+                          Comment.content.label("comment_content"), Comment.created_at.label("comment_created_at"))
+        q = q.outerjoin(Comment, Comment.ticket_id == Ticket.id).order_by(Ticket.id, Comment.id)
+    else:
+        q = q.order_by(Ticket.id)
+    return q.execution_options(yield_per=Config.STREAM_CHUNK_ROWS)
+
+def _csv_lines(rows, include_comments: bool):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(TICKET_FIELDS + (COMMENT_FIELDS if include_comments else []))
+    for r in rows:
+        writer.writerow([v.isoformat() if hasattr(v, "isoformat") else getattr(v, "value", v) for v in r])
+        if buf.tell() >= CHUNK_BYTES:
+            yield buf.getvalue().encode()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue().encode()
+
+def _ndjson_lines(rows, include_comments: bool):
+    buf = bytearray()
+    def emit(obj):
+        buf.extend(dumps_bytes(obj))
+        buf.extend(b"\n")
+    current = None
+    for r in rows:
+        ticket = {f: getattr(r, f) for f in TICKET_FIELDS}
+        if not include_comments:
+            emit(ticket)
+        else:
+            # rows arrive ordered by ticket, so comments are grouped without holding more than one ticket
+            if current is None or current["id"] != ticket["id"]:
+                if current is not None:
+                    emit(current)
+                current = {**ticket, "comments": []}
+            if r.comment_id is not None:
+                current["comments"].append({"id": r.comment_id, "user_id": r.comment_user_id,
+                                            "content": r.comment_content, "created_at": r.comment_created_at})
+        if len(buf) >= CHUNK_BYTES:
+            yield bytes(buf)
+            buf.clear()
+    if current is not None:
+        emit(current)
+    yield bytes(buf)
+
+def generate(fmt: str, where: dict | None = None, include_comments: bool = False):
+    """Return an iterator of byte chunks reading tickets through a server-side cursor.
+
+    The filter is validated (ValueError) before anything is streamed; memory
+    stays flat whatever the number of rows.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+    q = _query(where or {}, include_comments)
+    lines = _csv_lines if fmt == "csv" else _ndjson_lines
+
+    def chunks():
+        with SessionLocal() as db:
+            yield from lines(db.execute(q), include_comments)
+    return chunks()
+
+def gzip_chunks(chunks, level: int = 6):
+    """Compress a byte stream on the fly into a single gzip member."""
+    z = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        out = z.compress(chunk)
+        if out:
+            yield out
+    yield z.flush()
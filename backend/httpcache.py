@@ -0,0 +1,93 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from flask import Response, current_app, request
+from sqlalchemy import select, update
+from config import Config
+from db import upsert_increment
+from models import ResourceVersion, Ticket
+
+# ----- Version stamps -----
+def bump(db, *names: str):
+    """Mark collections as changed; call inside the writing transaction."""
+    for name in names:
+        upsert_increment(db, ResourceVersion, {"name": name}, {"version": 1})
+
+def collection_version(db, name: str) -> int:
+    return db.scalar(select(ResourceVersion.version).where(ResourceVersion.name == name)) or 0
+
+def touch_ticket_children(db, ticket_id: int):
+    """A comment or attachment changed: bump the ticket's version without touching updated_at."""
+    db.execute(
+        update(Ticket).where(Ticket.id == ticket_id)
+        .values(children_version=Ticket.children_version + 1, updated_at=Ticket.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+
+def ticket_version(db, ticket_id: int) -> str | None:
+    """One indexed lookup; None when the ticket does not exist."""
+    row = db.execute(select(Ticket.updated_at, Ticket.children_version).where(Ticket.id == ticket_id)).first()
+    if row is None:
+        return None
+    return f"{row.updated_at.timestamp():.6f}-{row.children_version}"
+
+def make_etag(*parts) -> str:
+    return hashlib.sha1("|".join(str(p) for p in parts).encode()).hexdigest()
+
+# ----- Serialized response cache -----
+class ResponseCache:
+    """Bounded LRU of encoded JSON bodies, keyed by resource and validated by ETag.
+
+    Writers bump the version the ETag is derived from, so a stale entry is
+    simply never served again and is replaced on the next read.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, tuple[str, bytes]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, etag: str) -> bytes | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == etag:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, etag: str, body: bytes):
+        if not self.maxsize:
+            return
+        with self._lock:
+            self._entries[key] = (etag, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._entries), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+response_cache = ResponseCache(Config.RESPONSE_CACHE_SIZE)
+
+def conditional_json(key: str, etag: str, build):
+    """304 if the client already has ``etag``, else the cached or freshly built JSON body."""
+    if request.if_none_match.contains(etag):
+        resp = Response(status=304)
+    else:
+        body = response_cache.get(key, etag)
+        if body is None:
+            body = current_app.json.dumps_bytes(build())
+            response_cache.put(key, etag, body)
+        resp = Response(body, mimetype="application/json")
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "private, no-cache"
+    return resp
@@ -0,0 +1,306 @@
+import csv
+import json
+import math
+import random
+import time
+from datetime import datetime, timedelta
+from itertools import islice
+from sqlalchemy import select, insert, update, func
+from sqlalchemy.dialects import postgresql, sqlite
+from auth import hash_passwords
+from httpcache import bump
+from models import User, Role, Ticket, TicketStatus, Comment
+from queries import parse_datetime
+from reports import RollupDelta
+
+BATCH_SIZE = 1000
+
+# ----- Reading -----
+def read_records(path: str):
+    """Yield one dict per record of a .csv file (header row) or a .jsonl/.ndjson file.
+
+    The NDJSON written by ``tickets export --format ndjson --comments`` is
+    accepted as-is by ``import_tickets``.
+    """
+    if path.endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            yield from csv.DictReader(f)
+    else:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+def _batches(records, size: int):
+    it = iter(records)
+    while batch := list(islice(it, size)):
+        yield batch
+
+def _value(rec: dict, key: str):
+    # CSV cells are always strings; treat empty ones as missing
+    value = rec.get(key)
+    return None if value == "" else value
+
+def _datetime(rec: dict, key: str) -> datetime | None:
+    value = _value(rec, key)
+    return value if isinstance(value, datetime) else parse_datetime(value, key)
+
+# ----- Users -----
+def _user_row(rec: dict) -> dict:
+    email = (_value(rec, "email") or "").strip().lower()
+    if not email:
+        raise ValueError("user record without email")
+    row = {
+        "email": email,
+        "name": _value(rec, "name") or email.split("@")[0],
+        "role": Role((_value(rec, "role") or Role.STUDENT.value).upper()),
+    }
+    if _value(rec, "password"):
+        row["password"] = rec["password"]
+    elif _value(rec, "password_hash"):
+        row["password_hash"] = rec["password_hash"]
+    else:
+        raise ValueError(f"user {email}: password or password_hash required")
+    return row
+
+def _upsert_users(db, rows: list[dict], existing: dict[str, int]):
+    dialect = db.get_bind().dialect.name
+    insert_ = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}.get(dialect)
+    if insert_ is not None:
+        # one executemany; a row inserted concurrently since `existing` was read is still updated
+        stmt = insert_(User.__table__)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=["email"],
+            set_={col: stmt.excluded[col] for col in ("name", "role", "password_hash")},
+        ), rows)
+        return
+    new = [r for r in rows if r["email"] not in existing]
+    if new:
+        db.execute(insert(User), new)
+    old = [{**r, "id": existing[r["email"]]} for r in rows if r["email"] in existing]
+    if old:
+        db.execute(update(User), old)
+
+def import_users(db, records, pool=None, batch_size: int = BATCH_SIZE) -> dict:
+    """Upsert users by email in batches of ``batch_size``, committing each batch.
+
+    Records carry email, name, role and either a plaintext ``password`` (hashed
+    on ``pool`` when given) or a ready ``password_hash``. An existing email gets
+    the record's name, role and password. Returns counts and timings.
+    """
+    stats = {"rows": 0, "inserted": 0, "updated": 0, "hash_seconds": 0.0, "seconds": 0.0}
+    started = time.perf_counter()
+    for batch in _batches(records, batch_size):
+        rows = {}
+        for rec in batch:
+            row = _user_row(rec)
+            rows[row["email"]] = row  # a repeated email within a batch: last one wins
+        rows = list(rows.values())
+        plain = [r for r in rows if "password" in r]
+        hashing_started = time.perf_counter()
+        hashes = hash_passwords([r.pop("password") for r in plain], pool)
+        for r, password_hash in zip(plain, hashes):
+            r["password_hash"] = password_hash
+        stats["hash_seconds"] += time.perf_counter() - hashing_started
+
+        existing = dict(db.execute(select(User.email, User.id).where(User.email.in_([r["email"] for r in rows]))).all())
+        _upsert_users(db, rows, existing)
+        bump(db, "users")
+        db.commit()
+        stats["rows"] += len(batch)
+        stats["updated"] += len(existing)
+        stats["inserted"] += len(rows) - len(existing)
+    stats["seconds"] = time.perf_counter() - started
+    return stats
+
+# ----- Tickets -----
+def _user_lookup(db, batch: list[dict]) -> tuple[dict[str, int], set[int]]:
+    # every user referenced by the batch, resolved in two queries
+    emails, ids = set(), set()
+    for rec in batch:
+        for ref in [rec] + list(rec.get("comments") or []):
+            for prefix in ("creator", "assignee", "user"):
+                if _value(ref, f"{prefix}_email"):
+                    emails.add(ref[f"{prefix}_email"].lower())
+                if _value(ref, f"{prefix}_id") is not None:
+                    ids.add(int(ref[f"{prefix}_id"]))
+    by_email = dict(db.execute(select(User.email, User.id).where(User.email.in_(emails))).all()) if emails else {}
+    known_ids = set(db.scalars(select(User.id).where(User.id.in_(ids)))) if ids else set()
+    return by_email, known_ids
+
+def _user_ref(rec: dict, prefix: str, by_email: dict, known_ids: set) -> int | None:
+    email, user_id = _value(rec, f"{prefix}_email"), _value(rec, f"{prefix}_id")
+    if email:
+        if email.lower() not in by_email:
+            raise ValueError(f"{prefix} {email} not found")
+        return by_email[email.lower()]
+    if user_id is not None:
+        if int(user_id) not in known_ids:
+            raise ValueError(f"{prefix} {user_id} not found")
+        return int(user_id)
+    return None
+
+def _ticket_row(rec: dict, by_email: dict, known_ids: set, now: datetime) -> tuple[dict, list[dict]]:
+    title = _value(rec, "title")
+    if not title:
+        raise ValueError("ticket record without title")
+    creator_id = _user_ref(rec, "creator", by_email, known_ids)
+    if creator_id is None:
+        raise ValueError(f"ticket {title!r}: creator_email or creator_id required")
+    status = TicketStatus((_value(rec, "status") or TicketStatus.OPEN.value).upper())
+    created_at = _datetime(rec, "created_at") or now
+    updated_at = _datetime(rec, "updated_at") or created_at
+    resolved_at = (_datetime(rec, "resolved_at") or updated_at) if status == TicketStatus.RESOLVED else None
+    comments = [
+        {
+            "user_id": _user_ref(c, "user", by_email, known_ids) or creator_id,
+            "content": c["content"],
+            "created_at": _datetime(c, "created_at") or created_at,
+        }
+        for c in rec.get("comments") or []
+    ]
+    row = {
+        "title": title,
+        "description": _value(rec, "description") or "",
+        "status": status,
+        "creator_id": creator_id,
+        "assignee_id": _user_ref(rec, "assignee", by_email, known_ids),
+        "created_at": created_at,
+        "updated_at": updated_at,
+        "resolved_at": resolved_at,
+        "children_version": len(comments),
+    }
+    return row, comments
+
+def _insert_tickets(db, rows: list[dict]) -> list[int]:
+    """Insert a batch in one executemany and return the new ids in row order."""
+    # Core inserts: the ORM variant splits a batch wherever a column's None-ness changes
+    table = Ticket.__table__
+    if db.get_bind().dialect.name != "sqlite":
+        return db.scalars(insert(table).returning(table.c.id, sort_by_parameter_order=True), rows).all()
+    # SQLite can only order RETURNING by running one INSERT per row. The caller holds the
+    # write lock (bump() ran first), so the new rowids follow max(id) in row order.
+    first = (db.scalar(select(func.max(Ticket.id))) or 0) + 1
+    db.execute(insert(table), rows)
+    return list(range(first, first + len(rows)))
+
+def import_tickets(db, records, batch_size: int = BATCH_SIZE) -> dict:
+    """Insert tickets (and their nested ``comments``) in batches, committing each batch.
+
+    Users are referenced by ``creator_email``/``creator_id`` and
+    ``assignee_email``/``assignee_id``. Report rollups and the tickets
+    collection version are updated in the same transaction as each batch; the
+    search index follows through its triggers / generated columns.
+    """
+    stats = {"rows": 0, "comments": 0, "seconds": 0.0}
+    started = time.perf_counter()
+    for batch in _batches(records, batch_size):
+        now = datetime.utcnow()
+        by_email, known_ids = _user_lookup(db, batch)
+        parsed = [_ticket_row(rec, by_email, known_ids, now) for rec in batch]
+        rows = [row for row, _ in parsed]
+        bump(db, "tickets")
+        ticket_ids = _insert_tickets(db, rows)
+        comment_rows = [{**c, "ticket_id": ticket_id} for ticket_id, (_, comments) in zip(ticket_ids, parsed) for c in comments]
+        if comment_rows:
+            db.execute(insert(Comment.__table__), comment_rows)
+
+        rollups = RollupDelta()
+        for row in rows:
+            # same replay as reports.backfill: created OPEN, then moved to its current status
+            rollups.ticket_changed(row["created_at"], None, None, TicketStatus.OPEN, row["assignee_id"], row["created_at"])
+            if row["status"] != TicketStatus.OPEN:
+                rollups.ticket_changed(row["created_at"], TicketStatus.OPEN, row["assignee_id"], row["status"],
+                                       row["assignee_id"], row["resolved_at"] or row["updated_at"])
+        rollups.apply(db)
+        db.commit()
+        stats["rows"] += len(rows)
+        stats["comments"] += len(comment_rows)
+    stats["seconds"] = time.perf_counter() - started
+    return stats
+
+# ----- Synthetic data -----
+# Roughly a campus help desk: mostly students, a few staff, a semester of tickets.
+FIRST_NAMES = ["Amina", "Ben", "Chloe", "David", "Esther", "Felix", "Grace", "Hugo", "Ines", "Jonas", "Kofi", "Lea",
+               "Moses", "Nadia", "Omar", "Priya", "Quentin", "Rosa", "Samuel", "Tariq", "Uma", "Victor", "Wanjiru", "Yusuf"]
+LAST_NAMES = ["Abara", "Bissombolo", "Chen", "Dubois", "Eze", "Fischer", "Garcia", "Haddad", "Ito", "Jansen", "Kamau",
+              "Lopez", "Mensah", "Nguyen", "Okafor", "Petrov", "Rossi", "Silva", "Tshibanda", "Weber"]
+ROLE_WEIGHTS = {Role.STUDENT: 85, Role.FACULTY: 10, Role.TECH: 4, Role.ADMIN: 1}
+ROLE_DOMAINS = {Role.STUDENT: "student.test", Role.FACULTY: "faculty.test", Role.TECH: "it.test", Role.ADMIN: "it.test"}
+TOPICS = [
+    ("Can't connect to campus Wi-Fi", "The eduroam connection times out in the {place}."),
+    ("Printer out of toner", "The printer in the {place} prints blank pages."),
+    ("Password reset not working", "The reset link from the portal says it has expired."),
+    ("Projector has no signal", "The projector in the {place} shows no signal from the lectern PC."),
+    ("LMS course page missing", "My course does not appear on the learning platform."),
+    ("Email quota exceeded", "I can't receive mail, the mailbox says it is full."),
+    ("Software licence request", "I need a licence for the statistics package for my coursework."),
+    ("Lab PC won't boot", "A PC in the {place} is stuck on the boot screen."),
+    ("VPN disconnects", "The VPN drops every few minutes when working from home."),
+    ("Access card not accepted", "My card does not open the door of the {place}."),
+]
+PLACES = ["library", "science block", "computer lab 2", "lecture hall B", "student union", "engineering wing"]
+COMMENT_LINES = [
+    "Thanks, I'm looking into it.", "Could you send a screenshot of the error?", "Still happening this morning.",
+    "A technician will come by this afternoon.", "Restarting fixed it for now.", "Escalated to the network team.",
+    "It works again, thank you!", "Please try again after clearing the browser cache.",
+]
+STATUS_WEIGHTS = {TicketStatus.RESOLVED: 60, TicketStatus.IN_PROGRESS: 15, TicketStatus.OPEN: 25}
+
+def synthetic_users(n: int, password_hash: str, seed: int = 0):
+    """Yield ``n`` user records sharing one password hash (bcrypt is not what's being measured)."""
+    rnd = random.Random(seed)
+    roles, weights = list(ROLE_WEIGHTS), list(ROLE_WEIGHTS.values())
+    for i in range(n):
+        role = rnd.choices(roles, weights)[0]
+        first, last = rnd.choice(FIRST_NAMES), rnd.choice(LAST_NAMES)
+        yield {"email": f"{first}.{last}.{i}@{ROLE_DOMAINS[role]}".lower(), "name": f"{first} {last}",
+               "role": role.value, "password_hash": password_hash}
+
+def synthetic_tickets(n: int, requester_ids: list[int], tech_ids: list[int], comments_per_ticket: float = 2,
+                      days: int = 120, seed: int = 0, now: datetime | None = None):
+    """Yield ``n`` ticket records spread evenly over the last ``days`` days.
+
+    Resolve times are log-normal (median about a day); tickets whose resolve
+    time would fall in the future stay IN_PROGRESS. Comments alternate between
+    the creator and the assignee.
+    """
+    if not requester_ids:
+        raise ValueError("no users to create tickets for")
+    rnd = random.Random(seed)
+    now = now or datetime.utcnow()
+    start = now - timedelta(days=days)
+    step = days * 86400 / max(n, 1)
+    statuses, weights = list(STATUS_WEIGHTS), list(STATUS_WEIGHTS.values())
+    for i in range(n):
+        created_at = start + timedelta(seconds=(i + rnd.random()) * step)
+        status = rnd.choices(statuses, weights)[0]
+        assignee_id = rnd.choice(tech_ids) if tech_ids and (status != TicketStatus.OPEN or rnd.random() < 0.3) else None
+        if assignee_id is None and status != TicketStatus.OPEN:
+            status = TicketStatus.OPEN
+        resolved_at = None
+        updated_at = created_at + timedelta(minutes=rnd.randint(0, 120))
+        if status == TicketStatus.RESOLVED:
+            resolved_at = created_at + timedelta(hours=rnd.lognormvariate(math.log(24), 1.2))
+            if resolved_at > now:
+                status, resolved_at = TicketStatus.IN_PROGRESS, None
+            else:
+                updated_at = resolved_at
+        updated_at = min(updated_at, now)
+        creator_id = rnd.choice(requester_ids)
+        title, description = rnd.choice(TOPICS)
+        comments = []
+        for k in range(rnd.randint(0, int(2 * comments_per_ticket))):
+            offset = (updated_at - created_at) * (k + 1) / (int(2 * comments_per_ticket) + 1)
+            comments.append({"user_id": assignee_id if k % 2 and assignee_id else creator_id,
+                             "content": rnd.choice(COMMENT_LINES), "created_at": created_at + offset})
+        yield {"title": title, "description": description.format(place=rnd.choice(PLACES)), "status": status.value,
+               "creator_id": creator_id, "assignee_id": assignee_id, "created_at": created_at,
+               "updated_at": updated_at, "resolved_at": resolved_at, "comments": comments}
+
+def user_pools(db) -> tuple[list[int], list[int]]:
+    """Ids of users who raise tickets and of TECH users who take them."""
+    rows = db.execute(select(User.id, User.role)).all()
+    requesters = [uid for uid, role in rows if role in (Role.STUDENT, Role.FACULTY)]
+    techs = [uid for uid, role in rows if role == Role.TECH]
+    return requesters or [uid for uid, _ in rows], techs
@@ -1,15 +1,183 @@
+import logging
 import smtplib
+import threading
+import uuid
+from datetime import datetime, timedelta
 from email.mime.text import MIMEText
+from sqlalchemy import select, update
 from config import Config
+from db import SessionLocal
+from models import OutboxMessage, OutboxStatus
 
-def send_email(to_email: str, subject: str, body: str):
+log = logging.getLogger(__name__)
+
+def build_message(to_email: str, subject: str, body: str) -> MIMEText:
     msg = MIMEText(body, "plain", "utf-8")
     msg["Subject"] = subject
     msg["From"] = Config.SMTP_FROM
     msg["To"] = to_email
+    return msg
 
-    with smtplib.SMTP(Config.SMTP_HOST, Config.SMTP_PORT) as server:
+def send_email(to_email: str, subject: str, body: str):
+    with smtplib.SMTP(Config.SMTP_HOST, Config.SMTP_PORT, timeout=Config.SMTP_TIMEOUT) as server:
         if Config.SMTP_USER and Config.SMTP_PASS:
             server.starttls()
             server.login(Config.SMTP_USER, Config.SMTP_PASS)
-        server.send_message(msg)
+        server.send_message(build_message(to_email, subject, body))
+
+def queue_email(db, to_email: str, subject: str, body: str) -> OutboxMessage:
+    """Add a message to the outbox; it is sent once the caller's transaction commits."""
+    msg = OutboxMessage(to_email=to_email, subject=subject, body=body)
+    db.add(msg)
+    return msg
+
+# ----- SMTP connection reuse -----
+class RelayUnavailable(Exception):
+    """The relay could not be reached or dropped the session; no message is at fault."""
+
+# the relay refused one message; the session stays usable
+MESSAGE_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError)
+
+class SMTPConnection:
+    """One long-lived SMTP session, (re)opened lazily and shared by a worker's batches."""
+
+    def __init__(self):
+        self._server: smtplib.SMTP | None = None
+
+    def _connect(self) -> smtplib.SMTP:
+        try:
+            server = smtplib.SMTP(Config.SMTP_HOST, Config.SMTP_PORT, timeout=Config.SMTP_TIMEOUT)
+            if Config.SMTP_USER and Config.SMTP_PASS:
+                server.starttls()
+                server.login(Config.SMTP_USER, Config.SMTP_PASS)
+        except (smtplib.SMTPException, OSError) as e:
+            raise RelayUnavailable(f"{type(e).__name__}: {e}") from e
+        return server
+
+    def send(self, msg: MIMEText):
+        """Send ``msg``; MESSAGE_ERRORS are about the message, RelayUnavailable about the relay."""
+        for _ in range(2):
+            if self._server is None:
+                self._server = self._connect()
+            try:
+                self._server.send_message(msg)
+                return
+            except MESSAGE_ERRORS:
+                raise
+            except smtplib.SMTPServerDisconnected as e:
+                # relay dropped an idle session: reconnect once and retry
+                self._server, error = None, e
+            except (smtplib.SMTPException, OSError) as e:
+                self.close()
+                raise RelayUnavailable(f"{type(e).__name__}: {e}") from e
+        raise RelayUnavailable(f"{type(error).__name__}: {error}") from error
+
+    def close(self):
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._server = None
+
+# ----- Outbox worker -----
+def _backoff(attempts: int) -> timedelta:
+    seconds = Config.MAIL_BACKOFF_SECONDS * 2 ** max(attempts - 1, 0)
+    return timedelta(seconds=min(seconds, Config.MAIL_BACKOFF_MAX_SECONDS))
+
+def claim_batch(db, batch_size: int) -> list[OutboxMessage]:
+    """Lease up to ``batch_size`` due messages to this caller.
+
+    The claim is a single conditional UPDATE, so concurrent workers (threads or
+    processes, SQLite or PostgreSQL) never pick up the same row; a lease that
+    is not released (crashed worker) expires after MAIL_LEASE_SECONDS.
+    """
+    now = datetime.utcnow()
+    token = uuid.uuid4().hex
+    due = (
+        select(OutboxMessage.id)
+        .where(OutboxMessage.status == OutboxStatus.PENDING, OutboxMessage.next_attempt_at <= now)
+        .order_by(OutboxMessage.next_attempt_at, OutboxMessage.id)
+        .limit(batch_size)
+    )
+    db.execute(
+        update(OutboxMessage)
+        .where(OutboxMessage.id.in_(due.scalar_subquery()),
+               OutboxMessage.status == OutboxStatus.PENDING,
+               OutboxMessage.next_attempt_at <= now)
+        .values(claimed_by=token,
+                attempts=OutboxMessage.attempts + 1,
+                next_attempt_at=now + timedelta(seconds=Config.MAIL_LEASE_SECONDS))
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return db.scalars(select(OutboxMessage).where(OutboxMessage.claimed_by == token)
+                      .order_by(OutboxMessage.id)).all()
+
+def release_claims(db, messages: list[OutboxMessage], error: str):
+    """Hand leased messages back unsent, without charging the attempt the claim counted."""
+    retry_at = datetime.utcnow() + _backoff(1)
+    for m in messages:
+        m.attempts -= 1
+        m.claimed_by = None
+        m.next_attempt_at = retry_at
+        m.last_error = error[:2000]
+    db.commit()
+
+def drain_outbox(conn: SMTPConnection, batch_size: int | None = None) -> dict:
+    """Send one batch of due messages over ``conn``; returns per-outcome counts.
+
+    When the relay is unreachable the batch stops at once and the rest of it is
+    deferred, so an outage costs one connect timeout per poll and no attempts.
+    """
+    stats = {"sent": 0, "retry": 0, "dead": 0, "deferred": 0}
+    with SessionLocal(expire_on_commit=False) as db:
+        batch = claim_batch(db, batch_size or Config.MAIL_BATCH_SIZE)
+        for i, m in enumerate(batch):
+            try:
+                conn.send(build_message(m.to_email, m.subject, m.body))
+            except RelayUnavailable as e:
+                release_claims(db, batch[i:], str(e))
+                stats["deferred"] = len(batch) - i
+                log.warning("mail relay unavailable, %d messages deferred: %s", stats["deferred"], e)
+                break
+            except Exception as e:
+                m.last_error = f"{type(e).__name__}: {e}"[:2000]
+                if m.attempts >= Config.MAIL_MAX_ATTEMPTS:
+                    m.status = OutboxStatus.DEAD
+                    stats["dead"] += 1
+                    log.error("mail %s to %s dead-lettered: %s", m.id, m.to_email, m.last_error)
+                else:
+                    m.next_attempt_at = datetime.utcnow() + _backoff(m.attempts)
+                    stats["retry"] += 1
+            else:
+                m.status = OutboxStatus.SENT
+                m.sent_at = datetime.utcnow()
+                m.last_error = None
+                stats["sent"] += 1
+            m.claimed_by = None
+            db.commit()
+    return stats
+
+def run_worker(stop: threading.Event | None = None, once: bool = False):
+    stop = stop or threading.Event()
+    conn = SMTPConnection()
+    try:
+        while not stop.is_set():
+            try:
+                stats = drain_outbox(conn)
+            except Exception:
+                log.exception("mail outbox drain failed")
+                stats = {"sent": 0, "retry": 0, "dead": 0, "deferred": 0}
+            if once:
+                return stats
+            # keep draining while batches come back full, otherwise idle (deferred ones wait for the relay)
+            if stats["sent"] + stats["retry"] + stats["dead"] < Config.MAIL_BATCH_SIZE:
+                stop.wait(Config.MAIL_POLL_SECONDS)
+    finally:
+        conn.close()
+
+def start_worker_thread() -> threading.Event:
+    stop = threading.Event()
+    threading.Thread(target=run_worker, args=(stop,), name="mail-outbox", daemon=True).start()
+    return stop
@@ -0,0 +1,226 @@
+import bisect
+import cProfile
+import logging
+import marshal
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from config import Config
+
+slow_sql_log = logging.getLogger("smartcampus.slow_sql")
+
+# ----- Metric types (Prometheus text exposition format) -----
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SQL_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+class CounterMetric:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name, self.help, self.labels = name, help, labels
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield f"{self.name}{_labels(self.labels, key)} {value:g}"
+
+class Histogram:
+    """Cumulative-bucket histogram per label set."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: tuple[float, ...], labels: tuple[str, ...] = ()):
+        self.name, self.help, self.labels, self.buckets = name, help, labels, buckets
+        self._series: dict[tuple, list] = {}  # labels -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[i] += 1
+            series[-1] += value
+
+    def samples(self):
+        with self._lock:
+            series = {k: list(v) for k, v in self._series.items()}
+        for key, counts in sorted(series.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound:g}"'
+                yield f"{self.name}_bucket{_labels(self.labels, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labels, key)} {counts[-1]:.6f}"
+            yield f"{self.name}_count{_labels(self.labels, key)} {cumulative}"
+
+request_seconds = Histogram("http_request_duration_seconds", "Time to produce the response (streamed bodies excluded).",
+                            LATENCY_BUCKETS, ("endpoint", "method"))
+requests_total = CounterMetric("http_requests_total", "Requests by endpoint and status.", ("endpoint", "method", "status"))
+request_queries = Histogram("http_request_sql_queries", "SQL statements run per request.", COUNT_BUCKETS, ("endpoint",))
+phase_seconds = Histogram("http_request_phase_seconds", "Time per request spent in sql, jwt, bcrypt and serialize.",
+                          LATENCY_BUCKETS, ("endpoint", "phase"))
+sql_seconds = Histogram("sql_query_duration_seconds", "Duration of single SQL statements.", SQL_BUCKETS, ("endpoint",))
+slow_queries_total = CounterMetric("sql_slow_queries_total", "Statements slower than SLOW_QUERY_MS.", ("endpoint",))
+
+REGISTRY = [request_seconds, requests_total, request_queries, phase_seconds, sql_seconds, slow_queries_total]
+
+def render() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
+
+# ----- Per-request accounting -----
+# Set by the Flask hooks / ASGI handlers in the request's context (a thread or an
+# asyncio task); SQL listeners and phase() outside a request (mail worker, CLI)
+# only feed the global SQL histogram.
+class RequestStats:
+    __slots__ = ("endpoint", "started", "queries", "phases")
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.phases: Counter = Counter()
+
+_current: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+def current() -> RequestStats | None:
+    return _current.get()
+
+def begin_request(endpoint: str | None):
+    _current.set(RequestStats(endpoint or "unmatched"))
+
+def end_request(method: str, status: int) -> RequestStats | None:
+    stats = current()
+    if stats is None:
+        return None
+    _current.set(None)
+    elapsed = time.perf_counter() - stats.started
+    request_seconds.observe(elapsed, stats.endpoint, method)
+    requests_total.inc(stats.endpoint, method, str(status))
+    request_queries.observe(stats.queries, stats.endpoint)
+    for name, seconds in stats.phases.items():
+        phase_seconds.observe(seconds, stats.endpoint, name)
+    stats.phases["total"] = elapsed
+    return stats
+
+@contextmanager
+def phase(name: str):
+    """Add the block's wall time to the current request's ``name`` phase (no-op outside requests)."""
+    stats = current()
+    if stats is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.phases[name] += time.perf_counter() - started
+
+def record_query(statement: str, seconds: float):
+    stats = current()
+    endpoint = stats.endpoint if stats else "-"
+    if stats is not None:
+        stats.queries += 1
+        stats.phases["sql"] += seconds
+    sql_seconds.observe(seconds, endpoint)
+    if Config.SLOW_QUERY_MS and seconds * 1000 >= Config.SLOW_QUERY_MS:
+        slow_queries_total.inc(endpoint)
+        # statement text only; bound parameters may hold personal data
+        slow_sql_log.warning("slow query %.1f ms [%s]: %s", seconds * 1000, endpoint, " ".join(statement.split())[:2000])
+
+def server_timing(stats: RequestStats) -> str:
+    return ", ".join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in stats.phases.items())
+
+# ----- On-demand profiling -----
+class StackSampler:
+    """Samples one thread's Python stack every ``interval`` seconds.
+
+    ``folded()`` returns Brendan Gregg's collapsed format ("a;b;c count" per
+    line), which flamegraph.pl and speedscope load directly.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.001):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.counts[";".join(reversed(stack))] += 1
+
+    def stop(self) -> "StackSampler":
+        self._stop.set()
+        self._thread.join()
+        return self
+
+    def folded(self) -> bytes:
+        return "".join(f"{stack} {n}\n" for stack, n in self.counts.most_common()).encode()
+
+# the interpreter allows one active cProfile at a time
+_cprofile_lock = threading.Lock()
+
+class Profile:
+    """One profiled request: ``mode`` "cprofile" (a pstats dump) or "flame" (folded stacks)."""
+
+    def __init__(self, mode: str):
+        self.mode = mode
+        self._profiler = cProfile.Profile() if mode == "cprofile" else StackSampler(threading.get_ident())
+
+    def start(self) -> "Profile | None":
+        """Start profiling; None when another request already holds the cProfile slot."""
+        if self.mode == "cprofile":
+            if not _cprofile_lock.acquire(blocking=False):
+                return None
+            self._profiler.enable()
+        else:
+            self._profiler.start()
+        return self
+
+    def stop(self) -> tuple[bytes, str, str]:
+        """Return (body, mimetype, download filename)."""
+        if self.mode == "cprofile":
+            self._profiler.disable()
+            _cprofile_lock.release()
+            self._profiler.create_stats()
+            # same bytes as Profile.dump_stats(): load with pstats, snakeviz or flameprof
+            return marshal.dumps(self._profiler.stats), "application/octet-stream", "request.prof"
+        return self._profiler.stop().folded(), "text/plain", "request.folded"
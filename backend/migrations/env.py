@@ -0,0 +1,41 @@
+from logging.config import fileConfig
+from alembic import context
+from db import Base, engine
+import models  # noqa: F401  (registers the tables)
+
+config = context.config
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name)
+
+# the full-text search objects are created by search.install(), not by migrations
+SEARCH_OBJECTS = ("tickets_fts", "comments_fts", "attachments_fts")
+
+def include_object(obj, name, type_, reflected, compare_to):
+    if type_ == "table" and name is not None and name.startswith(SEARCH_OBJECTS):
+        return False
+    if type_ == "column" and name == "search_tsv":
+        return False
+    return True
+
+def run_migrations(connection):
+    context.configure(
+        connection=connection,
+        target_metadata=Base.metadata,
+        include_object=include_object,
+        render_as_batch=connection.dialect.name == "sqlite",
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+if context.is_offline_mode():
+    context.configure(url=engine.url, target_metadata=Base.metadata, literal_binds=True)
+    with context.begin_transaction():
+        context.run_migrations()
+else:
+    # db.migrate() passes the connection it already holds
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        run_migrations(connection)
+    else:
+        with engine.connect() as connection:
+            run_migrations(connection)
@@ -0,0 +1,66 @@
+"""baseline: users, tickets, comments and attachments as first released
+
+Revision ID: 0001
+Revises:
+Create Date: 2024-09-01
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+ROLE = sa.Enum("STUDENT", "FACULTY", "TECH", "ADMIN", name="role")
+TICKET_STATUS = sa.Enum("OPEN", "IN_PROGRESS", "RESOLVED", name="ticketstatus")
+
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("email", sa.String(255), nullable=False),
+        sa.Column("name", sa.String(255), nullable=False),
+        sa.Column("password_hash", sa.String(255), nullable=False),
+        sa.Column("role", ROLE, nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+    op.create_table(
+        "tickets",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("title", sa.String(255), nullable=False),
+        sa.Column("description", sa.String(4000), nullable=False),
+        sa.Column("status", TICKET_STATUS, nullable=False),
+        sa.Column("creator_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("assignee_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    )
+    op.create_table(
+        "comments",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("ticket_id", sa.Integer(), sa.ForeignKey("tickets.id"), nullable=False),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+    op.create_table(
+        "attachments",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("ticket_id", sa.Integer(), sa.ForeignKey("tickets.id"), nullable=False),
+        sa.Column("filename", sa.String(512), nullable=False),
+        sa.Column("path", sa.String(1024), nullable=False),
+        sa.Column("uploaded_at", sa.DateTime(), nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table("attachments")
+    op.drop_table("comments")
+    op.drop_table("tickets")
+    op.drop_index("ix_users_email", table_name="users")
+    op.drop_table("users")
+    ROLE.drop(op.get_bind(), checkfirst=True)
+    TICKET_STATUS.drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,148 @@
+"""everything added before migrations existed: rollups, outbox, blobs, ETag versions,
+ticket/attachment columns and the keyset indexes
+
+Databases created by ``create_all`` may already have any of these (new tables
+were created, new columns were not), so every step checks first.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+OUTBOX_STATUS = sa.Enum("PENDING", "SENT", "DEAD", name="outboxstatus")
+
+TICKET_INDEXES = {
+    "ix_tickets_updated_id": ["updated_at", "id"],
+    "ix_tickets_status_updated_id": ["status", "updated_at", "id"],
+    "ix_tickets_assignee_updated_id": ["assignee_id", "updated_at", "id"],
+    "ix_tickets_creator_updated_id": ["creator_id", "updated_at", "id"],
+    "ix_tickets_created_at": ["created_at"],
+}
+
+
+def _create_table(inspector, name, *columns):
+    if not inspector.has_table(name):
+        op.create_table(name, *columns)
+
+
+def _add_column(inspector, table, column):
+    if column.name not in {c["name"] for c in inspector.get_columns(table)}:
+        op.add_column(table, column)
+
+
+def _create_index(inspector, name, table, columns):
+    if name not in {i["name"] for i in inspector.get_indexes(table)}:
+        op.create_index(name, table, columns)
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    _create_table(
+        inspector, "mail_outbox",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("to_email", sa.String(255), nullable=False),
+        sa.Column("subject", sa.String(255), nullable=False),
+        sa.Column("body", sa.Text(), nullable=False),
+        sa.Column("status", OUTBOX_STATUS, nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("next_attempt_at", sa.DateTime(), nullable=False),
+        sa.Column("claimed_by", sa.String(64), nullable=True),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("sent_at", sa.DateTime(), nullable=True),
+    )
+    _create_index(inspector, "ix_mail_outbox_status_next", "mail_outbox", ["status", "next_attempt_at"])
+    _create_index(inspector, "ix_mail_outbox_claimed_by", "mail_outbox", ["claimed_by"])
+
+    _create_table(
+        inspector, "resource_versions",
+        sa.Column("name", sa.String(32), primary_key=True),
+        sa.Column("version", sa.Integer(), nullable=False),
+    )
+    _create_table(
+        inspector, "report_ticket_counts",
+        sa.Column("status", sa.String(20), primary_key=True),
+        sa.Column("assignee_id", sa.Integer(), primary_key=True),
+        sa.Column("count", sa.Integer(), nullable=False),
+    )
+    _create_table(
+        inspector, "report_open_by_day",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("count", sa.Integer(), nullable=False),
+    )
+    _create_table(
+        inspector, "report_daily",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("assignee_id", sa.Integer(), primary_key=True),
+        sa.Column("created", sa.Integer(), nullable=False),
+        sa.Column("resolved", sa.Integer(), nullable=False),
+        sa.Column("resolve_seconds", sa.BigInteger(), nullable=False),
+    )
+    _create_table(
+        inspector, "report_resolve_buckets",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("bucket", sa.Integer(), primary_key=True),
+        sa.Column("count", sa.Integer(), nullable=False),
+    )
+    _create_table(
+        inspector, "blobs",
+        sa.Column("sha256", sa.String(64), primary_key=True),
+        sa.Column("size", sa.Integer(), nullable=False),
+        sa.Column("refcount", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+
+    _add_column(inspector, "tickets", sa.Column("resolved_at", sa.DateTime(), nullable=True))
+    _add_column(inspector, "tickets", sa.Column("children_version", sa.Integer(), nullable=False, server_default="0"))
+    for name, columns in TICKET_INDEXES.items():
+        _create_index(inspector, name, "tickets", columns)
+    _create_index(inspector, "ix_comments_ticket_id", "comments", ["ticket_id", "id"])
+
+    if "sha256" not in {c["name"] for c in inspector.get_columns("attachments")}:
+        op.add_column("attachments", sa.Column("sha256", sa.String(64), nullable=True))
+        # SQLite can't add a constraint without rebuilding the table (and dropping the
+        # search triggers on it); it doesn't enforce foreign keys by default anyway
+        if op.get_bind().dialect.name != "sqlite":
+            op.create_foreign_key("fk_attachments_sha256_blobs", "attachments", "blobs", ["sha256"], ["sha256"])
+    _add_column(inspector, "attachments", sa.Column("size", sa.BigInteger(), nullable=True))
+    _add_column(inspector, "attachments", sa.Column("mime_type", sa.String(100), nullable=True))
+    _add_column(inspector, "attachments", sa.Column("processed_at", sa.DateTime(), nullable=True))
+    _add_column(inspector, "attachments", sa.Column("has_thumbnail", sa.Boolean(), nullable=False, server_default=sa.false()))
+    _add_column(inspector, "attachments", sa.Column("entries", sa.JSON(), nullable=True))
+    _add_column(inspector, "attachments", sa.Column("text_content", sa.Text(), nullable=True))
+    _create_index(inspector, "ix_attachments_ticket_id", "attachments", ["ticket_id"])
+    _create_index(inspector, "ix_attachments_sha256", "attachments", ["sha256"])
+
+    # tickets resolved before resolved_at was recorded: the last update is the best estimate
+    op.execute("UPDATE tickets SET resolved_at = updated_at WHERE status = 'RESOLVED' AND resolved_at IS NULL")
+
+
+def downgrade():
+    for name in ("ix_attachments_sha256", "ix_attachments_ticket_id"):
+        op.drop_index(name, table_name="attachments")
+    with op.batch_alter_table("attachments") as batch:
+        if op.get_bind().dialect.name != "sqlite":
+            batch.drop_constraint("fk_attachments_sha256_blobs", type_="foreignkey")
+        for column in ("text_content", "entries", "has_thumbnail", "processed_at", "mime_type", "size", "sha256"):
+            batch.drop_column(column)
+    op.drop_index("ix_comments_ticket_id", table_name="comments")
+    for name in TICKET_INDEXES:
+        op.drop_index(name, table_name="tickets")
+    with op.batch_alter_table("tickets") as batch:
+        batch.drop_column("children_version")
+        batch.drop_column("resolved_at")
+    for table in ("blobs", "report_resolve_buckets", "report_daily", "report_open_by_day",
+                  "report_ticket_counts", "resource_versions"):
+        op.drop_table(table)
+    op.drop_index("ix_mail_outbox_claimed_by", table_name="mail_outbox")
+    op.drop_index("ix_mail_outbox_status_next", table_name="mail_outbox")
+    op.drop_table("mail_outbox")
+    OUTBOX_STATUS.drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,69 @@
+"""archive tables for resolved tickets, their comments and attachments (see archive.py)
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+# the type already exists on PostgreSQL (tickets.status)
+TICKET_STATUS = sa.Enum("OPEN", "IN_PROGRESS", "RESOLVED", name="ticketstatus").with_variant(
+    postgresql.ENUM("OPEN", "IN_PROGRESS", "RESOLVED", name="ticketstatus", create_type=False), "postgresql")
+
+
+def upgrade():
+    op.create_table(
+        "tickets_archive",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column("title", sa.String(255), nullable=False),
+        sa.Column("description", sa.String(4000), nullable=False),
+        sa.Column("status", TICKET_STATUS, nullable=False),
+        sa.Column("creator_id", sa.Integer(), nullable=False),
+        sa.Column("assignee_id", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.Column("resolved_at", sa.DateTime(), nullable=True),
+        sa.Column("children_version", sa.Integer(), nullable=False),
+        sa.Column("archived_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_tickets_archive_updated_id", "tickets_archive", ["updated_at", "id"])
+    op.create_index("ix_tickets_archive_assignee_updated_id", "tickets_archive", ["assignee_id", "updated_at", "id"])
+    op.create_index("ix_tickets_archive_creator_updated_id", "tickets_archive", ["creator_id", "updated_at", "id"])
+    op.create_table(
+        "comments_archive",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column("ticket_id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_comments_archive_ticket_id", "comments_archive", ["ticket_id", "id"])
+    op.create_table(
+        "attachments_archive",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column("ticket_id", sa.Integer(), nullable=False),
+        sa.Column("filename", sa.String(512), nullable=False),
+        sa.Column("path", sa.String(1024), nullable=False),
+        sa.Column("sha256", sa.String(64), nullable=True),
+        sa.Column("uploaded_at", sa.DateTime(), nullable=False),
+        sa.Column("size", sa.BigInteger(), nullable=True),
+        sa.Column("mime_type", sa.String(100), nullable=True),
+        sa.Column("processed_at", sa.DateTime(), nullable=True),
+        sa.Column("has_thumbnail", sa.Boolean(), nullable=False),
+        sa.Column("entries", sa.JSON(), nullable=True),
+        sa.Column("text_content", sa.Text(), nullable=True),
+    )
+    op.create_index("ix_attachments_archive_ticket_id", "attachments_archive", ["ticket_id"])
+
+
+def downgrade():
+    op.drop_table("attachments_archive")
+    op.drop_table("comments_archive")
+    op.drop_table("tickets_archive")
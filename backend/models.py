@@ -1,5 +1,6 @@
-from datetime import datetime
-from sqlalchemy import String, Integer, DateTime, Enum, ForeignKey, Text
+from datetime import date, datetime
+from sqlalchemy import (String, Integer, BigInteger, Boolean, Date, DateTime, Enum, ForeignKey, Text, Index, JSON,
+                        Column, Table)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from db import Base
 import enum
@@ -42,9 +43,21 @@ class Ticket(Base):
 
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    resolved_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    # bumped whenever a comment or attachment is added/removed; with updated_at it versions the ticket detail
+    children_version: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
 
-    comments: Mapped[list["Comment"]] = relationship("Comment", back_populates="ticket", cascade="all, delete-orphan")
-    attachments: Mapped[list["Attachment"]] = relationship("Attachment", back_populates="ticket", cascade="all, delete-orphan")
+    comments: Mapped[list["Comment"]] = relationship("Comment", back_populates="ticket", cascade="all, delete-orphan", order_by="Comment.id")
+    attachments: Mapped[list["Attachment"]] = relationship("Attachment", back_populates="ticket", cascade="all, delete-orphan", order_by="Attachment.id")
+
+    # composite indexes matching the keyset order (updated_at, id) of GET /api/tickets
+    __table_args__ = (
+        Index("ix_tickets_updated_id", "updated_at", "id"),
+        Index("ix_tickets_status_updated_id", "status", "updated_at", "id"),
+        Index("ix_tickets_assignee_updated_id", "assignee_id", "updated_at", "id"),
+        Index("ix_tickets_creator_updated_id", "creator_id", "updated_at", "id"),
+        Index("ix_tickets_created_at", "created_at"),
+    )
 
 class Comment(Base):
     __tablename__ = "comments"
@@ -55,14 +68,114 @@ class Comment(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
     ticket: Mapped[Ticket] = relationship("Ticket", back_populates="comments")
-    user: Mapped[User] = relationship("User")
+    # comments are always rendered with their author, so load it in the same SELECT
+    user: Mapped[User] = relationship("User", lazy="joined")
+
+    __table_args__ = (Index("ix_comments_ticket_id", "ticket_id", "id"),)
+
+class OutboxStatus(str, enum.Enum):
+    PENDING = "PENDING"
+    SENT = "SENT"
+    DEAD = "DEAD"
+
+class OutboxMessage(Base):
+    __tablename__ = "mail_outbox"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    to_email: Mapped[str] = mapped_column(String(255))
+    subject: Mapped[str] = mapped_column(String(255))
+    body: Mapped[str] = mapped_column(Text)
+    status: Mapped[OutboxStatus] = mapped_column(Enum(OutboxStatus), default=OutboxStatus.PENDING)
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    next_attempt_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    claimed_by: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    sent_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_mail_outbox_status_next", "status", "next_attempt_at"),
+        Index("ix_mail_outbox_claimed_by", "claimed_by"),
+    )
+
+class ResourceVersion(Base):
+    """Change counter per collection ("tickets", "users") driving list ETags."""
+    __tablename__ = "resource_versions"
+    name: Mapped[str] = mapped_column(String(32), primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, default=0)
+
+# ----- Reporting rollups (maintained by reports.RollupDelta) -----
+class ReportTicketCount(Base):
+    """Current number of tickets per (status, assignee); assignee 0 = unassigned."""
+    __tablename__ = "report_ticket_counts"
+    status: Mapped[str] = mapped_column(String(20), primary_key=True)
+    assignee_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    count: Mapped[int] = mapped_column(Integer, default=0)
+
+class ReportOpenByDay(Base):
+    """Unresolved tickets by the day they were created, for backlog age."""
+    __tablename__ = "report_open_by_day"
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    count: Mapped[int] = mapped_column(Integer, default=0)
+
+class ReportDaily(Base):
+    """Tickets created/resolved per day and assignee, with summed resolve time."""
+    __tablename__ = "report_daily"
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    assignee_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    created: Mapped[int] = mapped_column(Integer, default=0)
+    resolved: Mapped[int] = mapped_column(Integer, default=0)
+    resolve_seconds: Mapped[int] = mapped_column(BigInteger, default=0)
+
+class ReportResolveBucket(Base):
+    """Histogram of time-to-resolve per resolution day (bucket bounds in reports.RESOLVE_BUCKET_HOURS)."""
+    __tablename__ = "report_resolve_buckets"
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    bucket: Mapped[int] = mapped_column(Integer, primary_key=True)
+    count: Mapped[int] = mapped_column(Integer, default=0)
+
+class Blob(Base):
+    """Content-addressed upload shared by every attachment with the same bytes."""
+    __tablename__ = "blobs"
+    sha256: Mapped[str] = mapped_column(String(64), primary_key=True)
+    size: Mapped[int] = mapped_column(Integer)
+    refcount: Mapped[int] = mapped_column(Integer, default=1)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
 class Attachment(Base):
     __tablename__ = "attachments"
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    ticket_id: Mapped[int] = mapped_column(ForeignKey("tickets.id"))
+    ticket_id: Mapped[int] = mapped_column(ForeignKey("tickets.id"), index=True)
     filename: Mapped[str] = mapped_column(String(512))
     path: Mapped[str] = mapped_column(String(1024))
+    sha256: Mapped[str | None] = mapped_column(ForeignKey("blobs.sha256"), nullable=True, index=True)
     uploaded_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    size: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    mime_type: Mapped[str | None] = mapped_column(String(100), nullable=True)
+    # filled in by attachments.py after upload; processed_at stays NULL until then
+    processed_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    has_thumbnail: Mapped[bool] = mapped_column(Boolean, default=False)
+    entries: Mapped[list | None] = mapped_column(JSON, nullable=True)  # zip listing
+    # extracted .txt/.log text for search; deferred so ticket reads don't load it
+    text_content: Mapped[str | None] = mapped_column(Text, nullable=True, deferred=True)
 
     ticket: Mapped[Ticket] = relationship("Ticket", back_populates="attachments")
+
+# ----- Archive (maintained by archive.py) -----
+# RESOLVED tickets older than ARCHIVE_AFTER_DAYS move here with their comments and
+# attachments, so the hot tables and their indexes stay sized by current work.
+# Rows keep their ids; there are no ORM classes, archived tickets are read-only.
+def _archive_table(model, *extra) -> Table:
+    """Same columns as ``model``'s table, without defaults or foreign keys to the hot tables."""
+    columns = [Column(c.name, c.type, primary_key=c.primary_key, nullable=c.nullable, autoincrement=False)
+               for c in model.__table__.columns]
+    return Table(f"{model.__tablename__}_archive", Base.metadata, *columns, *extra)
+
+tickets_archive = _archive_table(
+    Ticket,
+    Column("archived_at", DateTime, nullable=False),
+    Index("ix_tickets_archive_updated_id", "updated_at", "id"),
+    Index("ix_tickets_archive_assignee_updated_id", "assignee_id", "updated_at", "id"),
+    Index("ix_tickets_archive_creator_updated_id", "creator_id", "updated_at", "id"),
+)
+comments_archive = _archive_table(Comment, Index("ix_comments_archive_ticket_id", "ticket_id", "id"))
+attachments_archive = _archive_table(Attachment, Index("ix_attachments_archive_ticket_id", "ticket_id"))
@@ -0,0 +1,152 @@
+import base64
+from datetime import datetime
+from sqlalchemy import Select, literal, select, tuple_
+from config import Config
+from models import Ticket, TicketStatus, tickets_archive
+
+# the columns GET /api/tickets returns, selected as plain rows instead of ORM entities
+TICKET_COLUMNS = (Ticket.id, Ticket.title, Ticket.description, Ticket.status, Ticket.creator_id,
+                  Ticket.assignee_id, Ticket.created_at, Ticket.updated_at)
+
+def select_ticket_rows(cols=Ticket) -> Select:
+    """TICKET_COLUMNS from ``cols``: the Ticket model or ``tickets_archive.c``."""
+    if cols is Ticket:
+        return select(*TICKET_COLUMNS)
+    return select(*(cols[c.key] for c in TICKET_COLUMNS))
+
+def encode_cursor(updated_at: datetime, ticket_id: int) -> str:
+    raw = f"{updated_at.isoformat()}|{ticket_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        ts, ticket_id = base64.urlsafe_b64decode(padded).decode().split("|", 1)
+        return datetime.fromisoformat(ts), int(ticket_id)
+    except Exception:
+        raise ValueError("invalid cursor")
+
+def parse_datetime(value: str | None, field: str) -> datetime | None:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} must be an ISO-8601 date or datetime")
+
+def filter_tickets(q: Select, status: str | None = None, creator_id: int | None = None,
+                   assignee_id: int | None = None, unassigned: bool = False,
+                   created_after: datetime | None = None, created_before: datetime | None = None,
+                   updated_after: datetime | None = None, updated_before: datetime | None = None,
+                   cols=Ticket) -> Select:
+    if status:
+        try:
+            q = q.where(cols.status == TicketStatus(status))
+        except ValueError:
+            raise ValueError(f"unknown status {status}")
+    if creator_id is not None:
+        q = q.where(cols.creator_id == creator_id)
+    if unassigned:
+        q = q.where(cols.assignee_id.is_(None))
+    elif assignee_id is not None:
+        q = q.where(cols.assignee_id == assignee_id)
+    if created_after:
+        q = q.where(cols.created_at >= created_after)
+    if created_before:
+        q = q.where(cols.created_at < created_before)
+    if updated_after:
+        q = q.where(cols.updated_at >= updated_after)
+    if updated_before:
+        q = q.where(cols.updated_at < updated_before)
+    return q
+
+# GET /api/tickets?archived=: 0 hot tables only, 1 hot and archived, only archived
+ARCHIVED_SOURCES = {"0": (Ticket,), "1": (Ticket, tickets_archive.c), "only": (tickets_archive.c,)}
+
+def ticket_list_query(args, user_id: int) -> tuple[Select | list[Select], int, str, int | None]:
+    """Parse GET /api/tickets query args into (query, limit, order, creator_id); ValueError on bad input.
+
+    ``args`` is any mapping with ``.get`` (Werkzeug MultiDict or Starlette QueryParams).
+    With ``archived=1`` the query is a list, one SELECT per table, for ``keyset_page``.
+    """
+    limit = min(max(int(args.get('limit', Config.TICKETS_PAGE_SIZE)), 1), Config.TICKETS_PAGE_MAX)
+    order = args.get('order', 'desc')
+    if order not in ('asc', 'desc'):
+        raise ValueError("order must be asc or desc")
+    creator_id = int(args['creator_id']) if args.get('creator_id') else None
+    if args.get('my') == '1':
+        creator_id = user_id
+    assignee = args.get('assignee_id')
+    archived = args.get('archived', '0')
+    if archived not in ARCHIVED_SOURCES:
+        raise ValueError("archived must be 0, 1 or only")
+    filters = dict(
+        status=args.get('status'),
+        creator_id=creator_id,
+        assignee_id=int(assignee) if assignee and assignee != 'none' else None,
+        unassigned=assignee == 'none',
+        created_after=parse_datetime(args.get('created_after'), 'created_after'),
+        created_before=parse_datetime(args.get('created_before'), 'created_before'),
+        updated_after=parse_datetime(args.get('updated_after'), 'updated_after'),
+        updated_before=parse_datetime(args.get('updated_before'), 'updated_before'),
+    )
+    if archived == '0':
+        return filter_tickets(select_ticket_rows(), **filters), limit, order, creator_id
+    queries = [
+        filter_tickets(select_ticket_rows(cols).add_columns(literal(cols is not Ticket).label("archived")),
+                       cols=cols, **filters)
+        for cols in ARCHIVED_SOURCES[archived]
+    ]
+    return queries if len(queries) > 1 else queries[0], limit, order, creator_id
+
+FILTER_KEYS = ("status", "creator_id", "assignee_id", "created_after", "created_before", "updated_after", "updated_before")
+
+def parse_filter(where: dict) -> dict:
+    """Turn a ``{key: value}`` filter (API body, query string or CLI --where) into filter_tickets kwargs."""
+    unknown = set(where) - set(FILTER_KEYS)
+    if unknown:
+        raise ValueError(f"unknown filter keys: {', '.join(sorted(unknown))}")
+    kwargs = {"status": where.get("status")}
+    try:
+        if where.get("creator_id") is not None:
+            kwargs["creator_id"] = int(where["creator_id"])
+        if "assignee_id" in where:
+            if where["assignee_id"] in (None, "none"):
+                kwargs["unassigned"] = True
+            else:
+                kwargs["assignee_id"] = int(where["assignee_id"])
+    except (TypeError, ValueError):
+        raise ValueError("creator_id and assignee_id must be integers")
+    for key in ("created_after", "created_before", "updated_after", "updated_before"):
+        kwargs[key] = parse_datetime(where.get(key), key)
+    return kwargs
+
+def keyset_page(db, q: Select | list[Select], limit: int, cursor: str | None = None, order: str = "desc"):
+    """Return one page of rows ordered by (updated_at, id) and the cursor of the next page.
+
+    ``q`` selects ticket columns (see ``select_ticket_rows``); rows come back as-is.
+    A list of queries (hot and archived tickets) is paged as one: each table is
+    seeked separately and the pages are merged, ids being unique across them.
+
+    The WHERE clause seeks past the cursor instead of using OFFSET, so with the
+    composite indexes on ``tickets`` every page costs the same as the first one.
+    """
+    last = decode_cursor(cursor) if cursor else None
+    rows = []
+    for part in q if isinstance(q, list) else [q]:
+        cols = part.selected_columns
+        if last:
+            key = tuple_(cols.updated_at, cols.id)
+            part = part.where(key < tuple_(*last) if order == "desc" else key > tuple_(*last))
+        if order == "desc":
+            part = part.order_by(cols.updated_at.desc(), cols.id.desc())
+        else:
+            part = part.order_by(cols.updated_at.asc(), cols.id.asc())
+        rows += db.execute(part.limit(limit + 1)).all()
+    if isinstance(q, list):
+        rows.sort(key=lambda r: (r.updated_at, r.id), reverse=order == "desc")
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].updated_at, rows[-1].id)
+    return rows, next_cursor
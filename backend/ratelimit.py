@@ -0,0 +1,40 @@
+import threading
+import time
+from collections import OrderedDict
+
+class TokenBucketLimiter:
+    """In-process token buckets, one per key (client IP, email, ...).
+
+    Each bucket holds up to ``burst`` tokens and refills at ``rate_per_minute``.
+    The number of tracked keys is capped; the least recently seen are dropped.
+    """
+
+    def __init__(self, rate_per_minute: float, burst: int, max_keys: int = 100_000):
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def allow(self, key: str, cost: float = 1.0) -> tuple[bool, float]:
+        """Take ``cost`` tokens from ``key``'s bucket.
+
+        Returns ``(allowed, retry_after_seconds)``.
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(key, (float(self.burst), now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        retry_after = 0.0 if allowed else (cost - tokens) / self.rate if self.rate else float("inf")
+        return allowed, retry_after
+
+    def reset(self, key: str):
+        with self._lock:
+            self._buckets.pop(key, None)
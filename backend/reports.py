@@ -0,0 +1,172 @@
+import bisect
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+from sqlalchemy import select, func, delete, union_all
+from db import upsert_increments
+from models import (Ticket, TicketStatus, User, ReportTicketCount, ReportOpenByDay,
+                    ReportDaily, ReportResolveBucket, tickets_archive)
+
+# upper bounds (hours) of the time-to-resolve histogram; the last bucket is open-ended
+RESOLVE_BUCKET_HOURS = [1, 2, 4, 8, 12, 24, 48, 72, 120, 168, 336, 720]
+BACKLOG_AGE_DAYS = [(0, 1, "<1d"), (1, 3, "1-3d"), (3, 7, "3-7d"), (7, 14, "7-14d"), (14, 30, "14-30d"), (30, None, ">30d")]
+
+def _resolve_bucket(seconds: float) -> int:
+    return bisect.bisect_left(RESOLVE_BUCKET_HOURS, seconds / 3600)
+
+class RollupDelta:
+    """Accumulates rollup changes for a batch of ticket writes.
+
+    Call ``ticket_changed`` for every ticket whose status or assignee changed
+    (``old_status=None`` for a new ticket), then ``apply`` once inside the same
+    transaction; deltas for the same key are merged into a single upsert.
+    """
+
+    def __init__(self):
+        self.counts = Counter()
+        self.open_days = Counter()
+        self.daily = defaultdict(lambda: [0, 0, 0])
+        self.buckets = Counter()
+
+    def ticket_changed(self, created_at: datetime, old_status, old_assignee, new_status, new_assignee,
+                       now: datetime | None = None):
+        now = now or datetime.utcnow()
+        old_status = TicketStatus(old_status) if old_status else None
+        new_status = TicketStatus(new_status)
+        if old_status is not None:
+            self.counts[(old_status.value, old_assignee or 0)] -= 1
+        self.counts[(new_status.value, new_assignee or 0)] += 1
+
+        was_open = old_status is not None and old_status != TicketStatus.RESOLVED
+        is_open = new_status != TicketStatus.RESOLVED
+        self.open_days[created_at.date()] += int(is_open) - int(was_open)
+        if old_status is None:
+            self.daily[(created_at.date(), new_assignee or 0)][0] += 1
+        if new_status == TicketStatus.RESOLVED and old_status != TicketStatus.RESOLVED:
+            seconds = max((now - created_at).total_seconds(), 0)
+            row = self.daily[(now.date(), new_assignee or 0)]
+            row[1] += 1
+            row[2] += int(seconds)
+            self.buckets[(now.date(), _resolve_bucket(seconds))] += 1
+
+    def apply(self, db):
+        # one executemany per rollup table; keys are sorted so concurrent writers lock rows in the same order
+        upsert_increments(db, ReportTicketCount, ["status", "assignee_id"],
+                          [{"status": s, "assignee_id": a, "count": n} for (s, a), n in sorted(self.counts.items()) if n])
+        upsert_increments(db, ReportOpenByDay, ["day"],
+                          [{"day": d, "count": n} for d, n in sorted(self.open_days.items()) if n])
+        upsert_increments(db, ReportDaily, ["day", "assignee_id"],
+                          [{"day": d, "assignee_id": a, "created": c, "resolved": r, "resolve_seconds": secs}
+                           for (d, a), (c, r, secs) in sorted(self.daily.items()) if c or r])
+        upsert_increments(db, ReportResolveBucket, ["day", "bucket"],
+                          [{"day": d, "bucket": b, "count": n} for (d, b), n in sorted(self.buckets.items())])
+
+def track(db, t: Ticket, old_status, old_assignee):
+    """Record one ORM ticket's change (after its new values are set) and stamp resolved_at."""
+    now = datetime.utcnow()
+    if t.status == TicketStatus.RESOLVED and old_status != TicketStatus.RESOLVED:
+        t.resolved_at = now
+    elif t.status != TicketStatus.RESOLVED and t.resolved_at is not None:
+        # assigning even an unchanged None would make the ticket dirty and cost an UPDATE
+        t.resolved_at = None
+    if old_status == t.status and old_assignee == t.assignee_id:
+        return
+    delta = RollupDelta()
+    delta.ticket_changed(t.created_at or now, old_status, old_assignee, t.status, t.assignee_id, now)
+    delta.apply(db)
+
+# ----- Backfill -----
+def backfill(db) -> int:
+    """Rebuild every rollup from the tickets and tickets_archive tables (resolve time uses
+    resolved_at, falling back to updated_at for tickets resolved before it was recorded)."""
+    for model in (ReportTicketCount, ReportOpenByDay, ReportDaily, ReportResolveBucket):
+        db.execute(delete(model))
+    delta = RollupDelta()
+    n = 0
+    columns = ("created_at", "updated_at", "resolved_at", "status", "assignee_id")
+    rows = db.execute(union_all(
+        select(*(Ticket.__table__.c[c] for c in columns)),
+        select(*(tickets_archive.c[c] for c in columns)),
+    ).execution_options(yield_per=5000))
+    for created_at, updated_at, resolved_at, status, assignee_id in rows:
+        delta.ticket_changed(created_at, None, None, TicketStatus.OPEN, assignee_id, created_at)
+        if status != TicketStatus.OPEN:
+            delta.ticket_changed(created_at, TicketStatus.OPEN, assignee_id, status, assignee_id,
+                                 resolved_at or updated_at)
+        n += 1
+    delta.apply(db)
+    return n
+
+# ----- Report -----
+def _median_hours(bucket_counts: Counter) -> float | None:
+    total = sum(bucket_counts.values())
+    if not total:
+        return None
+    half = total / 2
+    seen = 0
+    for bucket in range(len(RESOLVE_BUCKET_HOURS) + 1):
+        count = bucket_counts.get(bucket, 0)
+        if count and seen + count >= half:
+            lower = RESOLVE_BUCKET_HOURS[bucket - 1] if bucket else 0
+            upper = RESOLVE_BUCKET_HOURS[bucket] if bucket < len(RESOLVE_BUCKET_HOURS) else lower * 2
+            # linear interpolation inside the bucket
+            return round(lower + (upper - lower) * (half - seen) / count, 2)
+        seen += count
+    return None
+
+def build_report(db, days: int, today: date | None = None) -> dict:
+    today = today or datetime.utcnow().date()
+    since = today - timedelta(days=days - 1)
+
+    counts = db.execute(select(ReportTicketCount.status, ReportTicketCount.assignee_id, ReportTicketCount.count)
+                        .where(ReportTicketCount.count != 0)).all()
+    status_counts = {s.value: 0 for s in TicketStatus}
+    load = defaultdict(lambda: {s.value: 0 for s in TicketStatus})
+    for status, assignee_id, n in counts:
+        status_counts[status] += n
+        if assignee_id:
+            load[assignee_id][status] += n
+
+    backlog_age = []
+    open_days = db.execute(select(ReportOpenByDay.day, ReportOpenByDay.count).where(ReportOpenByDay.count > 0)).all()
+    for lo, hi, label in BACKLOG_AGE_DAYS:
+        n = sum(c for day, c in open_days if (today - day).days >= lo and (hi is None or (today - day).days < hi))
+        backlog_age.append({"bucket": label, "count": n})
+
+    buckets = Counter()
+    for bucket, n in db.execute(select(ReportResolveBucket.bucket, func.sum(ReportResolveBucket.count))
+                                .where(ReportResolveBucket.day >= since).group_by(ReportResolveBucket.bucket)):
+        buckets[bucket] = int(n)
+
+    daily = defaultdict(lambda: {"created": 0, "resolved": 0})
+    throughput = defaultdict(lambda: {"resolved": 0, "resolve_seconds": 0})
+    for day, assignee_id, created, resolved, seconds in db.execute(
+            select(ReportDaily.day, ReportDaily.assignee_id, ReportDaily.created, ReportDaily.resolved,
+                   ReportDaily.resolve_seconds).where(ReportDaily.day >= since)):
+        daily[day]["created"] += created
+        daily[day]["resolved"] += resolved
+        if assignee_id:
+            throughput[assignee_id]["resolved"] += resolved
+            throughput[assignee_id]["resolve_seconds"] += seconds
+
+    assignee_ids = set(load) | set(throughput)
+    names = dict(db.execute(select(User.id, User.name).where(User.id.in_(assignee_ids))).all()) if assignee_ids else {}
+    assignees = []
+    for assignee_id in sorted(assignee_ids):
+        resolved = throughput[assignee_id]["resolved"]
+        assignees.append({
+            "assignee_id": assignee_id,
+            "name": names.get(assignee_id),
+            "open": load[assignee_id][TicketStatus.OPEN.value],
+            "in_progress": load[assignee_id][TicketStatus.IN_PROGRESS.value],
+            "resolved_in_window": resolved,
+            "mean_hours_to_resolve": round(throughput[assignee_id]["resolve_seconds"] / resolved / 3600, 2) if resolved else None,
+        })
+
+    return {
+        "window": {"days": days, "from": since.isoformat(), "to": today.isoformat()},
+        "status_counts": status_counts,
+        "backlog_age": backlog_age,
+        "time_to_resolve": {"resolved": sum(buckets.values()), "median_hours": _median_hours(buckets)},
+        "assignees": assignees,
+        "daily": [{"day": (since + timedelta(days=i)).isoformat(), **daily[since + timedelta(days=i)]} for i in range(days)],
+    }
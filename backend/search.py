@@ -0,0 +1,220 @@
+import logging
+from sqlalchemy import text, select, or_
+from sqlalchemy.exc import OperationalError
+from models import Ticket, Comment, Attachment
+
+log = logging.getLogger(__name__)
+
+SNIPPET_START = "<mark>"
+SNIPPET_END = "</mark>"
+
+# ----- Index DDL -----
+# SQLite: external-content FTS5 tables kept in sync by triggers. The update
+# trigger only fires on the indexed columns, so status/assignee changes are free.
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS tickets_fts USING fts5(title, description, content='tickets', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS comments_fts USING fts5(content, content='comments', content_rowid='id', tokenize='porter unicode61')",
+    # text extracted from .txt/.log attachments by attachments.py
+    "CREATE VIRTUAL TABLE IF NOT EXISTS attachments_fts USING fts5(text_content, content='attachments', content_rowid='id', tokenize='porter unicode61')",
+    """CREATE TRIGGER IF NOT EXISTS tickets_fts_ai AFTER INSERT ON tickets BEGIN
+        INSERT INTO tickets_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS tickets_fts_ad AFTER DELETE ON tickets BEGIN
+        INSERT INTO tickets_fts(tickets_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS tickets_fts_au AFTER UPDATE OF title, description ON tickets BEGIN
+        INSERT INTO tickets_fts(tickets_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO tickets_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS comments_fts_ai AFTER INSERT ON comments BEGIN
+        INSERT INTO comments_fts(rowid, content) VALUES (new.id, new.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS comments_fts_ad AFTER DELETE ON comments BEGIN
+        INSERT INTO comments_fts(comments_fts, rowid, content) VALUES ('delete', old.id, old.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS comments_fts_au AFTER UPDATE OF content ON comments BEGIN
+        INSERT INTO comments_fts(comments_fts, rowid, content) VALUES ('delete', old.id, old.content);
+        INSERT INTO comments_fts(rowid, content) VALUES (new.id, new.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS attachments_fts_ai AFTER INSERT ON attachments WHEN new.text_content IS NOT NULL BEGIN
+        INSERT INTO attachments_fts(rowid, text_content) VALUES (new.id, new.text_content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS attachments_fts_ad AFTER DELETE ON attachments WHEN old.text_content IS NOT NULL BEGIN
+        INSERT INTO attachments_fts(attachments_fts, rowid, text_content) VALUES ('delete', old.id, old.text_content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS attachments_fts_au AFTER UPDATE OF text_content ON attachments BEGIN
+        INSERT INTO attachments_fts(attachments_fts, rowid, text_content) SELECT 'delete', old.id, old.text_content WHERE old.text_content IS NOT NULL;
+        INSERT INTO attachments_fts(rowid, text_content) SELECT new.id, new.text_content WHERE new.text_content IS NOT NULL;
+    END""",
+]
+FTS_TABLES = ("tickets_fts", "comments_fts", "attachments_fts")
+
+# PostgreSQL: stored generated tsvector columns (always in sync) with GIN indexes.
+POSTGRES_DDL = [
+    """ALTER TABLE tickets ADD COLUMN IF NOT EXISTS search_tsv tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'B')) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_tickets_search_tsv ON tickets USING gin (search_tsv)",
+    """ALTER TABLE comments ADD COLUMN IF NOT EXISTS search_tsv tsvector GENERATED ALWAYS AS (
+        to_tsvector('english', coalesce(content, ''))) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_comments_search_tsv ON comments USING gin (search_tsv)",
+    """ALTER TABLE attachments ADD COLUMN IF NOT EXISTS search_tsv tsvector GENERATED ALWAYS AS (
+        to_tsvector('english', coalesce(text_content, ''))) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_attachments_search_tsv ON attachments USING gin (search_tsv)",
+]
+POSTGRES_INDEXES = ("ix_tickets_search_tsv", "ix_comments_search_tsv", "ix_attachments_search_tsv")
+
+_backend = "like"
+
+def install(engine):
+    """Create the search index objects for the engine's dialect (idempotent)."""
+    global _backend
+    dialect = engine.dialect.name
+    ddl = {"sqlite": SQLITE_DDL, "postgresql": POSTGRES_DDL}.get(dialect)
+    if ddl is None:
+        _backend = "like"
+        return _backend
+    try:
+        with engine.begin() as conn:
+            fresh = [] if dialect != "sqlite" else [
+                table for table in FTS_TABLES
+                if conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = :t"), {"t": table}).first() is None
+            ]
+            for stmt in ddl:
+                conn.execute(text(stmt))
+            for table in fresh:
+                # index rows that existed before the FTS table did
+                conn.execute(text(f"INSERT INTO {table}({table}) VALUES ('rebuild')"))
+        _backend = dialect
+    except OperationalError as e:
+        # e.g. an SQLite build without FTS5
+        log.warning("full-text search unavailable, falling back to LIKE: %s", e)
+        _backend = "like"
+    return _backend
+
+def rebuild(engine) -> str:
+    """Rebuild the index from scratch, for bulk loads or after restoring a dump."""
+    backend = install(engine)
+    with engine.begin() as conn:
+        if backend == "sqlite":
+            for table in FTS_TABLES:
+                conn.execute(text(f"INSERT INTO {table}({table}) VALUES ('rebuild')"))
+                conn.execute(text(f"INSERT INTO {table}({table}) VALUES ('optimize')"))
+        elif backend == "postgresql":
+            for index in POSTGRES_INDEXES:
+                conn.execute(text(f"REINDEX INDEX {index}"))
+    return backend
+
+# ----- Queries -----
+def _fts5_query(q: str) -> str:
+    # quote every term so user input can't hit FTS5 syntax; prefix-match the last one
+    terms = ['"' + term.replace('"', '""') + '"' for term in q.split()]
+    if terms:
+        terms[-1] += "*"
+    return " ".join(terms)
+
+# visibility: with :creator_id set, only hits on that user's own tickets (staff search with NULL)
+def _visible(alias: str, param: str = ":creator_id") -> str:
+    return f"({param} IS NULL OR {alias}.creator_id = :creator_id)"
+
+SQLITE_SEARCH = text(f"""
+    SELECT kind, ticket_id, comment_id, attachment_id, rank, snippet FROM (
+        SELECT 'ticket' AS kind, tickets_fts.rowid AS ticket_id, NULL AS comment_id, NULL AS attachment_id,
+               -bm25(tickets_fts, 10.0, 1.0) AS rank,
+               snippet(tickets_fts, -1, '{SNIPPET_START}', '{SNIPPET_END}', '…', 16) AS snippet
+        FROM tickets_fts JOIN tickets t ON t.id = tickets_fts.rowid
+        WHERE tickets_fts MATCH :q AND {_visible("t")}
+        UNION ALL
+        SELECT 'comment', c.ticket_id, c.id, NULL, -bm25(comments_fts),
+               snippet(comments_fts, 0, '{SNIPPET_START}', '{SNIPPET_END}', '…', 16)
+        FROM comments_fts JOIN comments c ON c.id = comments_fts.rowid JOIN tickets t ON t.id = c.ticket_id
+        WHERE comments_fts MATCH :q AND {_visible("t")}
+        UNION ALL
+        SELECT 'attachment', a.ticket_id, NULL, a.id, -bm25(attachments_fts),
+               snippet(attachments_fts, 0, '{SNIPPET_START}', '{SNIPPET_END}', '…', 16)
+        FROM attachments_fts JOIN attachments a ON a.id = attachments_fts.rowid JOIN tickets t ON t.id = a.ticket_id
+        WHERE attachments_fts MATCH :q AND {_visible("t")}
+    ) ORDER BY rank DESC, ticket_id, comment_id, attachment_id LIMIT :limit OFFSET :offset
+""")
+
+PG_CREATOR = "CAST(:creator_id AS integer)"  # an untyped NULL parameter can't be compared
+
+POSTGRES_SEARCH = text(f"""
+    WITH query AS (SELECT websearch_to_tsquery('english', :q) AS tsq),
+    hits AS (
+        SELECT 'ticket' AS kind, t.id AS ticket_id, NULL::integer AS comment_id, NULL::integer AS attachment_id,
+               ts_rank_cd(t.search_tsv, query.tsq) AS rank
+        FROM tickets t, query WHERE t.search_tsv @@ query.tsq AND {_visible("t", PG_CREATOR)}
+        UNION ALL
+        SELECT 'comment', c.ticket_id, c.id, NULL, ts_rank_cd(c.search_tsv, query.tsq)
+        FROM comments c JOIN tickets t ON t.id = c.ticket_id, query
+        WHERE c.search_tsv @@ query.tsq AND {_visible("t", PG_CREATOR)}
+        UNION ALL
+        SELECT 'attachment', a.ticket_id, NULL, a.id, ts_rank_cd(a.search_tsv, query.tsq)
+        FROM attachments a JOIN tickets t ON t.id = a.ticket_id, query
+        WHERE a.search_tsv @@ query.tsq AND {_visible("t", PG_CREATOR)}
+        ORDER BY rank DESC, ticket_id, comment_id, attachment_id LIMIT :limit OFFSET :offset
+    )
+    SELECT h.kind, h.ticket_id, h.comment_id, h.attachment_id, h.rank,
+           ts_headline('english',
+                       CASE h.kind WHEN 'ticket' THEN t.title || ' — ' || t.description
+                                   WHEN 'comment' THEN c.content ELSE a.text_content END,
+                       query.tsq, 'StartSel={SNIPPET_START}, StopSel={SNIPPET_END}, MaxWords=24, MinWords=8') AS snippet
+    FROM hits h CROSS JOIN query
+    JOIN tickets t ON t.id = h.ticket_id
+    LEFT JOIN comments c ON c.id = h.comment_id
+    LEFT JOIN attachments a ON a.id = h.attachment_id
+    ORDER BY h.rank DESC, h.ticket_id, h.comment_id, h.attachment_id
+""")
+
+def _like_search(db, q: str, limit: int, offset: int, creator_id: int | None):
+    pattern = f"%{q}%"
+    visible = [] if creator_id is None else [Ticket.creator_id == creator_id]
+    tickets = db.execute(
+        select(Ticket.id, Ticket.title).where(or_(Ticket.title.ilike(pattern), Ticket.description.ilike(pattern)), *visible)
+        .order_by(Ticket.id.desc()).limit(limit + offset)
+    ).all()
+    comments = db.execute(
+        select(Comment.id, Comment.ticket_id, Comment.content).join(Ticket, Ticket.id == Comment.ticket_id)
+        .where(Comment.content.ilike(pattern), *visible)
+        .order_by(Comment.id.desc()).limit(limit + offset)
+    ).all()
+    files = db.execute(
+        select(Attachment.id, Attachment.ticket_id, Attachment.text_content).join(Ticket, Ticket.id == Attachment.ticket_id)
+        .where(Attachment.text_content.ilike(pattern), *visible)
+        .order_by(Attachment.id.desc()).limit(limit + offset)
+    ).all()
+    rows = [("ticket", t.id, None, None, 0.0, t.title) for t in tickets]
+    rows += [("comment", c.ticket_id, c.id, None, 0.0, c.content[:200]) for c in comments]
+    rows += [("attachment", a.ticket_id, None, a.id, 0.0, a.text_content[:200]) for a in files]
+    return rows[offset:offset + limit]
+
+def search(db, q: str, limit: int, offset: int = 0, creator_id: int | None = None) -> list[dict]:
+    """Ranked hits over ticket titles/descriptions, comments and attachment text, best first.
+
+    With ``creator_id`` only that user's tickets are searched (students); None searches all (staff).
+    """
+    params = {"limit": limit, "offset": offset, "creator_id": creator_id}
+    if _backend == "sqlite":
+        rows = db.execute(SQLITE_SEARCH, {**params, "q": _fts5_query(q)}).all()
+    elif _backend == "postgresql":
+        rows = db.execute(POSTGRES_SEARCH, {**params, "q": q}).all()
+    else:
+        rows = _like_search(db, q, limit, offset, creator_id)
+    ticket_ids = {r[1] for r in rows}
+    tickets = {t.id: t for t in db.execute(
+        select(Ticket.id, Ticket.title, Ticket.status).where(Ticket.id.in_(ticket_ids))
+    )} if ticket_ids else {}
+    return [
+        {
+            "kind": kind,
+            "ticket_id": ticket_id,
+            "comment_id": comment_id,
+            "attachment_id": attachment_id,
+            "rank": float(rank),
+            "snippet": snippet,
+            "ticket": {"id": ticket_id, "title": tickets[ticket_id].title, "status": tickets[ticket_id].status.value},
+        }
+        for kind, ticket_id, comment_id, attachment_id, rank, snippet in rows
+        if ticket_id in tickets
+    ]
@@ -1,9 +1,9 @@
-from db import Base, engine, SessionLocal
+from db import SessionLocal, migrate
 from models import User, Role, Ticket, TicketStatus
 from auth import hash_password
 
 def seed():
-    Base.metadata.create_all(bind=engine)
+    migrate()
     with SessionLocal() as db:
         if not db.query(User).count():
             users = [
@@ -0,0 +1,154 @@
+import hashlib
+import os
+import tempfile
+import threading
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from config import Config
+from models import Blob
+
+CHUNK_SIZE = 64 * 1024
+
+# uploads live in a content-addressed tree: <UPLOAD_DIR>/blobs/ab/cd/abcd...
+UPLOAD_DIR = os.path.join(os.path.dirname(__file__), Config.UPLOAD_DIR)
+BLOB_DIR = os.path.join(UPLOAD_DIR, "blobs")
+THUMB_DIR = os.path.join(UPLOAD_DIR, "thumbs")
+TMP_DIR = os.path.join(UPLOAD_DIR, "tmp")
+os.makedirs(BLOB_DIR, exist_ok=True)
+os.makedirs(TMP_DIR, exist_ok=True)
+
+class HashingFile:
+    """Writable temp file under TMP_DIR that hashes everything written to it.
+
+    Used as Werkzeug's upload stream, so a multipart file is written to disk
+    exactly once, chunk by chunk, and its SHA-256 is known when parsing ends.
+    An uncommitted file is removed on close.
+    """
+
+    def __init__(self):
+        self._file = tempfile.NamedTemporaryFile(dir=TMP_DIR, prefix="upload-", delete=False)
+        self._sha = hashlib.sha256()
+        self.size = 0
+        self.committed = False
+
+    @property
+    def name(self) -> str:
+        return self._file.name
+
+    def write(self, data) -> int:
+        self._sha.update(data)
+        self.size += len(data)
+        return self._file.write(data)
+
+    def hexdigest(self) -> str:
+        return self._sha.hexdigest()
+
+    def finish(self):
+        """Flush and close the temp file, keeping it on disk for ``place_blob``."""
+        if not self._file.closed:
+            self._file.flush()
+            self._file.close()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+        if not self.committed and os.path.exists(self._file.name):
+            os.unlink(self._file.name)
+
+    def __getattr__(self, attr):
+        return getattr(self._file, attr)
+
+    @classmethod
+    def from_stream(cls, stream) -> "HashingFile":
+        hf = cls()
+        while True:
+            chunk = stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            hf.write(chunk)
+        return hf
+
+def blob_path(digest: str) -> str:
+    return os.path.join(BLOB_DIR, digest[:2], digest[2:4], digest)
+
+def thumb_path(digest: str) -> str:
+    """Thumbnails are derived from content, so they are shared like the blob itself."""
+    return os.path.join(THUMB_DIR, digest[:2], digest[2:4], f"{digest}.jpg")
+
+def commit_blob(db, hf: HashingFile) -> Blob:
+    """Take a reference on the blob for a finished upload, inside the caller's transaction.
+
+    Identical content is stored once; later uploads only bump ``refcount``.
+    The file itself is put in place by ``place_blob`` once the transaction has
+    committed, so a concurrent ``delete_blob_file`` can never remove it from
+    under a reference it did not see.
+    """
+    digest = hf.hexdigest()
+    hf.finish()
+    blob = db.get(Blob, digest)
+    if blob:
+        db.execute(update(Blob).where(Blob.sha256 == digest).values(refcount=Blob.refcount + 1))
+        db.refresh(blob)
+        return blob
+    try:
+        with db.begin_nested():
+            blob = Blob(sha256=digest, size=hf.size, refcount=1)
+            db.add(blob)
+    except IntegrityError:
+        # a concurrent upload of the same content inserted it first
+        db.execute(update(Blob).where(Blob.sha256 == digest).values(refcount=Blob.refcount + 1))
+        blob = db.get(Blob, digest)
+    return blob
+
+def place_blob(hf: HashingFile) -> str:
+    """Move a committed upload into the blob tree; returns its path.
+
+    The move is unconditional: identical content simply replaces the file, which
+    also restores it if a delete of the last earlier reference just unlinked it.
+    """
+    path = blob_path(hf.hexdigest())
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    os.replace(hf.name, path)
+    hf.committed = True
+    return path
+
+def release_blob(db, digest: str) -> bool:
+    """Drop one reference. Returns True when the blob is no longer referenced;
+    the caller then removes the file with ``delete_blob_file`` after committing."""
+    db.execute(update(Blob).where(Blob.sha256 == digest).values(refcount=Blob.refcount - 1))
+    blob = db.get(Blob, digest, populate_existing=True)
+    if blob and blob.refcount <= 0:
+        db.delete(blob)
+        return True
+    return False
+
+def _referenced(db, digest: str) -> bool:
+    return db.get(Blob, digest, populate_existing=True) is not None
+
+def delete_blob_file(db, digest: str):
+    """Remove an unreferenced blob's file and thumbnail, after the release has committed.
+
+    The file is first moved aside and the reference checked again: an upload of
+    the same content that committed in between gets its file back, and one that
+    commits later puts it back itself with ``place_blob``.
+    """
+    if _referenced(db, digest):
+        return  # re-uploaded since it was released
+    path = blob_path(digest)
+    doomed = f"{path}.{os.getpid()}.{threading.get_ident()}.deleted"
+    try:
+        os.replace(path, doomed)
+    except FileNotFoundError:
+        doomed = None
+    db.rollback()  # end the read transaction so the re-check sees newer commits
+    if _referenced(db, digest):
+        if doomed and not os.path.exists(path):
+            os.replace(doomed, path)
+        elif doomed:
+            os.unlink(doomed)
+        return
+    for p in filter(None, (doomed, thumb_path(digest))):
+        try:
+            os.unlink(p)
+        except FileNotFoundError:
+            pass
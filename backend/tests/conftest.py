@@ -0,0 +1,87 @@
+"""Test setup: every test session runs against a throwaway SQLite database and upload dir.
+
+The settings are read once, when ``config`` is first imported, so they are put
+in the environment here, before any backend module is loaded. Values already
+set win over backend/.env.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import uuid
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TMP_DIR = tempfile.mkdtemp(prefix="smartcampus-tests-")
+
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{os.path.join(TMP_DIR, 'test.db')}",
+    "DATABASE_READ_URLS": "",
+    "UPLOAD_DIR": os.path.join(TMP_DIR, "uploads"),
+    "JWT_SECRET": "test-secret",
+    "SMTP_HOST": "localhost",
+    "SMTP_USER": "",
+    "SMTP_PASS": "",
+    "MAIL_WORKER": "off",
+    "ASSIGNER": "off",
+    "ARCHIVE": "off",
+    "BCRYPT_ROUNDS": "4",
+    "HASH_WORKERS": "0",
+    "ATTACHMENT_WORKERS": "0",
+})
+sys.path.insert(0, BACKEND_DIR)
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(TMP_DIR, ignore_errors=True)
+
+@pytest.fixture(scope="session")
+def flask_app():
+    from app import app
+    return app
+
+@pytest.fixture
+def client(flask_app):
+    return flask_app.test_client()
+
+@pytest.fixture
+def make_user(flask_app):
+    """Create a user and return ``(user_id, email, password)``."""
+    from auth import hash_password
+    from db import SessionLocal
+    from models import Role, User
+
+    def make(role: Role = Role.STUDENT, password: str = "secret123", password_hash: str | None = None):
+        email = f"{role.value.lower()}-{uuid.uuid4().hex[:8]}@campus.test"
+        with SessionLocal() as db:
+            u = User(email=email, name=email.split("@")[0], role=role,
+                     password_hash=password_hash or hash_password(password))
+            db.add(u)
+            db.commit()
+            return u.id, email, password
+    return make
+
+@pytest.fixture
+def auth_headers(make_user):
+    """Bearer headers for a fresh user of ``role``."""
+    from auth import create_token
+    from models import Role
+
+    def headers(role: Role = Role.ADMIN) -> dict:
+        user_id, email, _ = make_user(role)
+        return {"Authorization": f"Bearer {create_token(user_id, role.value, email)}"}
+    return headers
+
+@pytest.fixture
+def make_ticket(flask_app):
+    """Insert a ticket directly and return its id; ``fields`` override the defaults."""
+    from db import SessionLocal
+    from models import Ticket
+
+    def make(creator_id: int, **fields) -> int:
+        with SessionLocal() as db:
+            t = Ticket(title=fields.pop("title", "Wi-Fi down"), description=fields.pop("description", "Library, 2nd floor"),
+                       creator_id=creator_id, **fields)
+            db.add(t)
+            db.commit()
+            return t.id
+    return make
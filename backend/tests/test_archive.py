@@ -0,0 +1,64 @@
+"""Archiving and restoring a ticket: where it shows up in the list and detail endpoints."""
+from datetime import datetime, timedelta
+import archive
+from db import SessionLocal
+from models import Comment, Role, TicketStatus
+
+def _list_ids(client, headers, creator: int, archived: str) -> dict[int, bool | None]:
+    resp = client.get(f"/api/tickets?creator_id={creator}&archived={archived}&limit=50", headers=headers)
+    assert resp.status_code == 200, resp.get_json()
+    return {t["id"]: t.get("archived") for t in resp.get_json()["items"]}
+
+def test_archive_and_restore_round_trip(client, auth_headers, make_user, make_ticket):
+    creator = make_user()[0]
+    old = datetime.utcnow() - timedelta(days=400)
+    resolved = make_ticket(creator, status=TicketStatus.RESOLVED, updated_at=old)
+    open_ticket = make_ticket(creator)
+    with SessionLocal() as db:
+        db.add(Comment(ticket_id=resolved, user_id=creator, content="fixed by replacing the lamp"))
+        db.commit()
+    headers = auth_headers(Role.ADMIN)
+
+    with SessionLocal() as db:
+        assert archive.archive_tickets(db, [resolved]) == 1
+        db.commit()
+
+    assert _list_ids(client, headers, creator, "0") == {open_ticket: None}
+    assert _list_ids(client, headers, creator, "only") == {resolved: True}
+    assert _list_ids(client, headers, creator, "1") == {open_ticket: False, resolved: True}
+    assert client.get(f"/api/tickets?creator_id={creator}&archived=yes", headers=headers).status_code == 400
+
+    assert client.get(f"/api/tickets/{resolved}", headers=headers).status_code == 404
+    resp = client.get(f"/api/tickets/{resolved}?archived=1", headers=headers)
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert body["archived_at"]
+    assert [c["content"] for c in body["comments"]] == ["fixed by replacing the lamp"]
+    comments = client.get(f"/api/tickets/{resolved}/comments?archived=1", headers=headers)
+    assert [c["content"] for c in comments.get_json()] == ["fixed by replacing the lamp"]
+
+    with SessionLocal() as db:
+        assert archive.restore_tickets(db, [resolved]) == 1
+        db.commit()
+
+    assert _list_ids(client, headers, creator, "0") == {open_ticket: None, resolved: None}
+    assert _list_ids(client, headers, creator, "only") == {}
+    resp = client.get(f"/api/tickets/{resolved}", headers=headers)
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert "archived_at" not in body
+    assert [c["content"] for c in body["comments"]] == ["fixed by replacing the lamp"]
+    assert client.get(f"/api/tickets/{resolved}?archived=1", headers=headers).status_code == 200
+
+def test_archivable_skips_recent_open_and_held_tickets(make_user, make_ticket):
+    creator = make_user()[0]
+    old = datetime.utcnow() - timedelta(days=400)
+    eligible = make_ticket(creator, status=TicketStatus.RESOLVED, updated_at=old)
+    recent = make_ticket(creator, status=TicketStatus.RESOLVED)
+    still_open = make_ticket(creator, updated_at=old)
+    # holds the highest ticket id, so SQLite could hand its id out again
+    held = make_ticket(creator, status=TicketStatus.RESOLVED, updated_at=old)
+    with SessionLocal() as db:
+        ids = archive.archivable(db, datetime.utcnow() - timedelta(days=30), 10_000)
+    assert eligible in ids
+    assert recent not in ids and still_open not in ids and held not in ids
@@ -0,0 +1,25 @@
+from passlib.hash import bcrypt
+from sqlalchemy import select
+from starlette.testclient import TestClient
+from config import Config
+from db import SessionLocal
+from models import User
+import asgi
+
+def test_login_after_bcrypt_rounds_change(make_user, monkeypatch):
+    _, email, password = make_user(password_hash=bcrypt.using(rounds=4).hash("secret123"))
+    monkeypatch.setattr(Config, "BCRYPT_ROUNDS", 6)
+
+    with TestClient(asgi.app) as client:
+        first = client.post("/api/auth/login", json={"email": email, "password": password})
+        assert first.status_code == 200, first.text
+        assert first.json()["user"]["email"] == email
+        assert first.json()["token"]
+
+        # verified against the hash the first login stored
+        second = client.post("/api/auth/login", json={"email": email, "password": password})
+        assert second.status_code == 200, second.text
+
+    with SessionLocal() as db:
+        stored = db.scalar(select(User.password_hash).where(User.email == email))
+    assert stored.split("$")[2] == "06"
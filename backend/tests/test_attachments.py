@@ -0,0 +1,35 @@
+import io
+import os
+from db import SessionLocal
+from models import Attachment, Role, Ticket
+import attachments
+import storage
+
+def test_upload_is_processed_off_the_request(client, auth_headers, make_user):
+    with SessionLocal() as db:
+        t = Ticket(title="Printer", description="Out of toner", creator_id=make_user()[0])
+        db.add(t)
+        db.commit()
+        ticket_id = t.id
+    resp = client.post(f"/api/tickets/{ticket_id}/attachments", headers=auth_headers(Role.TECH),
+                       data={"file": (io.BytesIO(b"paper jam at tray 2"), "error.log")})
+    assert resp.status_code == 201
+    attachment_id = resp.get_json()["id"]
+
+    # the result is written by the writer thread once the pool has finished
+    attachments._get_pool().submit(lambda: None).result()
+    attachments._get_writer().submit(lambda: None).result()
+    with SessionLocal() as db:
+        a = db.get(Attachment, attachment_id)
+        assert a.processed_at is not None
+        assert a.mime_type == "text/plain"
+        assert a.text_content == "paper jam at tray 2"
+
+def test_thumbnail_of_a_deleted_blob_is_removed():
+    digest = "ab" * 32
+    thumb = storage.thumb_path(digest)
+    os.makedirs(os.path.dirname(thumb), exist_ok=True)
+    open(thumb, "wb").close()
+    result = {"size": 3, "mime_type": "image/png", "has_thumbnail": True, "text_content": None, "entries": None}
+    assert not attachments.store_result(10**9, digest, result)
+    assert not os.path.exists(thumb)
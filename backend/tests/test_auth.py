@@ -0,0 +1,70 @@
+import jwt
+import pytest
+import auth
+from auth import TokenCache, create_token
+from config import Config
+from models import Role
+
+@pytest.fixture
+def clock(monkeypatch):
+    """TokenCache's clock, moved by ``clock.now += seconds``; PyJWT keeps the real one."""
+    class Clock:
+        now = auth.time.time()
+    monkeypatch.setattr(auth.time, "time", lambda: Clock.now)
+    return Clock
+
+def _token(user_id: int, expires_in: int) -> str:
+    exp = int(auth.time.time()) + expires_in
+    return jwt.encode({"sub": str(user_id), "role": Role.TECH.value, "exp": exp}, Config.JWT_SECRET, algorithm="HS256")
+
+def test_entry_never_outlives_the_token(clock):
+    cache = TokenCache(maxsize=10, ttl=300)
+    token = _token(1, expires_in=30)
+
+    assert cache.decode(token)["sub"] == "1"
+    assert cache.decode(token)["role"] == Role.TECH.value
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    clock.now += 31
+    cache.decode(token)  # past the token's exp: verified again, not served from the cache
+    assert (cache.hits, cache.misses) == (1, 2)
+
+def test_expired_token_is_not_cached():
+    cache = TokenCache(maxsize=10, ttl=300)
+    with pytest.raises(jwt.ExpiredSignatureError):
+        cache.decode(_token(1, expires_in=-5))
+    assert cache.stats()["size"] == 0
+
+def test_ttl_caps_cache_lifetime(clock):
+    cache = TokenCache(maxsize=10, ttl=60)
+    token = create_token(1, Role.STUDENT.value, "student@campus.test")
+    cache.decode(token)
+    clock.now += 61
+    cache.decode(token)  # verified again, still valid
+    assert (cache.hits, cache.misses) == (0, 2)
+
+def test_clear_and_lru_eviction():
+    cache = TokenCache(maxsize=2, ttl=60)
+    tokens = [create_token(i, Role.STUDENT.value, f"s{i}@campus.test") for i in range(3)]
+    for token in tokens:
+        cache.decode(token)
+    assert cache.stats()["size"] == 2
+    cache.decode(tokens[0])  # evicted as least recently used
+    assert cache.misses == 4
+
+    cache.clear()
+    cache.decode(tokens[2])
+    assert cache.misses == 5
+
+def test_tampered_token_is_rejected_even_when_the_original_is_cached(client, make_user):
+    user_id, email, _ = make_user(Role.STUDENT)
+    token = create_token(user_id, Role.STUDENT.value, email)
+    assert client.get("/api/tickets?limit=1", headers={"Authorization": f"Bearer {token}"}).status_code == 200
+
+    header, payload, signature = token.split(".")
+    forged = jwt.encode({**jwt.decode(token, options={"verify_signature": False}), "role": Role.ADMIN.value},
+                        "not-the-secret", algorithm="HS256")
+    resp = client.get("/api/users", headers={"Authorization": f"Bearer {forged}"})
+    assert resp.status_code == 401
+    resp = client.get("/api/users", headers={"Authorization": f"Bearer {header}.{payload}.{signature[:-2]}xx"})
+    assert resp.status_code == 401
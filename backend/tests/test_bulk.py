@@ -0,0 +1,54 @@
+import pytest
+from db import SessionLocal
+from models import Role, Ticket, TicketStatus
+
+@pytest.fixture
+def staff(auth_headers):
+    return auth_headers(Role.TECH)
+
+def _bulk(client, headers, body):
+    return client.post("/api/tickets/bulk", json=body, headers=headers)
+
+@pytest.mark.parametrize("body", [
+    {"where": {}, "set": {"status": "RESOLVED"}},
+    {"where": {"status": None}, "set": {"status": "RESOLVED"}},
+    {"ids": [], "set": {"status": "RESOLVED"}},
+    {"set": {"status": "RESOLVED"}},
+    {"ids": [{"a": 1}], "set": {"status": "RESOLVED"}},
+    {"ids": [True], "set": {"status": "RESOLVED"}},
+    {"ids": ["x"], "set": {"status": "RESOLVED"}},
+    {"ids": 5, "set": {"status": "RESOLVED"}},
+    {"where": {"creator_id": [1]}, "set": {"status": "RESOLVED"}},
+    {"where": {"created_after": 5}, "set": {"status": "RESOLVED"}},
+    {"where": {"colour": "red"}, "set": {"status": "RESOLVED"}},
+    {"ids": [1], "set": {"assignee_id": {"a": 1}}},
+    {"ids": [1], "set": {"status": "DONE"}},
+    {"ids": [1], "set": {}},
+])
+def test_bad_selection_is_rejected_and_changes_nothing(client, staff, make_user, make_ticket, body):
+    ticket_id = make_ticket(make_user()[0])
+    resp = _bulk(client, staff, body)
+    assert resp.status_code == 400, resp.get_json()
+    assert "error" in resp.get_json()
+    with SessionLocal() as db:
+        assert db.get(Ticket, ticket_id).status == TicketStatus.OPEN
+
+def test_selection_by_ids_and_by_filter(client, staff, make_user, make_ticket):
+    creator = make_user()[0]
+    first, second, third = (make_ticket(creator) for _ in range(3))
+    resp = _bulk(client, staff, {"ids": [first, str(second), 10**9], "set": {"status": "IN_PROGRESS"}})
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert body["updated"] == 2
+    assert {"id": 10**9, "result": "not_found"} in body["results"]
+
+    resp = _bulk(client, staff, {"where": {"creator_id": creator, "status": "IN_PROGRESS"}, "set": {"status": "RESOLVED"}})
+    assert resp.get_json()["updated"] == 2
+    with SessionLocal() as db:
+        statuses = [db.get(Ticket, i).status for i in (first, second, third)]
+    assert statuses == [TicketStatus.RESOLVED, TicketStatus.RESOLVED, TicketStatus.OPEN]
+
+def test_students_cannot_bulk_update(client, auth_headers, make_user, make_ticket):
+    ticket_id = make_ticket(make_user()[0])
+    resp = _bulk(client, auth_headers(Role.STUDENT), {"ids": [ticket_id], "set": {"status": "RESOLVED"}})
+    assert resp.status_code == 403
@@ -0,0 +1,152 @@
+import smtplib
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import delete
+from config import Config
+from db import SessionLocal
+from models import OutboxMessage, OutboxStatus
+import mailer
+
+class StubSMTP:
+    """Stands in for smtplib.SMTP: records connections and messages, refuses addresses in ``refuse``
+    and every connection while ``down``."""
+    connections: list["StubSMTP"] = []
+    connects = 0
+    refuse: set[str] = set()
+    down = False
+    drop_next = False
+
+    def __init__(self, host, port, timeout=None):
+        StubSMTP.connects += 1
+        if self.down:
+            raise ConnectionRefusedError(111, "Connection refused")
+        self.sent = []
+        self.closed = False
+        StubSMTP.connections.append(self)
+
+    def send_message(self, msg):
+        if StubSMTP.drop_next:
+            StubSMTP.drop_next = False
+            raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+        if msg["To"] in self.refuse:
+            raise smtplib.SMTPRecipientsRefused({msg["To"]: (550, b"mailbox unavailable")})
+        self.sent.append(msg)
+
+    def quit(self):
+        self.closed = True
+
+@pytest.fixture
+def smtp(monkeypatch):
+    monkeypatch.setattr(mailer.smtplib, "SMTP", StubSMTP)
+    monkeypatch.setattr(StubSMTP, "connections", [])
+    monkeypatch.setattr(StubSMTP, "connects", 0)
+    monkeypatch.setattr(StubSMTP, "refuse", set())
+    monkeypatch.setattr(StubSMTP, "down", False)
+    monkeypatch.setattr(StubSMTP, "drop_next", False)
+    with SessionLocal() as db:
+        db.execute(delete(OutboxMessage))
+        db.commit()
+    return StubSMTP
+
+def _queue(*addresses: str) -> list[int]:
+    with SessionLocal() as db:
+        msgs = [mailer.queue_email(db, to, "Ticket resolved", f"Hello {to}") for to in addresses]
+        db.commit()
+        return [m.id for m in msgs]
+
+def _message(message_id: int) -> OutboxMessage:
+    with SessionLocal() as db:
+        return db.get(OutboxMessage, message_id)
+
+def test_batch_is_sent_over_one_connection(smtp):
+    ids = _queue("a@campus.test", "b@campus.test", "c@campus.test")
+    conn = mailer.SMTPConnection()
+    try:
+        assert mailer.drain_outbox(conn) == {"sent": 3, "retry": 0, "dead": 0, "deferred": 0}
+        assert mailer.drain_outbox(conn) == {"sent": 0, "retry": 0, "dead": 0, "deferred": 0}
+    finally:
+        conn.close()
+    assert len(smtp.connections) == 1
+    assert [m["To"] for m in smtp.connections[0].sent] == ["a@campus.test", "b@campus.test", "c@campus.test"]
+    assert smtp.connections[0].closed
+    for message_id in ids:
+        m = _message(message_id)
+        assert m.status == OutboxStatus.SENT
+        assert m.sent_at is not None
+        assert m.claimed_by is None
+
+def test_dropped_session_is_reopened_once(smtp):
+    (message_id,) = _queue("a@campus.test")
+    conn = mailer.SMTPConnection()
+    try:
+        conn.send(mailer.build_message("warmup@campus.test", "Hi", "Hi"))
+        smtp.drop_next = True
+        assert mailer.drain_outbox(conn)["sent"] == 1
+    finally:
+        conn.close()
+    assert len(smtp.connections) == 2
+    assert _message(message_id).attempts == 1
+
+def test_claimed_messages_are_leased(smtp):
+    _queue("a@campus.test", "b@campus.test")
+    with SessionLocal() as first, SessionLocal() as second:
+        assert len(mailer.claim_batch(first, 10)) == 2
+        assert mailer.claim_batch(second, 10) == []
+
+def test_failure_is_retried_with_backoff(smtp):
+    ok, refused = _queue("ok@campus.test", "gone@campus.test")
+    smtp.refuse.add("gone@campus.test")
+    before = datetime.utcnow()
+    conn = mailer.SMTPConnection()
+    try:
+        assert mailer.drain_outbox(conn) == {"sent": 1, "retry": 1, "dead": 0, "deferred": 0}
+    finally:
+        conn.close()
+    # a refused recipient does not cost the session
+    assert len(smtp.connections) == 1
+    assert _message(ok).status == OutboxStatus.SENT
+    m = _message(refused)
+    assert m.status == OutboxStatus.PENDING
+    assert m.attempts == 1
+    assert m.claimed_by is None
+    assert "SMTPRecipientsRefused" in m.last_error
+    assert m.next_attempt_at >= before + timedelta(seconds=Config.MAIL_BACKOFF_SECONDS)
+
+def test_dead_after_max_attempts(smtp, monkeypatch):
+    monkeypatch.setattr(Config, "MAIL_MAX_ATTEMPTS", 3)
+    monkeypatch.setattr(Config, "MAIL_BACKOFF_SECONDS", 0)  # due again at once
+    (message_id,) = _queue("gone@campus.test")
+    smtp.refuse.add("gone@campus.test")
+    conn = mailer.SMTPConnection()
+    try:
+        outcomes = [mailer.drain_outbox(conn) for _ in range(4)]
+    finally:
+        conn.close()
+    assert [o["retry"] for o in outcomes] == [1, 1, 0, 0]
+    assert [o["dead"] for o in outcomes] == [0, 0, 1, 0]
+    m = _message(message_id)
+    assert m.status == OutboxStatus.DEAD
+    assert m.attempts == 3
+    assert len(smtp.connections) == 1
+
+def test_relay_outage_defers_without_charging_attempts(smtp, monkeypatch):
+    monkeypatch.setattr(Config, "MAIL_MAX_ATTEMPTS", 2)
+    monkeypatch.setattr(Config, "MAIL_BACKOFF_SECONDS", 0)  # due again at once
+    ids = _queue("a@campus.test", "b@campus.test", "c@campus.test")
+    smtp.down = True
+    conn = mailer.SMTPConnection()
+    try:
+        # more polls than MAIL_MAX_ATTEMPTS, one connect attempt each
+        for _ in range(3):
+            assert mailer.drain_outbox(conn) == {"sent": 0, "retry": 0, "dead": 0, "deferred": 3}
+        assert smtp.connects == 3
+        for message_id in ids:
+            m = _message(message_id)
+            assert (m.status, m.attempts, m.claimed_by) == (OutboxStatus.PENDING, 0, None)
+            assert "ConnectionRefusedError" in m.last_error
+
+        smtp.down = False
+        assert mailer.drain_outbox(conn) == {"sent": 3, "retry": 0, "dead": 0, "deferred": 0}
+    finally:
+        conn.close()
+    assert all(_message(message_id).attempts == 1 for message_id in ids)
@@ -0,0 +1,33 @@
+"""GET /metrics access: bearer token when METRICS_TOKEN is set, loopback only otherwise."""
+import pytest
+from config import Config
+
+@pytest.fixture
+def metrics_token(monkeypatch):
+    def set_token(token):
+        monkeypatch.setattr(Config, "METRICS_TOKEN", token)
+    return set_token
+
+def test_metrics_without_token_is_loopback_only(client, metrics_token):
+    metrics_token(None)
+    assert client.get("/metrics", environ_base={"REMOTE_ADDR": "10.0.0.7"}).status_code == 404
+    resp = client.get("/metrics", environ_base={"REMOTE_ADDR": "127.0.0.1"})
+    assert resp.status_code == 200
+    assert resp.mimetype == "text/plain"
+    assert client.get("/metrics", environ_base={"REMOTE_ADDR": "::1"}).status_code == 200
+
+def test_metrics_without_token_rejects_proxied_loopback(client, metrics_token):
+    metrics_token(None)
+    resp = client.get("/metrics", headers={"X-Forwarded-For": "203.0.113.9"},
+                      environ_base={"REMOTE_ADDR": "127.0.0.1"})
+    assert resp.status_code == 404
+
+def test_metrics_with_token_requires_bearer(client, metrics_token):
+    metrics_token("scrape-secret")
+    for addr in ("10.0.0.7", "127.0.0.1"):
+        assert client.get("/metrics", environ_base={"REMOTE_ADDR": addr}).status_code == 401
+        resp = client.get("/metrics", headers={"Authorization": "Bearer wrong"}, environ_base={"REMOTE_ADDR": addr})
+        assert resp.status_code == 401
+    resp = client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"},
+                      environ_base={"REMOTE_ADDR": "10.0.0.7"})
+    assert resp.status_code == 200
@@ -0,0 +1,57 @@
+import os
+import subprocess
+import sys
+from datetime import datetime, timedelta
+from models import Role
+
+CLI = os.path.join(os.path.dirname(__file__), "..", "..", "scripts", "cli.py")
+
+def _pages(client, headers, query: str) -> list[list[dict]]:
+    pages, cursor = [], None
+    while True:
+        url = f"/api/tickets?{query}" + (f"&cursor={cursor}" if cursor else "")
+        resp = client.get(url, headers=headers)
+        assert resp.status_code == 200, resp.get_json()
+        body = resp.get_json()
+        pages.append(body["items"])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return pages
+
+def test_cursor_pages_cover_every_ticket_once(client, auth_headers, make_user, make_ticket):
+    creator = make_user()[0]
+    base = datetime(2024, 9, 1)
+    # pairs share updated_at, so the id has to break the tie
+    updated = {}
+    for i in range(25):
+        at = base + timedelta(minutes=i // 2)
+        updated[make_ticket(creator, updated_at=at)] = at
+    headers = auth_headers(Role.ADMIN)
+
+    for order in ("desc", "asc"):
+        pages = _pages(client, headers, f"creator_id={creator}&limit=10&order={order}")
+        assert [len(p) for p in pages] == [10, 10, 5]
+        seen = [t["id"] for p in pages for t in p]
+        assert seen == sorted(updated, key=lambda i: (updated[i], i), reverse=order == "desc")
+
+def test_bad_cursor_and_limit(client, auth_headers, make_user, make_ticket):
+    creator = make_user()[0]
+    make_ticket(creator)
+    headers = auth_headers(Role.ADMIN)
+    assert client.get("/api/tickets?cursor=not-a-cursor", headers=headers).status_code == 400
+    resp = client.get(f"/api/tickets?creator_id={creator}&limit=0", headers=headers)
+    assert resp.status_code == 200
+    assert len(resp.get_json()["items"]) == 1
+
+def _cli(*args) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, CLI, *args], capture_output=True, text=True, timeout=60)
+
+def test_cli_list_rejects_bad_input_cleanly(flask_app):
+    result = _cli("tickets", "list", "--limit", "0")
+    assert result.returncode == 0, result.stderr
+    assert "Traceback" not in result.stderr
+
+    result = _cli("tickets", "list", "--since", "last tuesday")
+    assert result.returncode == 2
+    assert "invalid date 'last tuesday'" in result.stderr
+    assert "Traceback" not in result.stderr
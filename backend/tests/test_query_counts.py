@@ -0,0 +1,41 @@
+"""Query ceilings for the ticket detail endpoints: the count must not grow with comments or attachments."""
+import pytest
+from db import SessionLocal, count_queries
+from models import Attachment, Comment, Role, Ticket
+
+COMMENTS = 40
+ATTACHMENTS = 6
+
+@pytest.fixture
+def busy_ticket(make_user) -> int:
+    """A ticket with many comments from several users, plus attachments."""
+    authors = [make_user(role)[0] for role in (Role.STUDENT, Role.TECH, Role.ADMIN)]
+    with SessionLocal() as db:
+        t = Ticket(title="Projector broken", description="Room 101", creator_id=authors[0])
+        db.add(t)
+        db.flush()
+        db.add_all(Comment(ticket_id=t.id, user_id=authors[i % len(authors)], content=f"comment {i}")
+                   for i in range(COMMENTS))
+        db.add_all(Attachment(ticket_id=t.id, filename=f"photo{i}.png", path=f"/nonexistent/photo{i}.png")
+                   for i in range(ATTACHMENTS))
+        db.commit()
+        return t.id
+
+def test_ticket_detail_query_ceiling(client, auth_headers, busy_ticket):
+    headers = auth_headers()
+    # version lookup + ticket, comments (authors joined) and attachments
+    with count_queries(max_queries=4):
+        resp = client.get(f"/api/tickets/{busy_ticket}", headers=headers)
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert len(body["comments"]) == COMMENTS
+    assert len(body["attachments"]) == ATTACHMENTS
+    assert len({c["user"]["email"] for c in body["comments"]}) == 3
+
+def test_comments_query_ceiling(client, auth_headers, busy_ticket):
+    headers = auth_headers()
+    # version lookup + comments with their authors
+    with count_queries(max_queries=2):
+        resp = client.get(f"/api/tickets/{busy_ticket}/comments", headers=headers)
+    assert resp.status_code == 200
+    assert len(resp.get_json()) == COMMENTS
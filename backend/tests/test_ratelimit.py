@@ -0,0 +1,64 @@
+import itertools
+import pytest
+import ratelimit
+from config import Config
+from ratelimit import TokenBucketLimiter
+
+@pytest.fixture
+def clock(monkeypatch):
+    class Clock:
+        now = 1000.0
+    monkeypatch.setattr(ratelimit.time, "monotonic", lambda: Clock.now)
+    return Clock
+
+def test_bucket_refills_at_its_rate(clock):
+    limiter = TokenBucketLimiter(rate_per_minute=60, burst=3)
+    assert [limiter.allow("ip")[0] for _ in range(3)] == [True, True, True]
+    allowed, retry_after = limiter.allow("ip")
+    assert not allowed
+    assert retry_after == pytest.approx(1.0)
+    assert limiter.allow("other-ip")[0]
+
+    clock.now += 1
+    assert limiter.allow("ip")[0]
+    assert not limiter.allow("ip")[0]
+
+    limiter.reset("ip")
+    assert limiter.allow("ip")[0]
+
+def test_least_recently_seen_keys_are_dropped(clock):
+    limiter = TokenBucketLimiter(rate_per_minute=1, burst=1, max_keys=2)
+    for key in ("a", "b", "c"):
+        limiter.allow(key)
+    assert limiter.allow("a")[0]  # forgotten, so it starts with a full bucket
+    assert not limiter.allow("c")[0]
+
+def _login(client, email: str, ip: str):
+    return client.post("/api/auth/login", json={"email": email, "password": "wrong"},
+                       environ_base={"REMOTE_ADDR": ip})
+
+# a fresh client address per test, so the shared per-IP limiter starts full
+_addresses = itertools.count(1)
+
+def _ip() -> str:
+    n = next(_addresses)
+    return f"10.0.{n // 250}.{n % 250}"
+
+def test_login_per_email_limit_returns_429_with_retry_after(client, make_user):
+    _, email, _ = make_user()
+    ip = _ip()
+    for _ in range(Config.LOGIN_BURST):
+        assert _login(client, email, ip).status_code == 401
+    resp = _login(client, email, ip)
+    assert resp.status_code == 429
+    assert int(resp.headers["Retry-After"]) >= 1
+    # the limit is per email: another account from the same address still gets an answer
+    assert _login(client, f"other-{email}", ip).status_code == 401
+
+def test_login_per_ip_limit(client):
+    ip = _ip()
+    for i in range(Config.LOGIN_IP_BURST):
+        assert _login(client, f"nobody{i}@campus.test", ip).status_code == 401
+    resp = _login(client, "nobody-else@campus.test", ip)
+    assert resp.status_code == 429
+    assert int(resp.headers["Retry-After"]) >= 1
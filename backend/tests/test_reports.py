@@ -0,0 +1,65 @@
+from db import SessionLocal, count_queries
+from models import Role, Ticket
+import reports
+
+def _backfill():
+    with SessionLocal() as db:
+        reports.backfill(db)
+        db.commit()
+
+def _report(client, headers) -> dict:
+    resp = client.get("/api/reports?days=7", headers=headers)
+    assert resp.status_code == 200
+    return resp.get_json()
+
+def _load(report: dict, assignee_id: int) -> dict:
+    return next((a for a in report["assignees"] if a["assignee_id"] == assignee_id),
+                {"open": 0, "in_progress": 0, "resolved_in_window": 0})
+
+def test_rollups_follow_status_transitions(client, auth_headers, make_user):
+    staff = auth_headers(Role.ADMIN)
+    student = auth_headers(Role.STUDENT)
+    tech = make_user(Role.TECH)[0]
+    _backfill()  # other tests insert tickets without going through the rollups
+    before = _report(client, staff)
+
+    ticket_id = client.post("/api/tickets", json={"title": "Door lock", "description": "B204"}, headers=student).get_json()["id"]
+    client.post(f"/api/tickets/{ticket_id}/assign", json={"assignee_id": tech}, headers=staff)
+    client.patch(f"/api/tickets/{ticket_id}", json={"status": "IN_PROGRESS"}, headers=staff)
+    mid = _report(client, staff)
+    assert mid["status_counts"]["IN_PROGRESS"] == before["status_counts"]["IN_PROGRESS"] + 1
+    assert mid["status_counts"]["OPEN"] == before["status_counts"]["OPEN"]
+    assert _load(mid, tech)["in_progress"] == 1
+
+    client.patch(f"/api/tickets/{ticket_id}", json={"status": "RESOLVED"}, headers=staff)
+    after = _report(client, staff)
+    assert after["status_counts"]["RESOLVED"] == before["status_counts"]["RESOLVED"] + 1
+    assert after["status_counts"]["IN_PROGRESS"] == before["status_counts"]["IN_PROGRESS"]
+    assert after["time_to_resolve"]["resolved"] == before["time_to_resolve"]["resolved"] + 1
+    load = _load(after, tech)
+    assert (load["open"], load["in_progress"], load["resolved_in_window"]) == (0, 0, 1)
+    today = after["daily"][-1]
+    assert today["created"] == before["daily"][-1]["created"] + 1
+    assert today["resolved"] == before["daily"][-1]["resolved"] + 1
+
+    # reopening takes it out of RESOLVED again and clears resolved_at
+    client.patch(f"/api/tickets/{ticket_id}", json={"status": "OPEN"}, headers=staff)
+    reopened = _report(client, staff)
+    assert reopened["status_counts"]["RESOLVED"] == before["status_counts"]["RESOLVED"]
+    assert reopened["status_counts"]["OPEN"] == before["status_counts"]["OPEN"] + 1
+    with SessionLocal() as db:
+        assert db.get(Ticket, ticket_id).resolved_at is None
+
+    # the incremental rollups agree with a rebuild from the tickets
+    _backfill()
+    assert _report(client, staff)["status_counts"] == reopened["status_counts"]
+
+def test_creating_a_ticket_does_not_update_it(client, auth_headers):
+    student = auth_headers(Role.STUDENT)
+    with count_queries() as statements:
+        ticket_id = client.post("/api/tickets", json={"title": "Lamp", "description": "Hall"}, headers=student).get_json()["id"]
+    assert not [s for s in statements if s.lstrip().upper().startswith("UPDATE TICKETS")]
+    with SessionLocal() as db:
+        t = db.get(Ticket, ticket_id)
+        # keyset pages order by updated_at, so it must stay at the insert time
+        assert (t.updated_at - t.created_at).total_seconds() < 0.1
@@ -0,0 +1,38 @@
+import pytest
+from auth import create_token
+from db import SessionLocal
+from models import Comment, Role
+import search
+
+@pytest.fixture
+def tickets(make_user, make_ticket):
+    """Two students' tickets mentioning the same word, one of them in a comment."""
+    alice, bob = make_user()[0], make_user()[0]
+    alice_ticket = make_ticket(alice, title="Broken radiator in dorm", description="Room 12")
+    bob_ticket = make_ticket(bob, title="Heating", description="radiator leaking in the lab")
+    with SessionLocal() as db:
+        db.add(Comment(ticket_id=bob_ticket, user_id=bob, content="The radiator is still leaking"))
+        db.commit()
+    return {"alice": (alice, alice_ticket), "bob": (bob, bob_ticket)}
+
+@pytest.mark.parametrize("backend", ["sqlite", "like"])
+def test_students_only_find_their_own_tickets(tickets, monkeypatch, backend):
+    monkeypatch.setattr(search, "_backend", backend)
+    (alice, alice_ticket), (bob, bob_ticket) = tickets["alice"], tickets["bob"]
+    with SessionLocal() as db:
+        hits_alice = search.search(db, "radiator", 50, creator_id=alice)
+        hits_bob = search.search(db, "radiator", 50, creator_id=bob)
+        hits_staff = search.search(db, "radiator", 50)
+    assert {h["ticket_id"] for h in hits_alice} == {alice_ticket}
+    assert {h["ticket_id"] for h in hits_bob} == {bob_ticket}
+    assert {(h["kind"], h["ticket_id"]) for h in hits_bob} == {("ticket", bob_ticket), ("comment", bob_ticket)}
+    assert {alice_ticket, bob_ticket} <= {h["ticket_id"] for h in hits_staff}
+
+def test_search_endpoint_applies_the_role(client, auth_headers, tickets):
+    alice, alice_ticket = tickets["alice"]
+    student = {"Authorization": f"Bearer {create_token(alice, Role.STUDENT.value, 'alice@campus.test')}"}
+    items = client.get("/api/search?q=radiator&limit=50", headers=student).get_json()["items"]
+    assert {h["ticket_id"] for h in items} == {alice_ticket}
+
+    items = client.get("/api/search?q=radiator&limit=50", headers=auth_headers(Role.TECH)).get_json()["items"]
+    assert {alice_ticket, tickets["bob"][1]} <= {h["ticket_id"] for h in items}
@@ -0,0 +1,53 @@
+import os
+from db import SessionLocal
+from models import Attachment, Blob, Ticket
+import storage
+
+def _hashing_file(data: bytes) -> storage.HashingFile:
+    hf = storage.HashingFile()
+    hf.write(data)
+    return hf
+
+def test_reupload_racing_delete_of_last_reference_keeps_the_file(make_user):
+    data = os.urandom(1024)
+    user_id = make_user()[0]
+
+    # first upload: one attachment holding the only reference
+    hf = _hashing_file(data)
+    with SessionLocal() as db:
+        t = Ticket(title="Leak", description="Lab 3", creator_id=user_id)
+        db.add(t)
+        db.flush()
+        blob = storage.commit_blob(db, hf)
+        a = Attachment(ticket_id=t.id, filename="a.bin", path=storage.blob_path(blob.sha256), sha256=blob.sha256)
+        db.add(a)
+        db.commit()
+        storage.place_blob(hf)
+        ticket_id, attachment_id, digest = t.id, a.id, blob.sha256
+    hf.close()
+    path = storage.blob_path(digest)
+    assert os.path.exists(path)
+
+    # the attachment is deleted; its release commits before the re-upload's reference does
+    deleter = SessionLocal()
+    deleter.delete(deleter.get(Attachment, attachment_id))
+    deleter.flush()
+    assert storage.release_blob(deleter, digest)
+    deleter.commit()
+
+    hf = _hashing_file(data)
+    with SessionLocal() as uploader:
+        storage.commit_blob(uploader, hf)
+        uploader.add(Attachment(ticket_id=ticket_id, filename="b.bin", path=path, sha256=digest))
+        # the delete removes the file while the re-upload is still uncommitted
+        storage.delete_blob_file(deleter, digest)
+        deleter.close()
+        uploader.commit()
+        storage.place_blob(hf)
+    hf.close()
+
+    with SessionLocal() as db:
+        assert db.get(Blob, digest).refcount == 1
+    with open(path, "rb") as f:
+        assert f.read() == data
+    assert not os.path.exists(hf.name)
@@ -29,10 +29,25 @@ async function api(path, { method = 'GET', body, headers = {}, formData } = {}){
   return res;
 }
 
+// live ticket events (server-sent events); EventSource resumes with Last-Event-ID on reconnect
+function subscribeEvents(onEvent){
+  if(!getToken() || !window.EventSource) return null;
+  const es = new EventSource(`${API_BASE}/api/events?access_token=${encodeURIComponent(getToken())}`);
+  ['ticket.created','ticket.updated','ticket.assigned','ticket.commented','attachment.processed','reset'].forEach(type =>
+    es.addEventListener(type, e => onEvent(type, e.data ? JSON.parse(e.data) : {}))
+  );
+  return es;
+}
+
 function requireLogin(){
   if(!getToken()) window.location.href = 'login.html';
 }
 
+// for text that did not come from us (e.g. names inside uploaded archives) before it goes into innerHTML
+function escapeHtml(s){
+  return String(s).replace(/[&<>"']/g, c => ({'&':'&amp;','<':'&lt;','>':'&gt;','"':'&quot;',"'":'&#39;'}[c]));
+}
+
 function renderStatusBadge(s){
   return `<span class="badge ${s}">${s.replace('_',' ')}</span>`;
 }
@@ -0,0 +1,363 @@
+#!/usr/bin/env python
+"""Smart Campus API benchmark
+Usage:
+  python scripts/bench.py [--database-url postgresql://localhost/smartcampus_bench] [--reset]
+                          [--users 1000] [--tickets 10000] [--comments-per-ticket 2]
+                          [--mode client|server|asgi|both|all] [--requests 500] [--concurrency 8]
+                          [--endpoints login,list_tickets,get_ticket,add_comment,upload_attachment]
+                          [--env RESPONSE_CACHE_SIZE=0] [--output results.json] [--compare previous.json]
+
+Seeds the database when it has no tickets (always with --reset), then drives each
+endpoint through the Flask test client (in-process, sequential), a threaded WSGI
+server and/or the ASGI app (backend/asgi.py) under uvicorn; the servers run in a
+child process and are called over HTTP with --concurrency keep-alive connections.
+Reports p50/p95/p99 latency, throughput and SQL statements per request (from the
+app's /metrics); --output writes the same as JSON.
+Without --database-url a throwaway SQLite file is used. Mail is never sent.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT / 'backend'))
+
+ENDPOINTS = ['login', 'list_tickets', 'get_ticket', 'add_comment', 'upload_attachment']
+BENCH_PASSWORD = 'bench-password'
+BENCH_ADMIN = 'bench-admin@it.test'
+
+def configure_env(args):
+    # Config is read at import time, so this must run before any backend module is imported
+    tmp = tempfile.mkdtemp(prefix='smartcampus-bench-')
+    os.environ['DATABASE_URL'] = args.database_url or f'sqlite:///{tmp}/bench.db'
+    os.environ['UPLOAD_DIR'] = os.path.join(tmp, 'uploads')
+    os.environ['MAIL_WORKER'] = 'off'
+    os.environ['METRICS_TOKEN'] = uuid.uuid4().hex  # SQL statements per request are read from /metrics
+    for key in ('LOGIN_RATE_PER_MINUTE', 'LOGIN_BURST', 'LOGIN_IP_RATE_PER_MINUTE', 'LOGIN_IP_BURST'):
+        os.environ[key] = '1000000000'  # the benchmark measures login, not the limiter
+    if args.bcrypt_rounds:
+        os.environ['BCRYPT_ROUNDS'] = str(args.bcrypt_rounds)
+    for item in args.env or []:
+        key, value = item.split('=', 1)
+        os.environ[key] = value
+
+# ----- Seeding -----
+def reset_database():
+    from sqlalchemy import text
+    from db import Base, engine
+    import models  # noqa: F401  (registers the tables)
+    Base.metadata.drop_all(engine)
+    with engine.begin() as conn:
+        # the app re-runs the migrations on import
+        conn.execute(text('DROP TABLE IF EXISTS alembic_version'))
+        if engine.dialect.name == 'sqlite':
+            conn.execute(text('DROP TABLE IF EXISTS tickets_fts'))
+            conn.execute(text('DROP TABLE IF EXISTS comments_fts'))
+            conn.execute(text('DROP TABLE IF EXISTS attachments_fts'))
+
+def seed(args):
+    from sqlalchemy import select, func
+    from db import SessionLocal
+    from models import Ticket
+    from auth import hash_password
+    import importer
+
+    with SessionLocal() as db:
+        password_hash = hash_password(BENCH_PASSWORD)
+        importer.import_users(db, [{'email': BENCH_ADMIN, 'name': 'Bench Admin', 'role': 'ADMIN',
+                                    'password_hash': password_hash}])
+        if db.scalar(select(func.count(Ticket.id))):
+            print('Database already has tickets; reusing it (pass --reset to reseed)')
+            return
+        started = time.perf_counter()
+        importer.import_users(db, importer.synthetic_users(args.users, password_hash, args.seed))
+        requesters, techs = importer.user_pools(db)
+        importer.import_tickets(db, importer.synthetic_tickets(args.tickets, requesters, techs,
+                                                               args.comments_per_ticket, seed=args.seed))
+        print(f'Seeded {args.users} users, {args.tickets} tickets in {time.perf_counter() - started:.1f}s')
+
+def load_context():
+    from sqlalchemy import select, func
+    from db import SessionLocal
+    from models import User, Role, Ticket, Comment
+    from auth import create_token
+
+    with SessionLocal() as db:
+        admin = db.scalars(select(User).where(User.email == BENCH_ADMIN)).one()
+        # only the seeded users share BENCH_PASSWORD; a reused database may hold others
+        emails = db.scalars(select(User.email).where(User.email.like('%.%.%@%')).order_by(User.id).limit(500)).all()
+        return {
+            'token': create_token(admin.id, admin.role.value, admin.email),
+            'emails': emails or [BENCH_ADMIN],
+            'ticket_ids': db.scalars(select(Ticket.id)).all(),
+            'tech_ids': db.scalars(select(User.id).where(User.role == Role.TECH)).all() or [admin.id],
+            'counts': {
+                'users': db.scalar(select(func.count(User.id))),
+                'tickets': db.scalar(select(func.count(Ticket.id))),
+                'comments': db.scalar(select(func.count(Comment.id))),
+            },
+        }
+
+# ----- Requests -----
+def _multipart(filename: str, content: bytes) -> tuple[bytes, str]:
+    boundary = uuid.uuid4().hex
+    head = (f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+            'Content-Type: text/plain\r\n\r\n').encode()
+    return head + content + f'\r\n--{boundary}--\r\n'.encode(), f'multipart/form-data; boundary={boundary}'
+
+def build_request(name: str, ctx: dict, rnd: random.Random) -> tuple[str, str, dict, bytes | None]:
+    """(method, path, headers, body) for one call of ``name``."""
+    auth = {'Authorization': f"Bearer {ctx['token']}"}
+    as_json = {**auth, 'Content-Type': 'application/json'}
+    if name == 'login':
+        body = {'email': rnd.choice(ctx['emails']), 'password': BENCH_PASSWORD}
+        return 'POST', '/api/auth/login', {'Content-Type': 'application/json'}, json.dumps(body).encode()
+    if name == 'list_tickets':
+        query = rnd.choice(['', '&status=OPEN', '&status=RESOLVED', f"&assignee_id={rnd.choice(ctx['tech_ids'])}",
+                            '&assignee_id=none', '&order=asc'])
+        return 'GET', f'/api/tickets?limit=50{query}', auth, None
+    if name == 'get_ticket':
+        return 'GET', f"/api/tickets/{rnd.choice(ctx['ticket_ids'])}", auth, None
+    if name == 'add_comment':
+        body = json.dumps({'content': f'benchmark comment {uuid.uuid4().hex}'}).encode()
+        return 'POST', f"/api/tickets/{rnd.choice(ctx['ticket_ids'])}/comments", as_json, body
+    if name == 'upload_attachment':
+        # distinct bytes every time, so each upload writes a new blob
+        body, content_type = _multipart('bench.txt', rnd.randbytes(4096))
+        return 'POST', f"/api/tickets/{rnd.choice(ctx['ticket_ids'])}/attachments", {**auth, 'Content-Type': content_type}, body
+    raise ValueError(f'unknown endpoint {name}')
+
+class ClientTarget:
+    """In-process calls through the Flask test client (no sockets, one at a time)."""
+    name = 'client'
+
+    def __init__(self):
+        from app import app
+        self.client = app.test_client()
+
+    def request(self, method, path, headers, body) -> tuple[int, bytes]:
+        resp = self.client.open(path, method=method, headers=headers, data=body)
+        return resp.status_code, resp.get_data()
+
+    def close(self):
+        pass
+
+class ServerTarget:
+    """A threaded werkzeug WSGI server (HTTP/1.1) in a child process, called over keep-alive connections.
+
+    The server runs out of process so it does not share the GIL with the load generator's threads.
+    """
+    name = 'server'
+    command = [sys.executable, '-c',
+               "import logging, sys; from werkzeug.serving import make_server; from app import app; "
+               "logging.getLogger('werkzeug').setLevel(logging.WARNING); "
+               "make_server('127.0.0.1', int(sys.argv[1]), app, threaded=True).serve_forever()"]
+
+    def __init__(self):
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            self.port = sock.getsockname()[1]
+        # own process group, so close() also stops the app's hashing pool workers
+        self.proc = subprocess.Popen(self.command + [str(self.port)], cwd=ROOT / 'backend', start_new_session=True)
+        deadline = time.monotonic() + 30
+        while True:
+            if self.proc.poll() is not None:
+                raise RuntimeError(f'{self.name} server exited with status {self.proc.returncode}')
+            try:
+                socket.create_connection(('127.0.0.1', self.port), timeout=1).close()
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    self.close()
+                    raise RuntimeError(f'{self.name} server did not start listening')
+                time.sleep(0.1)
+        self.local = threading.local()
+
+    def request(self, method, path, headers, body) -> tuple[int, bytes]:
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = self.local.conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+        try:
+            conn.request(method, path, body, headers)
+            resp = conn.getresponse()
+            return resp.status, resp.read()
+        except (http.client.HTTPException, OSError):
+            conn.close()
+            self.local.conn = None
+            return 599, b''
+
+    def close(self):
+        try:
+            os.killpg(self.proc.pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+        self.proc.wait()
+
+class AsgiTarget(ServerTarget):
+    """backend/asgi.py under a single uvicorn worker (one event loop)."""
+    name = 'asgi'
+    command = [sys.executable, '-m', 'uvicorn', 'asgi:app', '--host', '127.0.0.1', '--log-level', 'warning',
+               '--backlog', '1024', '--port']
+
+MODES = {'client': ClientTarget, 'server': ServerTarget, 'asgi': AsgiTarget}
+
+def sql_statements(target, name: str) -> float:
+    """Statements the target has run so far for endpoint ``name``, read from its /metrics."""
+    status, body = target.request('GET', '/metrics', {'Authorization': f"Bearer {os.environ['METRICS_TOKEN']}"}, None)
+    prefix = f'http_request_sql_queries_sum{{endpoint="{name}"}} '
+    for line in body.decode().splitlines():
+        if line.startswith(prefix):
+            return float(line[len(prefix):])
+    return 0.0
+
+# ----- Measurement -----
+def _summary(latencies: list[float], errors: int, wall: float, statements: float) -> dict:
+    n = len(latencies)
+    cuts = statistics.quantiles(latencies, n=100, method='inclusive') if n > 1 else latencies * 99
+    return {
+        'requests': n,
+        'errors': errors,
+        'p50_ms': round(cuts[49] * 1000, 3),
+        'p95_ms': round(cuts[94] * 1000, 3),
+        'p99_ms': round(cuts[98] * 1000, 3),
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 3),
+        'throughput_rps': round(n / wall, 1) if wall else None,
+        'queries_per_request': round(statements / n, 2) if n else None,
+    }
+
+def run_endpoint(target, name: str, ctx: dict, requests: int, concurrency: int, warmup: int, seed: int) -> dict:
+    rnd = random.Random(f'{seed}:{name}')
+    calls = [build_request(name, ctx, rnd) for _ in range(warmup + requests)]
+    for call in calls[:warmup]:
+        target.request(*call)
+
+    latencies, errors = [], 0
+    lock = threading.Lock()
+
+    def one(call):
+        nonlocal errors
+        started = time.perf_counter()
+        status, _ = target.request(*call)
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            if status >= 400:
+                errors += 1
+
+    statements = sql_statements(target, name)
+    started = time.perf_counter()
+    if concurrency <= 1:
+        for call in calls[warmup:]:
+            one(call)
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(one, calls[warmup:]))
+    wall = time.perf_counter() - started
+    return _summary(latencies, errors, wall, sql_statements(target, name) - statements)
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_table(results: dict, previous: dict | None = None):
+    print(f"{'mode':<7} {'endpoint':<18} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>9} {'queries':>8} {'errors':>7}")
+    for mode, endpoints in results.items():
+        for name, r in endpoints.items():
+            line = (f"{mode:<7} {name:<18} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f} "
+                    f"{r['throughput_rps'] or 0:>9.1f} {r['queries_per_request'] or 0:>8.2f} {r['errors']:>7}")
+            before = (previous or {}).get(mode, {}).get(name)
+            if before and before.get('p95_ms') and before.get('throughput_rps'):
+                line += (f"   p95 {100 * (r['p95_ms'] / before['p95_ms'] - 1):+.0f}%"
+                         f" req/s {100 * ((r['throughput_rps'] or 0) / before['throughput_rps'] - 1):+.0f}%")
+            print(line)
+
+def main():
+    p = argparse.ArgumentParser(description='Benchmark the Smart Campus API')
+    p.add_argument('--database-url', help='database to seed and benchmark (default: a temporary SQLite file)')
+    p.add_argument('--reset', action='store_true', help='drop and recreate every table before seeding')
+    p.add_argument('--users', type=int, default=1000)
+    p.add_argument('--tickets', type=int, default=10000)
+    p.add_argument('--comments-per-ticket', type=float, default=2)
+    p.add_argument('--seed', type=int, default=0)
+    p.add_argument('--bcrypt-rounds', type=int, help='override BCRYPT_ROUNDS (login cost dominates its latency)')
+    p.add_argument('--mode', choices=[*MODES, 'both', 'all'], default='both',
+                   help='both = client and server; all adds asgi')
+    p.add_argument('--endpoints', default=','.join(ENDPOINTS))
+    p.add_argument('--requests', type=int, default=500, help='measured requests per endpoint')
+    p.add_argument('--warmup', type=int, default=20)
+    p.add_argument('--concurrency', type=int, default=8, help='client connections in server and asgi modes')
+    p.add_argument('--env', action='append', metavar='KEY=VALUE', help='extra config for the app, e.g. HASH_WORKERS=0')
+    p.add_argument('--output', help='write results as JSON to this file')
+    p.add_argument('--compare', help='JSON from an earlier run to diff p95 and throughput against')
+    args = p.parse_args()
+
+    endpoints = [e.strip() for e in args.endpoints.split(',') if e.strip()]
+    unknown = set(endpoints) - set(ENDPOINTS)
+    if unknown:
+        p.error(f"unknown endpoints: {', '.join(sorted(unknown))}")
+
+    configure_env(args)
+    if args.reset:
+        reset_database()
+    import app  # noqa: F401  (migrates the schema, installs the search index)
+    from config import Config
+    from db import engine
+    seed(args)
+    ctx = load_context()
+
+    modes = {'both': ['client', 'server'], 'all': list(MODES)}.get(args.mode, [args.mode])
+    results = {}
+    for mode in modes:
+        target = MODES[mode]()
+        concurrency = 1 if mode == 'client' else args.concurrency
+        try:
+            results[mode] = {name: run_endpoint(target, name, ctx, args.requests, concurrency, args.warmup, args.seed)
+                             for name in endpoints}
+        finally:
+            target.close()
+
+    report = {
+        'meta': {
+            'commit': _git_commit(),
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'database': engine.dialect.name,
+            'python': platform.python_version(),
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'bcrypt_rounds': Config.BCRYPT_ROUNDS,
+            'env': args.env or [],
+            **ctx['counts'],
+        },
+        'results': results,
+    }
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)['results']
+    print_table(results, previous)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'Wrote {args.output}')
+
+if __name__ == '__main__':
+    main()
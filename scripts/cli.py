@@ -2,39 +2,91 @@
 """Smart Campus CLI for Help Desk & Reporting
 Usage:
   python scripts/cli.py users add --name "Theresia Tech" --email theresia@it.test --role TECH --password 123456
-  python scripts/cli.py tickets list [--status OPEN|IN_PROGRESS|RESOLVED] [--email newton@student.test]
+  python scripts/cli.py tickets list [--status OPEN|IN_PROGRESS|RESOLVED] [--email newton@student.test] [--assignee-email glorion@it.test] [--since 2024-09-01] [--until 2025-01-01] [--limit 50] [--cursor <next_cursor>] [--all] [--archived]
   python scripts/cli.py tickets update --id 1 --status RESOLVED
+  python scripts/cli.py tickets bulk-update --status RESOLVED --where status=OPEN --where created_before=2024-09-01 [--ids 1,2,3] [--assignee-email glorion@it.test] [--dry-run]
+  python scripts/cli.py tickets export --format csv|ndjson [--comments] [--gzip] [--where status=RESOLVED] [--output tickets.csv]
+  python scripts/cli.py import [--users users.csv] [--tickets tickets.jsonl] [--batch-size 1000] [--workers 8]
+  python scripts/cli.py import --generate [--num-users 20000] [--num-tickets 100000] [--comments-per-ticket 2] [--seed 0]
+  python scripts/cli.py reports backfill
+  python scripts/cli.py mail worker [--once]
+  python scripts/cli.py assign [--once] [--dry-run] [--policy least-loaded|round-robin] [--batch-size 100]
+  python scripts/cli.py attachments process [--all] [--workers 4]
+  python scripts/cli.py reindex
+  python scripts/cli.py db upgrade [--revision head]
+  python scripts/cli.py archive [--days 180] [--batch-size 500] [--dry-run]
+  python scripts/cli.py archive restore --ids 1,2,3
 """
 
 import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
 from sqlalchemy import select
 from pathlib import Path
 import sys
 sys.path.append(str(Path(__file__).resolve().parents[1] / 'backend'))
 
-from db import SessionLocal
+from config import Config
+from db import SessionLocal, engine, migrate
 from models import User, Role, Ticket, TicketStatus
 from auth import hash_password
+from queries import ARCHIVED_SOURCES, filter_tickets, keyset_page, parse_datetime, select_ticket_rows
+import mailer
+import search
+from bulk import bulk_update
+import reports
+import export
+import httpcache
+import importer
+import archive
+import assigner
+import attachments
 
 def add_user(args):
     with SessionLocal() as db:
         user = User(name=args.name, email=args.email.lower(), role=Role(args.role), password_hash=hash_password(args.password))
         db.add(user)
+        httpcache.bump(db, "users")
         db.commit()
         print(f"Created user {user.id} {user.email} ({user.role.value})")
 
+def _user_id(db, email):
+    user = db.scalars(select(User).where(User.email == email.lower())).first()
+    return user.id if user else -1
+
+def iso_datetime(value: str):
+    """argparse type for --since/--until: a bad date is a usage error, not a traceback."""
+    try:
+        return parse_datetime(value, 'date')
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date {value!r} (use ISO-8601, e.g. 2024-09-01)")
+
 def list_tickets(args):
     with SessionLocal() as db:
-        q = select(Ticket)
-        if args.status:
-            q = q.where(Ticket.status == TicketStatus(args.status))
-        if args.email:
-            user = db.scalars(select(User).where(User.email == args.email.lower())).first()
-            if user:
-                q = q.where(Ticket.creator_id == user.id)
-        rows = db.scalars(q).all()
-        for t in rows:
-            print(f"#{t.id} {t.title} [{t.status.value}] by user {t.creator_id} -> assignee {t.assignee_id}")
+        q = [filter_tickets(
+            select_ticket_rows(cols),
+            status=args.status,
+            creator_id=_user_id(db, args.email) if args.email else None,
+            assignee_id=_user_id(db, args.assignee_email) if args.assignee_email else None,
+            created_after=args.since,
+            created_before=args.until,
+            cols=cols,
+        ) for cols in ARCHIVED_SOURCES['1' if args.archived else '0']]
+        cursor = args.cursor
+        limit = max(1, args.limit)
+        while True:
+            try:
+                rows, cursor = keyset_page(db, q, limit, cursor)
+            except ValueError as e:
+                print(f"Error: {e}")
+                return
+            for t in rows:
+                print(f"#{t.id} {t.title} [{t.status.value}] by user {t.creator_id} -> assignee {t.assignee_id}")
+            if not cursor or not args.all:
+                break
+        if cursor:
+            print(f"next cursor: {cursor}")
 
 def update_ticket(args):
     with SessionLocal() as db:
@@ -42,10 +94,160 @@ def update_ticket(args):
         if not t:
             print("Ticket not found")
             return
+        previous_status = t.status
         t.status = TicketStatus(args.status)
+        reports.track(db, t, previous_status, t.assignee_id)
+        httpcache.bump(db, "tickets")
         db.commit()
         print(f"Ticket #{t.id} set to {t.status.value}")
 
+def bulk_update_tickets(args):
+    changes = {}
+    if args.status:
+        changes['status'] = args.status
+    with SessionLocal() as db:
+        if args.assignee_email:
+            changes['assignee_id'] = _user_id(db, args.assignee_email)
+        elif args.unassign:
+            changes['assignee_id'] = None
+        where = dict(w.split('=', 1) for w in args.where) if args.where else None
+        ids = args.ids.split(',') if args.ids else None
+        try:
+            results, updated = bulk_update(db, changes, ids=ids, where=where)
+        except ValueError as e:
+            db.rollback()
+            print(f"Error: {e}")
+            return
+        for r in results:
+            print(f"#{r['id']} {r['result']}")
+        if args.dry_run:
+            db.rollback()
+            print(f"Dry run: {len(updated)} tickets would be updated")
+        else:
+            db.commit()
+            print(f"Updated {len(updated)} tickets")
+
+def export_tickets(args):
+    where = dict(w.split('=', 1) for w in args.where) if args.where else None
+    try:
+        chunks = export.generate(args.format, where, include_comments=args.comments)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+    if args.gzip:
+        chunks = export.gzip_chunks(chunks)
+    out = open(args.output, 'wb') if args.output else sys.stdout.buffer
+    try:
+        written = 0
+        for chunk in chunks:
+            out.write(chunk)
+            written += len(chunk)
+    finally:
+        if args.output:
+            out.close()
+    if args.output:
+        print(f"Wrote {written} bytes to {args.output}")
+
+def _rate(stats):
+    return f"{stats['rows'] / stats['seconds']:.0f} rows/s" if stats['seconds'] else "-"
+
+def import_data(args):
+    if not (args.users or args.tickets or args.generate):
+        print("Nothing to import: pass --users, --tickets or --generate")
+        return
+    with SessionLocal() as db:
+        try:
+            users = tickets = None
+            if args.generate:
+                if args.num_users:
+                    users = importer.import_users(
+                        db, importer.synthetic_users(args.num_users, hash_password(args.password), args.seed),
+                        batch_size=args.batch_size)
+                requesters, techs = importer.user_pools(db)
+                tickets = importer.import_tickets(
+                    db, importer.synthetic_tickets(args.num_tickets, requesters, techs, args.comments_per_ticket,
+                                                   args.days, args.seed),
+                    batch_size=args.batch_size)
+            else:
+                if args.users:
+                    with ProcessPoolExecutor(max_workers=args.workers) if args.workers > 0 else nullcontext() as pool:
+                        users = importer.import_users(db, importer.read_records(args.users), pool, args.batch_size)
+                if args.tickets:
+                    tickets = importer.import_tickets(db, importer.read_records(args.tickets), args.batch_size)
+        except (ValueError, KeyError) as e:
+            db.rollback()
+            print(f"Error: {e} (batches before it were committed)")
+            return
+    if users:
+        print(f"users: {users['rows']} rows ({users['inserted']} new, {users['updated']} updated) "
+              f"in {users['seconds']:.1f}s, {_rate(users)}; hashing {users['hash_seconds']:.1f}s")
+    if tickets:
+        print(f"tickets: {tickets['rows']} rows, {tickets['comments']} comments "
+              f"in {tickets['seconds']:.1f}s, {_rate(tickets)}")
+
+def reports_backfill(args):
+    with SessionLocal() as db:
+        n = reports.backfill(db)
+        db.commit()
+        print(f"Rebuilt report rollups from {n} tickets")
+
+def mail_worker(args):
+    if args.once:
+        stats = mailer.run_worker(once=True)
+        print(f"sent {stats['sent']}, retry {stats['retry']}, dead {stats['dead']}, deferred {stats['deferred']}")
+        return
+    print("Draining mail outbox (Ctrl+C to stop)")
+    try:
+        mailer.run_worker()
+    except KeyboardInterrupt:
+        pass
+
+def assign_tickets(args):
+    scheduler = assigner.Scheduler(args.policy, args.batch_size)
+    if args.once or args.dry_run:
+        assigned = scheduler.run_once(dry_run=args.dry_run)
+        with SessionLocal() as db:
+            emails = dict(db.execute(select(User.id, User.email).where(User.role == Role.TECH)).all())
+        for t in assigned:
+            print(f"#{t['id']} -> {emails.get(t['assignee_id'], t['assignee_id'])}")
+        print(f"{'Would assign' if args.dry_run else 'Assigned'} {len(assigned)} tickets ({scheduler.balancer.policy})")
+        for tech, load in sorted(scheduler.balancer.loads().items(), key=lambda kv: emails.get(kv[0], '')):
+            print(f"  {emails.get(tech, tech)}: {load} open")
+        return
+    print(f"Assigning OPEN tickets every {Config.ASSIGNER_INTERVAL_SECONDS:g}s (Ctrl+C to stop)")
+    try:
+        assigner.run_scheduler(scheduler=scheduler)
+    except KeyboardInterrupt:
+        pass
+
+def process_attachments(args):
+    with ProcessPoolExecutor(max_workers=args.workers) if args.workers > 0 else nullcontext() as pool:
+        n = attachments.process_pending(reprocess=args.all, pool=pool)
+    print(f"Processed {n} attachments")
+
+def db_upgrade(args):
+    migrate(revision=args.revision)
+    print(f"Schema upgraded to {args.revision}")
+
+def archive_tickets(args):
+    if args.dry_run:
+        n = archive.archive_resolved(args.days, args.batch_size, dry_run=True)
+        print(f"Would archive {n} tickets")
+        return
+    n = archive.archive_resolved(args.days, args.batch_size)
+    print(f"Archived {n} tickets")
+
+def restore_tickets(args):
+    ids = [int(i) for i in args.ids.split(',') if i.strip()]
+    with SessionLocal() as db:
+        n = archive.restore_tickets(db, ids)
+        db.commit()
+    print(f"Restored {n} tickets")
+
+def reindex(args):
+    backend = search.rebuild(engine)
+    print(f"Search index rebuilt ({backend})")
+
 def main():
     p = argparse.ArgumentParser()
     sub = p.add_subparsers(dest='cmd')
@@ -64,6 +266,13 @@ def main():
     listp = st.add_parser('list')
     listp.add_argument('--status', choices=[s.value for s in TicketStatus])
     listp.add_argument('--email')
+    listp.add_argument('--assignee-email')
+    listp.add_argument('--since', type=iso_datetime, help='created on/after (ISO date)')
+    listp.add_argument('--until', type=iso_datetime, help='created before (ISO date)')
+    listp.add_argument('--limit', type=int, default=50)
+    listp.add_argument('--cursor')
+    listp.add_argument('--all', action='store_true', help='follow cursors until the last page')
+    listp.add_argument('--archived', action='store_true', help='include archived tickets')
     listp.set_defaults(func=list_tickets)
 
     upd = st.add_parser('update')
@@ -71,6 +280,83 @@ def main():
     upd.add_argument('--status', required=True, choices=[s.value for s in TicketStatus])
     upd.set_defaults(func=update_ticket)
 
+    bulkp = st.add_parser('bulk-update')
+    bulkp.add_argument('--status', choices=[s.value for s in TicketStatus])
+    bulkp.add_argument('--assignee-email')
+    bulkp.add_argument('--unassign', action='store_true')
+    bulkp.add_argument('--ids', help='comma-separated ticket ids')
+    bulkp.add_argument('--where', action='append', metavar='KEY=VALUE',
+                       help='filter: status, creator_id, assignee_id (none), created_after/before, updated_after/before')
+    bulkp.add_argument('--dry-run', action='store_true')
+    bulkp.set_defaults(func=bulk_update_tickets)
+
+    prp = sub.add_parser('reports')
+    srp = prp.add_subparsers(dest='rcmd')
+    bfp = srp.add_parser('backfill', help='rebuild reporting rollups from the tickets table')
+    bfp.set_defaults(func=reports_backfill)
+
+    expp = st.add_parser('export')
+    expp.add_argument('--format', choices=list(export.FORMATS), default='csv')
+    expp.add_argument('--comments', action='store_true', help='include comments (one CSV row / nested NDJSON list each)')
+    expp.add_argument('--gzip', action='store_true')
+    expp.add_argument('--where', action='append', metavar='KEY=VALUE')
+    expp.add_argument('--output', help='file to write (default: stdout)')
+    expp.set_defaults(func=export_tickets)
+
+    pm = sub.add_parser('mail')
+    sm = pm.add_subparsers(dest='mcmd')
+    wp = sm.add_parser('worker')
+    wp.add_argument('--once', action='store_true', help='send one batch and exit')
+    wp.set_defaults(func=mail_worker)
+
+    ap = sub.add_parser('assign', help='hand unassigned OPEN tickets to TECH users (runs until stopped)')
+    ap.add_argument('--once', action='store_true', help='assign one batch and exit')
+    ap.add_argument('--dry-run', action='store_true', help='show one batch of decisions without saving them')
+    ap.add_argument('--policy', choices=assigner.POLICIES, help='default: ASSIGNER_POLICY')
+    ap.add_argument('--batch-size', type=int, help='tickets per batch (default: ASSIGNER_BATCH_SIZE)')
+    ap.set_defaults(func=assign_tickets)
+
+    pa = sub.add_parser('attachments')
+    sa = pa.add_subparsers(dest='acmd')
+    prc = sa.add_parser('process', help='make thumbnails, search text and zip listings for stored attachments')
+    prc.add_argument('--all', action='store_true', help='redo attachments that were already processed')
+    prc.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='processes (0 = ATTACHMENT_WORKERS pool)')
+    prc.set_defaults(func=process_attachments)
+
+    ip = sub.add_parser('import', help='batch-load users/tickets from CSV or JSONL, or generate a synthetic dataset')
+    ip.add_argument('--users', help='CSV/JSONL of email, name, role, password (or password_hash); upserts on email')
+    ip.add_argument('--tickets', help='CSV/JSONL of title, description, status, creator_email, assignee_email, '
+                                      'created_at, ... (NDJSON exports with comments are accepted)')
+    ip.add_argument('--batch-size', type=int, default=importer.BATCH_SIZE)
+    ip.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='password hashing processes (0 = inline)')
+    ip.add_argument('--generate', action='store_true', help='generate synthetic users and tickets instead')
+    ip.add_argument('--num-users', type=int, default=20000)
+    ip.add_argument('--num-tickets', type=int, default=100000)
+    ip.add_argument('--comments-per-ticket', type=float, default=2)
+    ip.add_argument('--days', type=int, default=120, help='spread generated tickets over this many days')
+    ip.add_argument('--seed', type=int, default=0)
+    ip.add_argument('--password', default='password123', help='password shared by generated users')
+    ip.set_defaults(func=import_data)
+
+    dp = sub.add_parser('db')
+    sd = dp.add_subparsers(dest='dcmd')
+    upp = sd.add_parser('upgrade', help='apply Alembic migrations (what the API does on start with DB_AUTO_MIGRATE=1)')
+    upp.add_argument('--revision', default='head')
+    upp.set_defaults(func=db_upgrade)
+
+    arp = sub.add_parser('archive', help='move RESOLVED tickets with their comments and attachments to the archive tables')
+    arp.add_argument('--days', type=int, help='not updated for this many days (default: ARCHIVE_AFTER_DAYS)')
+    arp.add_argument('--batch-size', type=int, help='tickets per transaction (default: ARCHIVE_BATCH_SIZE)')
+    arp.add_argument('--dry-run', action='store_true', help='only count the tickets that would move')
+    arp.set_defaults(func=archive_tickets)
+    sarp = arp.add_subparsers(dest='arcmd')
+    rsp = sarp.add_parser('restore', help='move archived tickets back')
+    rsp.add_argument('--ids', required=True, help='comma-separated ticket ids')
+    rsp.set_defaults(func=restore_tickets)
+
+    rp = sub.add_parser('reindex', help='rebuild the full-text search index')
+    rp.set_defaults(func=reindex)
+
     args = p.parse_args()
     if hasattr(args, 'func'):
         args.func(args)